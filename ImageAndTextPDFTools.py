@@ -1,16 +1,33 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
+from functools import partial
+import multiprocessing
 import os
-from PIL import Image # For image processing in OCR part
-from PyPDF2 import PdfReader, PdfMerger # For PDF operations
-from fpdf import FPDF # For creating PDFs from text
-import pytesseract # For OCR
-import pandas as pd
+import queue
+import threading
+from conversions import (ConversionCancelled, ConversionError, EmptyInputError, NoTextFoundError, OcrUnavailableError,
+                         images_to_pdf, pdf_to_searchable_pdf, pdf_to_structured, pdf_to_text, text_file_to_pdf,
+                         text_to_structured)
+from ocr_cache import OcrCache
+from ocr_checkpoint import default_work_dir
+from ocr_engine import default_worker_count
+from image_preprocess import Preprocessing
+from page_checks import PageChecks
+from search_index import SearchIndex
 
 # --- Configuration ---
-# Ensure Tesseract is installed and its path is set if not in PATH
-# If you get a TesseractNotFoundError, uncomment the line below and set your path:
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+# The conversions themselves live in conversions.py; these pages only collect the inputs.
+# If you get a TesseractNotFoundError, set the TESSERACT_CMD environment variable to your
+# tesseract executable (see ocr_engine.py).
+JOB_POLL_INTERVAL_MS = 100 # How often the UI checks for progress from a running conversion
+
+
+def with_search_index(use_index, function, *args, **kwargs):
+    # Job body: the search index is opened on the worker thread and closed when the job ends
+    if not use_index:
+        return function(*args, index=None, **kwargs)
+    with SearchIndex() as index:
+        return function(*args, index=index, **kwargs)
 
 # --- Base Page/Frame Class ---
 class BasePage(tk.Frame):
@@ -27,10 +44,64 @@ class BasePage(tk.Frame):
                                       fg="#3b82f6") # Blue-500 for status
         self.status_label.pack(pady=(10, 0), side=tk.BOTTOM, fill=tk.X)
 
+        # Cancel Button (enabled while a conversion is running)
+        self.cancel_button = tk.Button(self, text="Cancel", command=self.cancel_job,
+                                       bg="#6b7280", fg="white", font=("Inter", 10, "bold"), padx=10, pady=5, relief="raised", bd=0, activebackground="#4b5563", activeforeground="white", cursor="hand2", state=tk.DISABLED)
+        self.cancel_button.pack(pady=(5, 0), side=tk.BOTTOM)
+
+        # Conversions run on a background thread and report back through this queue,
+        # which the Tk main loop polls with after() so the window never freezes
+        self.job_events = queue.Queue()
+        self.cancel_event = None
+
     def update_status(self, message):
         self.status_label.config(text=message)
         self.update_idletasks() # Ensure UI updates immediately
 
+    def run_job(self, work, on_done):
+        # work(progress=..., cancel=...) runs on a worker thread; on_done(result, error) runs on the main loop
+        cancel_event = threading.Event()
+        self.cancel_event = cancel_event
+        self.cancel_button.config(state=tk.NORMAL)
+
+        def target():
+            try:
+                result = work(progress=lambda message: self.job_events.put(("status", message)), cancel=cancel_event)
+                self.job_events.put(("done", (result, None)))
+            except Exception as e:
+                self.job_events.put(("done", (None, e)))
+
+        threading.Thread(target=target, daemon=True).start()
+        self.after(JOB_POLL_INTERVAL_MS, self._poll_job_events, on_done)
+
+    def _poll_job_events(self, on_done):
+        try:
+            while True:
+                kind, payload = self.job_events.get_nowait()
+                if kind == "status":
+                    self.update_status(payload)
+                else: # done
+                    self.cancel_event = None
+                    self.cancel_button.config(state=tk.DISABLED)
+                    on_done(*payload)
+                    return
+        except queue.Empty:
+            self.after(JOB_POLL_INTERVAL_MS, self._poll_job_events, on_done)
+
+    def cancel_job(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.update_status("Cancelling after the current page...")
+
+# --- Shared Dialogs ---
+def ask_structured_save_path(input_path, file_type):
+    initial_file_name = os.path.splitext(os.path.basename(input_path))[0]
+    if file_type == "xlsx":
+        return filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel Files", "*.xlsx")], title="Save Excel File As", initialfile=f"{initial_file_name}.xlsx")
+    else: # csv
+        return filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV Files", "*.csv")], title="Save CSV File As", initialfile=f"{initial_file_name}.csv")
+
 # --- Page 1: Image to Searchable PDF Converter ---
 class ImageToSearchablePdfPage(BasePage):
     def __init__(self, parent, controller):
@@ -62,6 +133,49 @@ class ImageToSearchablePdfPage(BasePage):
                                       bg="#ef4444", fg="white", font=("Inter", 10, "bold"), padx=10, pady=5, relief="raised", bd=0, activebackground="#dc2626", activeforeground="white", cursor="hand2")
         self.remove_button.pack(pady=(5, 15))
 
+        # Number of images OCR'd at once (defaults to one per CPU core)
+        self.workers_frame = tk.Frame(self, bg="#f3f4f6")
+        self.workers_frame.pack(pady=(0, 10))
+        tk.Label(self.workers_frame, text="Parallel OCR jobs:", font=("Inter", 10), bg="#f3f4f6", fg="#4b5563").pack(side="left", padx=(0, 5))
+        self.workers_var = tk.IntVar(value=default_worker_count())
+        self.workers_spinbox = tk.Spinbox(self.workers_frame, from_=1, to=max(64, default_worker_count()), width=4, textvariable=self.workers_var, font=("Inter", 10))
+        self.workers_spinbox.pack(side="left")
+
+        # Reuse OCR results of images converted before (see ocr_cache.py)
+        self.use_cache_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(self.workers_frame, text="Reuse cached OCR results", variable=self.use_cache_var, font=("Inter", 10), bg="#f3f4f6", fg="#4b5563", activebackground="#f3f4f6").pack(side="left", padx=(15, 0))
+
+        # Make the recognised text searchable later (see search_index.py)
+        self.index_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(self.workers_frame, text="Add to search index", variable=self.index_var, font=("Inter", 10), bg="#f3f4f6", fg="#4b5563", activebackground="#f3f4f6").pack(side="left", padx=(15, 0))
+
+        # Sidecar files written from the same OCR pass, next to the PDF
+        self.sidecars_frame = tk.Frame(self, bg="#f3f4f6")
+        self.sidecars_frame.pack(pady=(0, 10))
+        tk.Label(self.sidecars_frame, text="Also save OCR output as:", font=("Inter", 10), bg="#f3f4f6", fg="#4b5563").pack(side="left", padx=(0, 5))
+        self.sidecar_vars = {}
+        for kind, label in (("txt", "Text (.txt)"), ("hocr", "hOCR (.hocr)"), ("tsv", "TSV (.tsv)")):
+            self.sidecar_vars[kind] = tk.BooleanVar(value=False)
+            tk.Checkbutton(self.sidecars_frame, text=label, variable=self.sidecar_vars[kind], font=("Inter", 10), bg="#f3f4f6", fg="#4b5563", activebackground="#f3f4f6").pack(side="left")
+
+        # Grayscale, downsample, deskew and binarize before OCR (see image_preprocess.py)
+        self.preprocess_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self, text="Clean up images before OCR (faster for large photos and scans; the PDF shows the cleaned-up pages)",
+                       variable=self.preprocess_var, font=("Inter", 10), bg="#f3f4f6", fg="#4b5563", activebackground="#f3f4f6").pack(pady=(0, 10))
+
+        # Cheap checks before OCR (see page_checks.py)
+        self.checks_frame = tk.Frame(self, bg="#f3f4f6")
+        self.checks_frame.pack(pady=(0, 10))
+        self.drop_blank_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.checks_frame, text="Leave out blank pages", variable=self.drop_blank_var, font=("Inter", 10), bg="#f3f4f6", fg="#4b5563", activebackground="#f3f4f6").pack(side="left")
+        self.auto_rotate_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.checks_frame, text="Turn sideways and upside-down pages upright", variable=self.auto_rotate_var, font=("Inter", 10), bg="#f3f4f6", fg="#4b5563", activebackground="#f3f4f6").pack(side="left", padx=(15, 0))
+
+        # Finished pages are kept next to the output until the whole batch is done (see ocr_checkpoint.py)
+        self.resumable_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self, text="Keep finished pages so an interrupted conversion can resume (for long batches)",
+                       variable=self.resumable_var, font=("Inter", 10), bg="#f3f4f6", fg="#4b5563", activebackground="#f3f4f6").pack(pady=(0, 10))
+
         # Convert Button
         self.convert_button = tk.Button(self, text="Convert to PDF", command=self.convert_images_to_pdf,
                                        bg="#10b981", fg="white", font=("Inter", 12, "bold"), padx=20, pady=10, relief="raised", bd=0, activebackground="#047857", activeforeground="white", cursor="hand2", state=tk.DISABLED)
@@ -111,41 +225,47 @@ class ImageToSearchablePdfPage(BasePage):
         self.update_status("Starting image to searchable PDF conversion...")
 
         try:
-            merger = PdfMerger()
-            for i, image_path in enumerate(self.image_paths):
-                self.update_status(f"Processing image {i+1}/{len(self.image_paths)}: {os.path.basename(image_path)} (performing OCR)...")
-                try:
-                    img = Image.open(image_path)
-                    # Convert image to PDF with OCR text overlay
-                    # Tesseract can directly create a searchable PDF from an image
-                    pdf_bytes = pytesseract.image_to_pdf_or_hocr(img, extension='pdf')
-                    
-                    # Save temporary PDF for PyPDF2 to merge
-                    temp_pdf_path = f"temp_ocr_page_{i}.pdf"
-                    with open(temp_pdf_path, 'wb') as f:
-                        f.write(pdf_bytes)
-                    merger.append(temp_pdf_path)
-                    os.remove(temp_pdf_path) # Clean up temporary file
-
-                except Exception as img_e:
-                    self.update_status(f"Error processing {os.path.basename(image_path)}: {img_e}")
-                    messagebox.showerror("Image Processing Error", f"Could not process {os.path.basename(image_path)}: {img_e}")
-                    continue # Try to continue with other images
-
-            if not merger.pages:
-                messagebox.showerror("No Pages to Merge", "No images were successfully processed to create PDF pages.")
+            workers = self.workers_var.get()
+        except tk.TclError:
+            workers = default_worker_count()
+
+        cache = OcrCache() if self.use_cache_var.get() else None
+        sidecars = [kind for kind, var in self.sidecar_vars.items() if var.get()]
+        preprocessing = Preprocessing() if self.preprocess_var.get() else None
+        checks = None
+        if self.drop_blank_var.get() or self.auto_rotate_var.get():
+            checks = PageChecks("drop" if self.drop_blank_var.get() else "ocr", self.auto_rotate_var.get())
+        work_dir = default_work_dir(output_pdf_path) if self.resumable_var.get() else None
+        self.run_job(partial(with_search_index, self.index_var.get(), images_to_pdf, list(self.image_paths), output_pdf_path, workers=workers,
+                             cache=cache, sidecars=sidecars, preprocessing=preprocessing, checks=checks, work_dir=work_dir),
+                     partial(self.images_converted, output_pdf_path))
+
+    def images_converted(self, output_pdf_path, result, error):
+        try:
+            if error is not None:
+                raise error
+            if result.failed:
+                failed = "\n".join(f"{os.path.basename(path)}: {error}" for path, error in result.failed)
+                messagebox.showerror("Image Processing Error", f"Could not process {len(result.failed)} image(s):\n{failed}")
+
+            if result.cancelled:
+                resume = "\n\nConvert the same images again to resume." if result.warnings else ""
+                messagebox.showinfo("Conversion Cancelled", f"Conversion cancelled. The {result.pages} finished page(s) were saved to:\n{output_pdf_path}{resume}")
+                self.update_status(f"Conversion cancelled; partial PDF with {result.pages} page(s) saved.")
                 return
-
-            merger.write(output_pdf_path)
-            merger.close()
-
-            messagebox.showinfo("Conversion Complete", f"Searchable PDF created successfully at:\n{output_pdf_path}")
-            self.update_status("Searchable PDF created successfully!")
+            saved = "\n".join([output_pdf_path] + result.extra_outputs)
+            messagebox.showinfo("Conversion Complete", f"Searchable PDF created successfully at:\n{saved}")
+            self.update_status("Searchable PDF created successfully!" + (f" ({result.stats_summary()})" if result.stats else ""))
             self.image_paths = [] # Clear selection
             self.image_listbox.delete(0, tk.END)
-        except pytesseract.TesseractNotFoundError:
-            messagebox.showerror("Tesseract Not Found", "Tesseract-OCR is not installed or not in your PATH. Please install it or set the path in the script.")
+        except ConversionCancelled as e:
+            self.update_status(str(e))
+        except OcrUnavailableError as e:
+            messagebox.showerror("Tesseract Not Found", str(e))
             self.update_status("Error: Tesseract not found.")
+        except ConversionError as e:
+            messagebox.showerror("No Pages to Merge", str(e))
+            self.update_status(f"Error: {e}")
         except Exception as e:
             messagebox.showerror("Conversion Error", f"An error occurred during PDF creation: {e}")
             self.update_status(f"Error: {e}")
@@ -174,14 +294,31 @@ class PdfToTextPage(BasePage):
 
         # Label to display selected file
         self.file_label = tk.Label(self, text="No PDF selected.", font=("Inter", 10), bg="#f3f4f6", fg="#6b7280", wraplength=550)
-        self.file_label.pack(pady=(0, 20))
-
-        # Convert Button
-        self.convert_button = tk.Button(self, text="Convert to Text", command=self.convert_pdf_to_text,
+        self.file_label.pack(pady=(0, 10))
+
+        # Optional page range, e.g. "1-5, 8" (empty means all pages)
+        self.page_range_frame = tk.Frame(self, bg="#f3f4f6")
+        self.page_range_frame.pack(pady=(0, 15))
+        tk.Label(self.page_range_frame, text="Pages (e.g. 1-5, 8; empty for all):", font=("Inter", 10), bg="#f3f4f6", fg="#4b5563").pack(side="left", padx=(0, 5))
+        self.page_range_var = tk.StringVar()
+        tk.Entry(self.page_range_frame, textvariable=self.page_range_var, width=15, font=("Inter", 10)).pack(side="left")
+        self.index_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(self.page_range_frame, text="Add to search index", variable=self.index_var, font=("Inter", 10), bg="#f3f4f6", fg="#4b5563", activebackground="#f3f4f6").pack(side="left", padx=(15, 0))
+
+        # Convert Buttons
+        self.buttons_frame = tk.Frame(self, bg="#f3f4f6")
+        self.buttons_frame.pack(pady=(0, 20))
+        self.convert_button = tk.Button(self.buttons_frame, text="Convert to Text", command=self.convert_pdf_to_text,
                                        bg="#10b981", fg="white", font=("Inter", 12, "bold"), padx=20, pady=10, relief="raised", bd=0, activebackground="#047857", activeforeground="white", cursor="hand2", state=tk.DISABLED)
-        self.convert_button.pack(pady=(0, 20))
+        self.convert_button.pack(side="left", padx=(0, 10))
         self.convert_button.bind("<Enter>", lambda e: self.convert_button.config(relief="ridge"))
         self.convert_button.bind("<Leave>", lambda e: self.convert_button.config(relief="raised"))
+        # OCRs only the pages that have no text layer yet (scans) and keeps the rest as they are
+        self.ocr_button = tk.Button(self.buttons_frame, text="Make Searchable PDF", command=self.make_searchable_pdf,
+                                   bg="#10b981", fg="white", font=("Inter", 12, "bold"), padx=20, pady=10, relief="raised", bd=0, activebackground="#047857", activeforeground="white", cursor="hand2", state=tk.DISABLED)
+        self.ocr_button.pack(side="left")
+        self.ocr_button.bind("<Enter>", lambda e: self.ocr_button.config(relief="ridge"))
+        self.ocr_button.bind("<Leave>", lambda e: self.ocr_button.config(relief="raised"))
 
     def select_pdf(self):
         self.update_status("")
@@ -190,11 +327,13 @@ class PdfToTextPage(BasePage):
             self.pdf_path = file_path
             self.file_label.config(text=f"Selected PDF: {os.path.basename(self.pdf_path)}")
             self.convert_button.config(state=tk.NORMAL)
+            self.ocr_button.config(state=tk.NORMAL)
             self.update_status("PDF selected. Ready to extract text.")
         else:
             self.pdf_path = None
             self.file_label.config(text="No PDF selected.")
             self.convert_button.config(state=tk.DISABLED)
+            self.ocr_button.config(state=tk.DISABLED)
             self.update_status("No PDF selected.")
 
     def convert_pdf_to_text(self):
@@ -203,44 +342,82 @@ class PdfToTextPage(BasePage):
             return
 
         self.update_status("Extracting text from PDF...")
-        self.convert_button.config(state=tk.DISABLED)
-        self.select_button.config(state=tk.DISABLED)
+        self.set_buttons(tk.DISABLED)
 
         text_file_path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text Files", "*.txt")], title="Save Text As", initialfile=f"{os.path.splitext(os.path.basename(self.pdf_path))[0]}.txt")
         if not text_file_path:
             self.update_status("Text conversion cancelled.")
-            self.convert_button.config(state=tk.NORMAL)
-            self.select_button.config(state=tk.NORMAL)
+            self.set_buttons(tk.NORMAL)
             return
 
-        try:
-            full_text = ""
-            with open(self.pdf_path, 'rb') as file:
-                reader = PdfReader(file)
-                num_pages = len(reader.pages)
-
-                for i in range(num_pages):
-                    page = reader.pages[i]
-                    self.update_status(f"Extracting text from page {i+1}/{num_pages}...")
-                    page_text = page.extract_text()
-                    if page_text:
-                        full_text += page_text + "\n"
-
-            if full_text.strip():
-                with open(text_file_path, 'w', encoding='utf-8') as output_file:
-                    output_file.write(full_text)
-                messagebox.showinfo("Conversion Complete", f"Text extracted successfully to:\n{text_file_path}")
-                self.update_status("Text extracted successfully!")
-            else:
-                messagebox.showwarning("No Text Found", "No selectable text was found in the PDF. It might be an image-only PDF without an OCR layer.")
-                self.update_status("No selectable text found in PDF.")
+        self.run_job(partial(with_search_index, self.index_var.get(), pdf_to_text, self.pdf_path, text_file_path, page_range=self.page_range_var.get()),
+                     partial(self.text_extracted, text_file_path))
 
+    def text_extracted(self, text_file_path, result, error):
+        try:
+            if error is not None:
+                raise error
+            if result.cancelled:
+                messagebox.showinfo("Conversion Cancelled", f"Extraction cancelled. Text from the first {result.pages} page(s) was saved to:\n{text_file_path}")
+                self.update_status(f"Extraction cancelled; text from {result.pages} page(s) saved.")
+                return
+            messagebox.showinfo("Conversion Complete", f"Text extracted successfully to:\n{text_file_path}")
+            self.update_status("Text extracted successfully!")
+        except ConversionCancelled as e:
+            self.update_status(str(e))
+        except NoTextFoundError as e:
+            messagebox.showwarning("No Text Found", f"{e}\n\nUse \"Make Searchable PDF\" to OCR its scanned pages first.")
+            self.update_status("No selectable text found in PDF.")
         except Exception as e:
             messagebox.showerror("Conversion Error", f"An error occurred during text extraction: {e}")
             self.update_status(f"Error: {e}")
         finally:
-            self.convert_button.config(state=tk.NORMAL)
-            self.select_button.config(state=tk.NORMAL)
+            self.set_buttons(tk.NORMAL)
+
+    def make_searchable_pdf(self):
+        if not self.pdf_path:
+            messagebox.showwarning("No PDF", "Please select a PDF file first.")
+            return
+
+        self.set_buttons(tk.DISABLED)
+        output_pdf_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF Files", "*.pdf")], title="Save Searchable PDF As", initialfile=f"{os.path.splitext(os.path.basename(self.pdf_path))[0]}_ocr.pdf")
+        if not output_pdf_path:
+            self.update_status("OCR cancelled.")
+            self.set_buttons(tk.NORMAL)
+            return
+
+        self.update_status("Looking for scanned pages...")
+        self.run_job(partial(with_search_index, self.index_var.get(), pdf_to_searchable_pdf, self.pdf_path, output_pdf_path,
+                             workers=default_worker_count(), cache=OcrCache()),
+                     partial(self.searchable_pdf_created, output_pdf_path))
+
+    def searchable_pdf_created(self, output_pdf_path, result, error):
+        try:
+            if error is not None:
+                raise error
+            if result.failed:
+                failed = "\n".join(f"{path}: {error}" for path, error in result.failed)
+                messagebox.showerror("OCR Error", f"Could not OCR {len(result.failed)} page(s); they were copied without text:\n{failed}")
+            if result.cancelled:
+                messagebox.showinfo("Conversion Cancelled", f"OCR cancelled. The first {result.pages} page(s) were saved to:\n{output_pdf_path}")
+                self.update_status(f"OCR cancelled; partial PDF with {result.pages} page(s) saved.")
+                return
+            messagebox.showinfo("Conversion Complete", f"Searchable PDF created successfully at:\n{output_pdf_path}")
+            self.update_status(f"Searchable PDF created successfully! ({result.stats_summary()})")
+        except ConversionCancelled as e:
+            self.update_status(str(e))
+        except OcrUnavailableError as e:
+            messagebox.showerror("Tesseract Not Found", str(e))
+            self.update_status("Error: Tesseract not found.")
+        except Exception as e:
+            messagebox.showerror("Conversion Error", f"An error occurred while making the PDF searchable: {e}")
+            self.update_status(f"Error: {e}")
+        finally:
+            self.set_buttons(tk.NORMAL)
+
+    def set_buttons(self, state):
+        for button in (self.select_button, self.convert_button, self.ocr_button):
+            button.config(state=state)
 
 
 # --- Page 3: Plain Text File to PDF Converter ---
@@ -290,20 +467,6 @@ class TextFileToPdfPage(BasePage):
             messagebox.showwarning("No Text File", "Please select a text file first.")
             return
 
-        try:
-            with open(self.text_file_path, 'r', encoding='utf-8') as f:
-                file_content = f.read()
-        except Exception as e:
-            messagebox.showerror("File Read Error", f"Could not read text file: {e}")
-            self.update_status(f"Error reading file: {e}")
-            return
-
-        if not file_content.strip():
-            messagebox.showwarning("Empty File", "The selected text file is empty or contains only whitespace.")
-            self.update_status("Text file is empty.")
-            return
-
-        self.update_status("Converting text file to PDF...")
         self.convert_button.config(state=tk.DISABLED)
         self.select_button.config(state=tk.DISABLED)
 
@@ -314,23 +477,31 @@ class TextFileToPdfPage(BasePage):
             self.select_button.config(state=tk.NORMAL)
             return
 
-        try:
-            pdf = FPDF('P', 'mm', 'A4')
-            pdf.set_auto_page_break(auto=True, margin=15)
-            pdf.add_page()
-            pdf.set_font("Arial", size=12)
-            pdf.multi_cell(0, 10, txt=file_content)
+        self.run_job(partial(text_file_to_pdf, self.text_file_path, pdf_file_path), partial(self.pdf_created, pdf_file_path))
 
-            pdf.output(pdf_file_path)
+    def pdf_created(self, pdf_file_path, result, error):
+        try:
+            if error is not None:
+                raise error
+            if result.cancelled:
+                messagebox.showinfo("Conversion Cancelled", f"Conversion cancelled. The first {result.pages} page(s) were saved to:\n{pdf_file_path}")
+                self.update_status(f"Conversion cancelled; partial PDF with {result.pages} page(s) saved.")
+                return
             messagebox.showinfo("Conversion Complete", f"PDF saved successfully to:\n{pdf_file_path}")
             self.update_status("PDF created successfully from text file!")
+        except EmptyInputError as e:
+            messagebox.showwarning("Empty File", str(e))
+            self.update_status("Text file is empty.")
+        except (OSError, UnicodeDecodeError) as e:
+            messagebox.showerror("File Read Error", f"Could not read text file: {e}")
+            self.update_status(f"Error reading file: {e}")
         except Exception as e:
             messagebox.showerror("Conversion Error", f"An error occurred during PDF creation: {e}")
             self.update_status(f"Error: {e}")
         finally:
             self.convert_button.config(state=tk.NORMAL)
             self.select_button.config(state=tk.NORMAL)
-            
+
 # --- Page 4: PDF to Excel/CSV Converter (New) ---
 class PdfToExcelCsvPage(BasePage):
     def __init__(self, parent, controller):
@@ -381,37 +552,11 @@ class PdfToExcelCsvPage(BasePage):
             messagebox.showwarning("No PDF", "Please select a PDF file first.")
             return
 
-        self.update_status(f"Extracting text from PDF for {file_type.upper()} conversion...")
         self.convert_excel_button.config(state=tk.DISABLED)
         self.convert_csv_button.config(state=tk.DISABLED)
         self.select_button.config(state=tk.DISABLED)
 
-        extracted_text = ""
-        try:
-            with open(self.pdf_path, 'rb') as file:
-                reader = PdfReader(file)
-                for page in reader.pages:
-                    extracted_text += page.extract_text() + "\n"
-        except Exception as e:
-            messagebox.showerror("Extraction Error", f"Error extracting text from PDF: {e}")
-            self.update_status(f"Error extracting text: {e}")
-            self.convert_excel_button.config(state=tk.NORMAL)
-            self.convert_csv_button.config(state=tk.NORMAL)
-            self.select_button.config(state=tk.NORMAL)
-            return
-
-        if not extracted_text.strip():
-            messagebox.showwarning("No Text Found", "No selectable text was found in the PDF. Conversion to Excel/CSV might result in an empty file.")
-            self.update_status("No text found in PDF for conversion.")
-            # Still proceed to save an empty file if the user wishes
-            pass
-
-        initial_file_name = os.path.splitext(os.path.basename(self.pdf_path))[0]
-        if file_type == "xlsx":
-            save_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel Files", "*.xlsx")], title="Save Excel File As", initialfile=f"{initial_file_name}.xlsx")
-        else: # csv
-            save_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV Files", "*.csv")], title="Save CSV File As", initialfile=f"{initial_file_name}.csv")
-
+        save_path = ask_structured_save_path(self.pdf_path, file_type)
         if not save_path:
             self.update_status(f"{file_type.upper()} conversion cancelled.")
             self.convert_excel_button.config(state=tk.NORMAL)
@@ -419,19 +564,27 @@ class PdfToExcelCsvPage(BasePage):
             self.select_button.config(state=tk.NORMAL)
             return
 
-        try:
-            # For simplicity, we'll put the entire extracted text into one column.
-            # More advanced parsing (e.g., regex, table detection) would be needed
-            # for structured data extraction from arbitrary PDFs.
-            df = pd.DataFrame([line.strip() for line in extracted_text.splitlines() if line.strip()], columns=["Extracted Text"])
-
-            if file_type == "xlsx":
-                df.to_excel(save_path, index=False)
-            else: # csv
-                df.to_csv(save_path, index=False, encoding='utf-8')
+        self.run_job(partial(pdf_to_structured, self.pdf_path, save_path, file_type=file_type),
+                     partial(self.structured_created, save_path, file_type))
 
-            messagebox.showinfo("Conversion Complete", f"{file_type.upper()} file created successfully at:\n{save_path}")
+    def structured_created(self, save_path, file_type, result, error):
+        try:
+            if error is not None:
+                raise error
+            for warning in result.warnings:
+                messagebox.showwarning("No Text Found", warning)
+
+            if result.cancelled:
+                messagebox.showinfo("Conversion Cancelled", f"Conversion cancelled. Text from the first {result.pages} page(s) was saved to:\n{save_path}")
+                self.update_status(f"Conversion cancelled; {result.pages} page(s) saved to {file_type.upper()}.")
+                return
+            message = f"{file_type.upper()} file created successfully at:\n{save_path}"
+            if result.extra_outputs: # One CSV per table
+                message += "\n\nFurther tables were saved to:\n" + "\n".join(result.extra_outputs)
+            messagebox.showinfo("Conversion Complete", message)
             self.update_status(f"PDF text converted to {file_type.upper()} successfully!")
+        except ConversionCancelled as e:
+            self.update_status(str(e))
         except Exception as e:
             messagebox.showerror("Conversion Error", f"An error occurred during {file_type.upper()} creation: {e}")
             self.update_status(f"Error: {e}")
@@ -490,30 +643,11 @@ class TextToExcelCsvPage(BasePage):
             messagebox.showwarning("No Text File", "Please select a text file first.")
             return
 
-        try:
-            with open(self.text_file_path, 'r', encoding='utf-8') as f:
-                file_content = f.read()
-        except Exception as e:
-            messagebox.showerror("File Read Error", f"Could not read text file: {e}")
-            self.update_status(f"Error reading file: {e}")
-            return
-
-        if not file_content.strip():
-            messagebox.showwarning("Empty File", "The selected text file is empty or contains only whitespace.")
-            self.update_status("Text file is empty.")
-            return # Don't proceed with conversion for empty files
-
-        self.update_status(f"Converting text file to {file_type.upper()}...")
         self.convert_excel_button.config(state=tk.DISABLED)
         self.convert_csv_button.config(state=tk.DISABLED)
         self.select_button.config(state=tk.DISABLED)
 
-        initial_file_name = os.path.splitext(os.path.basename(self.text_file_path))[0]
-        if file_type == "xlsx":
-            save_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel Files", "*.xlsx")], title="Save Excel File As", initialfile=f"{initial_file_name}.xlsx")
-        else: # csv
-            save_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV Files", "*.csv")], title="Save CSV File As", initialfile=f"{initial_file_name}.csv")
-
+        save_path = ask_structured_save_path(self.text_file_path, file_type)
         if not save_path:
             self.update_status(f"{file_type.upper()} conversion cancelled.")
             self.convert_excel_button.config(state=tk.NORMAL)
@@ -521,23 +655,25 @@ class TextToExcelCsvPage(BasePage):
             self.select_button.config(state=tk.NORMAL)
             return
 
-        try:
-            # Assuming comma-separated values for direct DataFrame creation
-            # You might need more robust parsing here depending on text file structure
-            from io import StringIO
-            data = StringIO(file_content)
-            df = pd.read_csv(data) # Tries to read as CSV by default
-
-            if file_type == "xlsx":
-                df.to_excel(save_path, index=False)
-            else: # csv
-                df.to_csv(save_path, index=False, encoding='utf-8')
+        self.run_job(partial(text_to_structured, self.text_file_path, save_path, file_type=file_type),
+                     partial(self.structured_created, save_path, file_type))
 
+    def structured_created(self, save_path, file_type, result, error):
+        try:
+            if error is not None:
+                raise error
+            for warning in result.warnings:
+                messagebox.showwarning("Sheet Row Limit", warning)
             messagebox.showinfo("Conversion Complete", f"{file_type.upper()} file created successfully at:\n{save_path}")
             self.update_status(f"Text file converted to {file_type.upper()} successfully!")
-        except pd.errors.EmptyDataError:
-            messagebox.showwarning("Empty Data", "The text file appears to have no data to convert to a structured format.")
+        except ConversionCancelled as e:
+            self.update_status(str(e))
+        except EmptyInputError as e:
+            messagebox.showwarning("Empty Data", str(e))
             self.update_status("Empty data in text file.")
+        except (OSError, UnicodeDecodeError) as e:
+            messagebox.showerror("File Read Error", f"Could not read text file: {e}")
+            self.update_status(f"Error reading file: {e}")
         except Exception as e:
             messagebox.showerror("Conversion Error", f"An error occurred during {file_type.upper()} creation: {e}\n\nHint: For text files, ensure data is properly delimited (e.g., comma-separated) for best results.")
             self.update_status(f"Error: {e}")
@@ -601,5 +737,6 @@ class App(tk.Tk):
 
 # --- Main Execution ---
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # Needed for the OCR worker processes in the PyInstaller build
     app = App()
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,383 @@
+import argparse
+import ctypes
+import difflib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+from conversions import images_to_pdf, pdf_to_structured, pdf_to_text, text_file_to_pdf, text_to_structured
+from image_preprocess import Preprocessing
+from ocr_backends import tesserocr_available
+from ocr_engine import default_worker_count, ocr_images, tesseract
+from pdf_writer import PdfStreamWriter
+from text_pdf import TextLayout
+
+# --- Benchmarks ---
+# Runs locally and offline; only needs a Tesseract install. Inputs are generated with a
+# fixed seed, so runs on the same settings are comparable through their JSON results.
+#   python benchmark.py ocr-backends --images 50 --workers 1 4
+#   python benchmark.py --json before.json conversions --pdf-pages 500 --text-mb 50
+#   python benchmark.py preprocess --images 10 --dpi 600
+#   python benchmark.py startup --budget 0.5
+
+
+def make_receipt_images(directory, count, size=(600, 400)):
+    # Small, mostly-white images with a few lines of text, like scanned receipts
+    paths = []
+    for i in range(count):
+        img = Image.new("L", size, 255)
+        draw = ImageDraw.Draw(img)
+        lines = [f"RECEIPT #{1000 + i}", "Coffee            2.50", "Sandwich          6.75", f"TOTAL             {9.25 + i:.2f}"]
+        for n, line in enumerate(lines):
+            draw.text((30, 30 + 40 * n), line, fill=0)
+        path = os.path.join(directory, f"receipt_{i:04d}.png")
+        img.save(path, dpi=(300, 300))
+        paths.append(path)
+    return paths
+
+
+# --- Synthetic Corpus ---
+def make_text_images(directory, count, dpi):
+    """Letter-size pages of 12 pt text, rendered at the given resolution."""
+    random.seed(dpi)
+    width, height = int(8.5 * dpi), int(11 * dpi)
+    size = dpi * 12 // 72
+    try:
+        font = ImageFont.load_default(size=size)
+    except TypeError: # Pillow < 10.1 only has the small bitmap font
+        font = ImageFont.load_default()
+    paths = []
+    for i in range(count):
+        img = Image.new("L", (width, height), 255)
+        draw = ImageDraw.Draw(img)
+        for n in range(40):
+            words = " ".join(random.choice(WORDS) for _ in range(10))
+            draw.text((dpi, dpi + n * size * 1.5), f"{i + 1}.{n + 1} {words}", fill=0, font=font)
+        path = os.path.join(directory, f"page_{dpi}dpi_{i:04d}.png")
+        img.save(path, dpi=(dpi, dpi))
+        paths.append(path)
+    return paths
+
+
+def make_photo_images(directory, count, dpi):
+    """Letter-size colour "phone photos" of text pages: tinted paper, a shadow falling
+    across the page and a slight tilt. Returns the paths and the text of every page."""
+    random.seed(dpi + 1)
+    width, height = int(8.5 * dpi), int(11 * dpi)
+    size = dpi * 12 // 72
+    try:
+        font = ImageFont.load_default(size=size)
+    except TypeError:
+        font = ImageFont.load_default()
+    shadow = Image.linear_gradient("L").resize((width, height)).point(lambda v: 255 - v // 3) # Darker towards the bottom
+    paths, texts = [], []
+    for i in range(count):
+        page = Image.new("L", (width, height), 255)
+        draw = ImageDraw.Draw(page)
+        lines = [f"{i + 1}.{n + 1} " + " ".join(random.choice(WORDS) for _ in range(8)) for n in range(30)]
+        for n, line in enumerate(lines):
+            draw.text((dpi, dpi + n * size * 1.5), line, fill=40, font=font)
+        page = page.rotate(random.uniform(-3, 3), resample=Image.BICUBIC, fillcolor=255)
+        lit = ImageChops.multiply(page, shadow)
+        img = Image.merge("RGB", (lit, lit.point(lambda v: v * 0.95), lit.point(lambda v: v * 0.85))) # Yellowish paper
+        path = os.path.join(directory, f"photo_{dpi}dpi_{i:04d}.jpg")
+        img.save(path, quality=90, dpi=(dpi, dpi))
+        paths.append(path)
+        texts.append("\n".join(lines))
+    return paths, texts
+
+
+def word_accuracy(expected, recognised):
+    """Share of the expected words that were recognised, in order."""
+    expected, recognised = expected.split(), recognised.split()
+    matcher = difflib.SequenceMatcher(None, expected, recognised, autojunk=False)
+    return sum(block.size for block in matcher.get_matching_blocks()) / max(1, len(expected))
+
+
+WORDS = ("invoice", "total", "amount", "customer", "payment", "due", "account", "balance",
+         "order", "shipping", "quantity", "price", "tax", "net", "date", "reference")
+
+
+def make_text_pdf(path, pages):
+    """A PDF with a selectable, table-like text layer (monospaced columns) on every page."""
+    random.seed(pages)
+    layout = TextLayout(font="courier", font_size=10)
+    lines = (f"{'Item ' + str(n):<24}{random.uniform(0, 9999):>12.2f}{random.uniform(0, 9999):>12.2f}{random.randint(0, 999):>8}"
+             for n in range(pages * layout.lines_per_page))
+    with open(path, "wb") as f:
+        writer = PdfStreamWriter(f, font="courier")
+        for content in layout.pages(lines):
+            writer.add_page(content)
+        writer.close()
+    return path
+
+
+def make_delimited_file(path, rows):
+    random.seed(rows)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("id,date,customer,amount,quantity,note\n")
+        for n in range(rows):
+            f.write(f"{n},2024-{n % 12 + 1:02d}-{n % 28 + 1:02d},{random.choice(WORDS)} {n % 997},"
+                    f"{random.uniform(0, 1000):.2f},{random.randint(1, 50)},{random.choice(WORDS)}\n")
+    return path
+
+
+def make_plain_text(path, megabytes):
+    random.seed(megabytes)
+    with open(path, "w", encoding="utf-8") as f:
+        n = 0
+        while f.tell() < megabytes * 1024 * 1024:
+            n += 1
+            words = " ".join(random.choice(WORDS) for _ in range(random.choice((3, 8, 15, 40))))
+            f.write(f"2024-05-01 12:{n // 60 % 60:02d}:{n % 60:02d} INFO job-{n % 8} {words}\n")
+    return path
+
+
+# --- Conversion Benchmarks ---
+def peak_memory_mb():
+    """Peak resident memory of this process and of its (finished) child processes, in MB."""
+    if os.name == "nt":
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", ctypes.c_ulong), ("PageFaultCount", ctypes.c_ulong)] + \
+                       [(name, ctypes.c_size_t) for name in ("PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                                                             "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                                                             "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+        counters = Counters(cb=ctypes.sizeof(Counters))
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+        return round(counters.PeakWorkingSetSize / 2 ** 20, 1), None
+    import resource
+    unit = 1 if sys.platform == "darwin" else 1024 # ru_maxrss is bytes on macOS, KB elsewhere
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit
+    return round(own / 2 ** 20, 1), round(children / 2 ** 20, 1) if children else None
+
+
+def _run_case(function, args, kwargs):
+    # Runs in a fresh process, so the peak memory belongs to this conversion alone
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    return elapsed, result.pages, peak_memory_mb()
+
+
+def conversion_cases(args, work_dir):
+    """Generate the inputs and return the cases as (name, function, args, kwargs, items, unit, input paths)."""
+    def wanted(name): # name can also be the start of a group of cases
+        return not args.only or any(name.startswith(prefix) or prefix.startswith(name) for prefix in args.only)
+
+    cases = []
+    if wanted("images-to-pdf"):
+        pytesseract = tesseract() # Honours TESSERACT_CMD, like the conversions
+        try:
+            pytesseract.get_tesseract_version()
+        except pytesseract.TesseractNotFoundError:
+            print("Tesseract was not found; skipping the image to PDF (OCR) cases.", file=sys.stderr)
+        else:
+            for dpi in args.dpi:
+                images = make_text_images(work_dir, args.images, dpi)
+                cases.append((f"images-to-pdf {dpi}dpi", images_to_pdf, (images, os.path.join(work_dir, f"ocr_{dpi}.pdf")),
+                              {"workers": args.workers}, len(images), "pages", images))
+
+    if wanted("pdf-to-"):
+        pdf = make_text_pdf(os.path.join(work_dir, "report.pdf"), args.pdf_pages)
+        cases += [
+            ("pdf-to-text", pdf_to_text, (pdf, os.path.join(work_dir, "report.txt")), {"workers": args.workers}, args.pdf_pages, "pages", [pdf]),
+            ("pdf-to-excel xlsx", pdf_to_structured, (pdf, os.path.join(work_dir, "report.xlsx")), {"workers": args.workers}, args.pdf_pages, "pages", [pdf]),
+            ("pdf-to-excel csv", pdf_to_structured, (pdf, os.path.join(work_dir, "report.csv")), {"workers": args.workers}, args.pdf_pages, "pages", [pdf]),
+        ]
+    if wanted("text-to-pdf"):
+        text = make_plain_text(os.path.join(work_dir, "log.txt"), args.text_mb)
+        cases.append(("text-to-pdf", text_file_to_pdf, (text, os.path.join(work_dir, "log.pdf")), {"workers": args.workers}, None, "pages", [text]))
+    if wanted("text-to-excel"):
+        table = make_delimited_file(os.path.join(work_dir, "export.txt"), args.rows)
+        cases += [
+            ("text-to-excel xlsx", text_to_structured, (table, os.path.join(work_dir, "export.xlsx")), {}, args.rows, "rows", [table]),
+            ("text-to-excel csv", text_to_structured, (table, os.path.join(work_dir, "export.csv")), {}, args.rows, "rows", [table]),
+        ]
+    return [case for case in cases if not args.only or any(case[0].startswith(prefix) for prefix in args.only)]
+
+
+def bench_conversions(args):
+    results = []
+    spawn = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="conversion-bench-") as work_dir:
+        print("Generating the synthetic corpus...", file=sys.stderr)
+        cases = conversion_cases(args, work_dir)
+        for name, function, call_args, kwargs, items, unit, inputs in cases:
+            input_mb = sum(os.path.getsize(path) for path in inputs) / 2 ** 20
+            runs = []
+            for _ in range(args.repeat):
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                    runs.append(pool.submit(_run_case, function, call_args, kwargs).result())
+            seconds = min(run[0] for run in runs)
+            items = items or runs[0][1] # text-to-pdf: the number of pages written
+            memory, workers_memory = max(run[2][0] for run in runs), runs[0][2][1]
+            results.append({"case": name, "items": items, "unit": unit, "input_mb": round(input_mb, 2),
+                            "seconds": round(seconds, 3), "items_per_second": round(items / seconds, 2),
+                            "mb_per_second": round(input_mb / seconds, 2), "peak_rss_mb": memory,
+                            "workers_peak_rss_mb": workers_memory})
+            print(f"{name:<20} {items:>8} {unit:<5} {seconds:8.2f} s  {items / seconds:10.1f} {unit}/s  "
+                  f"{input_mb / seconds:7.2f} MB/s  peak {memory} MB")
+    return results
+
+
+def bench_ocr_backends(args):
+    backends = ["subprocess"]
+    if tesserocr_available():
+        backends.append("tesserocr")
+    else:
+        print("tesserocr is not installed; only timing the subprocess backend.", file=sys.stderr)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="ocr-bench-") as work_dir:
+        paths = make_receipt_images(work_dir, args.images)
+        for backend in backends:
+            for workers in args.workers:
+                start = time.perf_counter()
+                failures = sum(1 for _, _, error in ocr_images(paths, workers=workers, backend=backend) if error)
+                elapsed = time.perf_counter() - start
+                results.append({"backend": backend, "workers": workers, "images": len(paths), "failures": failures,
+                                "seconds": round(elapsed, 3), "images_per_second": round(len(paths) / elapsed, 2)})
+                print(f"{backend:<11} workers={workers:<3} {elapsed:8.2f} s  {len(paths) / elapsed:8.2f} images/s  failures={failures}")
+    return results
+
+
+def bench_preprocess(args):
+    settings = [("off", None), ("on", Preprocessing(target_dpi=args.target_dpi))]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="preprocess-bench-") as work_dir:
+        print("Generating the photographed pages...", file=sys.stderr)
+        paths, texts = make_photo_images(work_dir, args.images, args.dpi)
+        for name, preprocessing in settings:
+            start = time.perf_counter()
+            accuracies = []
+            failures = 0
+            for (_, outputs, error), text in zip(ocr_images(paths, ("txt",), workers=args.workers, preprocessing=preprocessing), texts):
+                if error:
+                    failures += 1
+                    accuracies.append(0.0)
+                else:
+                    accuracies.append(word_accuracy(text, outputs["txt"].decode("utf-8")))
+            elapsed = time.perf_counter() - start
+            accuracy = sum(accuracies) / len(accuracies)
+            results.append({"preprocessing": name, "dpi": args.dpi, "images": len(paths), "failures": failures,
+                            "seconds": round(elapsed, 3), "images_per_second": round(len(paths) / elapsed, 2),
+                            "word_accuracy": round(accuracy, 4)})
+            print(f"preprocessing {name:<4} {elapsed:8.2f} s  {len(paths) / elapsed:8.2f} images/s  "
+                  f"word accuracy {accuracy:6.1%}  failures={failures}")
+    return results
+
+
+# --- Startup Benchmark ---
+# The GUI must open without loading the conversion libraries; they are imported by the
+# conversion that needs them. Every run starts a fresh interpreter, imports the
+# application (and optionally opens the window) and reports which heavy modules got
+# loaded along the way. Exits non-zero when over budget, so it can guard CI.
+HEAVY_MODULES = ("pandas", "numpy", "PyPDF2", "fpdf", "pytesseract", "PIL", "openpyxl", "tesserocr")
+
+_STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import ImageAndTextPDFTools
+imported = time.perf_counter() - start
+window = None
+if {window!r}:
+    app = ImageAndTextPDFTools.App()
+    app.update()
+    window = time.perf_counter() - start
+    app.destroy()
+print(json.dumps({{"import_seconds": imported, "window_seconds": window,
+                  "heavy_modules": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def bench_startup(args):
+    script = _STARTUP_SCRIPT.format(window=args.window, heavy=HEAVY_MODULES)
+    runs = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+        elapsed = time.perf_counter() - start
+        if completed.returncode != 0:
+            sys.exit(f"Starting the application failed:\n{completed.stderr}")
+        runs.append((elapsed, json.loads(completed.stdout.splitlines()[-1])))
+    elapsed, run = min(runs, key=lambda item: item[0])
+    startup = run["window_seconds"] if args.window else run["import_seconds"]
+    ok = not run["heavy_modules"] and (args.budget is None or startup <= args.budget)
+    result = {"process_seconds": round(elapsed, 3), "import_seconds": round(run["import_seconds"], 3),
+              "window_seconds": run["window_seconds"] and round(run["window_seconds"], 3),
+              "heavy_modules": run["heavy_modules"], "budget_seconds": args.budget, "ok": ok}
+    print(f"process {elapsed:.3f} s  import {run['import_seconds']:.3f} s"
+          + (f"  window {run['window_seconds']:.3f} s" if args.window else "")
+          + f"  heavy modules: {', '.join(run['heavy_modules']) or 'none'}  {'OK' if ok else 'FAILED'}")
+    return [result]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmarks for the document conversions.")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    sub = subparsers.add_parser("ocr-backends", help="Per-call tesseract subprocess vs persistent tesserocr workers")
+    sub.add_argument("--images", type=int, default=50, help="Number of small synthetic receipt images")
+    sub.add_argument("--workers", type=int, nargs="+", default=[1, default_worker_count()], help="Worker counts to try")
+    sub.set_defaults(run=bench_ocr_backends)
+
+    sub = subparsers.add_parser("conversions", help="Throughput and peak memory of every conversion on a synthetic corpus")
+    sub.add_argument("--images", type=int, default=10, help="Scanned pages per resolution for the OCR cases")
+    sub.add_argument("--dpi", type=int, nargs="+", default=[150, 300], help="Resolutions of the scanned pages")
+    sub.add_argument("--pdf-pages", type=int, default=200, help="Pages of the text PDF")
+    sub.add_argument("--text-mb", type=int, default=10, help="Size of the plain text file in MB")
+    sub.add_argument("--rows", type=int, default=200000, help="Rows of the delimited text file")
+    sub.add_argument("--workers", type=int, help="Worker processes (default: CPU core count)")
+    sub.add_argument("--repeat", type=int, default=1, help="Runs per case; the fastest one is reported")
+    sub.add_argument("--only", nargs="+", help="Only run the cases starting with these names, e.g. pdf-to-text text-to-excel")
+    sub.set_defaults(run=bench_conversions)
+
+    sub = subparsers.add_parser("preprocess", help="OCR time and word accuracy with and without image preprocessing")
+    sub.add_argument("--images", type=int, default=10, help="Number of photographed pages")
+    sub.add_argument("--dpi", type=int, default=600, help="Resolution of the photographed pages")
+    sub.add_argument("--target-dpi", type=int, default=300, help="Resolution the preprocessing downsamples to")
+    sub.add_argument("--workers", type=int, help="Worker processes (default: CPU core count)")
+    sub.set_defaults(run=bench_preprocess)
+
+    sub = subparsers.add_parser("startup", help="Time to import the application (and open its window) in a fresh interpreter")
+    sub.add_argument("--window", action="store_true", help="Also create and draw the main window (needs a display)")
+    sub.add_argument("--budget", type=float, help="Fail when startup takes longer than this many seconds")
+    sub.add_argument("--repeat", type=int, default=5, help="Runs; the fastest one is reported")
+    sub.set_defaults(run=bench_startup)
+    return parser
+
+
+def environment():
+    pytesseract = tesseract()
+    try:
+        version = str(pytesseract.get_tesseract_version())
+    except pytesseract.TesseractNotFoundError:
+        version = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "tesseract": version, "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    results = args.run(args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": args.benchmark, "environment": environment(), "results": results}, f, indent=2)
+    return 0 if all(result.get("ok", True) for result in results) else 1
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,476 @@
+import asyncio
+import collections
+import inspect
+import json
+import mimetypes
+import os
+import re
+import secrets
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from conversions import CONVERSIONS, IMAGE_EXTENSIONS, ConversionError
+from image_preprocess import Preprocessing, preprocessing_steps
+from page_checks import PageChecks
+
+# --- Local HTTP Conversion Service ---
+# Lets other services on the same machine run the conversions over HTTP. Uploads are
+# streamed to disk and become jobs in a bounded queue; a fixed number of jobs run at a
+# time on a thread pool (the conversions themselves use process pools for the heavy
+# work). When the queue is full, uploads are refused with 503 and Retry-After instead
+# of piling up. Only the standard library is used; every response closes the connection.
+#
+#   POST   /convert/<conversion>?options   body: the file (a .zip of images for images-to-pdf)
+#   GET    /jobs/<id>                      job status as JSON
+#   GET    /jobs/<id>/result?wait=30       the output file, once the job is done (output=N: extra outputs)
+#   DELETE /jobs/<id>                      cancel the job and delete its files
+#   GET    /status                         queue length, running jobs and throughput
+
+DEFAULT_PORT = 8765
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+MAX_EXTRACTED_BYTES = 2 * 1024 * 1024 * 1024 # Images unpacked from one zip upload, at most
+MAX_ZIP_MEMBERS = 10_000
+MAX_HEADER_BYTES = 64 * 1024
+IO_CHUNK_BYTES = 256 * 1024
+HEADER_TIMEOUT_SECONDS = 30
+KEEP_RESULTS_SECONDS = 3600 # Finished jobs and their files are deleted after this
+THROUGHPUT_WINDOW_SECONDS = 300
+
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 411: "Length Required", 413: "Payload Too Large", 422: "Unprocessable Entity",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+# Query parameters of each conversion -> (keyword argument, parser)
+_OPTIONS = {
+    "images-to-pdf": {"lang": ("lang", str), "sidecars": ("sidecars", lambda value: [kind for kind in value.split(",") if kind]),
+                      "preprocess": ("preprocessing", lambda value: Preprocessing(preprocessing_steps(value))),
+                      "blank": ("checks", lambda value: {"blank": value}),
+                      "rotate": ("checks", lambda value: {"orientation": _flag(value)})},
+    "pdf-to-text": {"pages": ("page_range", str)},
+    "pdf-to-searchable-pdf": {"lang": ("lang", str)},
+    "text-to-pdf": {"page_numbers": ("page_numbers", lambda value: _flag(value))},
+    "pdf-to-excel": {"format": ("file_type", str), "tables": ("tables", lambda value: _flag(value))},
+    "text-to-excel": {"format": ("file_type", str)},
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def _flag(value):
+    if value.lower() in ("1", "true", "yes", "on"):
+        return True
+    if value.lower() in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"expected true or false, not '{value}'")
+
+
+class Job:
+    def __init__(self, conversion, directory, inputs, output_path, options):
+        self.id = os.path.basename(directory)
+        self.conversion = conversion
+        self.directory = directory
+        self.inputs = inputs
+        self.output_path = output_path
+        self.options = options
+        self.status = "queued"
+        self.error = None
+        self.result = None
+        self.created = time.time()
+        self.started = self.finished_at = None
+        self.cancel = threading.Event()
+        self.deleted = False
+        self.finished = asyncio.Event()
+
+    def outputs(self):
+        if self.result is None:
+            return []
+        return [self.result.output_path] + list(self.result.extra_outputs)
+
+    def describe(self):
+        info = {"id": self.id, "conversion": self.conversion, "status": self.status, "created": self.created,
+                "started": self.started, "finished": self.finished_at}
+        if self.error:
+            info["error"] = self.error
+        if self.result is not None:
+            info.update(pages=self.result.pages, stats=self.result.stats, warnings=self.result.warnings,
+                        failed=[{"input": os.path.basename(path), "error": error} for path, error in self.result.failed],
+                        outputs=[{"name": os.path.basename(path), "url": f"/jobs/{self.id}/result?output={n}"}
+                                 for n, path in enumerate(self.outputs())])
+        return info
+
+
+class ConversionService:
+    """Serve the conversions over HTTP on host:port (localhost by default).
+
+    jobs conversions run at a time; at most queue_size more wait. make_options() is
+    called once per worker thread for options shared by every job (workers, cache, index).
+    """
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, jobs=1, queue_size=16, max_upload_bytes=MAX_UPLOAD_BYTES,
+                 work_dir=None, keep_seconds=KEEP_RESULTS_SECONDS, make_options=None):
+        self.host = host
+        self.port = port
+        self.jobs = jobs
+        self.queue_size = queue_size
+        self.max_upload_bytes = max_upload_bytes
+        self.keep_seconds = keep_seconds
+        self.make_options = make_options or dict
+        self.work_dir = work_dir
+        self._jobs = {}
+        self._queue = None
+        self._executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="conversion")
+        self._thread_options = threading.local()
+        self._running = 0
+        self._receiving = 0 # Uploads that passed the queue check and still count against it
+        self._rejected = 0
+        self._totals = collections.Counter() # done / failed / cancelled
+        self._recent = collections.deque() # (finish time, seconds, pages) of recent jobs
+        self._started = time.time()
+
+    async def serve(self):
+        self._queue = asyncio.Queue()
+        temporary = self.work_dir is None
+        self.work_dir = self.work_dir or tempfile.mkdtemp(prefix="conversion-service-")
+        os.makedirs(self.work_dir, exist_ok=True)
+        server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_HEADER_BYTES)
+        workers = [asyncio.create_task(self._work()) for _ in range(self.jobs)]
+        cleaner = asyncio.create_task(self._clean_up())
+        address = server.sockets[0].getsockname()
+        print(f"Serving conversions on http://{address[0]}:{address[1]} ({self.jobs} job(s) at a time, "
+              f"queue of {self.queue_size}, files in {self.work_dir})", file=sys.stderr, flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in workers + [cleaner]:
+                task.cancel()
+            for job in self._jobs.values():
+                job.cancel.set()
+            self._executor.shutdown(wait=True)
+            if temporary:
+                shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    # --- Jobs ---
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            if job.status != "queued": # Cancelled while waiting
+                continue
+            job.status = "running"
+            job.started = time.time()
+            self._running += 1
+            try:
+                job.result = await loop.run_in_executor(self._executor, self._convert, job)
+                job.status = "cancelled" if job.result.cancelled else "done"
+            except ConversionError as e:
+                job.status, job.error = "failed", str(e)
+            except Exception as e:
+                job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+            finally:
+                self._running -= 1
+            if job.cancel.is_set():
+                job.status = "cancelled"
+            job.finished_at = time.time()
+            self._totals[job.status] += 1
+            self._recent.append((job.finished_at, job.finished_at - job.started, job.result.pages if job.result else 0))
+            job.finished.set()
+            if job.deleted:
+                self._forget(job)
+
+    def _convert(self, job):
+        # On a worker thread
+        options = getattr(self._thread_options, "options", None)
+        if options is None:
+            options = self._thread_options.options = self.make_options()
+        function, _, _, merges_inputs = CONVERSIONS[job.conversion]
+        kwargs = {name: value for name, value in options.items() if name in _accepted(function)}
+        kwargs.update(job.options)
+        return function(job.inputs if merges_inputs else job.inputs[0], job.output_path, cancel=job.cancel, **kwargs)
+
+    async def _clean_up(self):
+        while True:
+            await asyncio.sleep(60)
+            expired = [job for job in self._jobs.values()
+                       if job.finished.is_set() and time.time() - job.finished_at > self.keep_seconds]
+            for job in expired:
+                self._forget(job)
+
+    def _forget(self, job):
+        self._jobs.pop(job.id, None)
+        shutil.rmtree(job.directory, ignore_errors=True)
+
+    def _queued(self):
+        return sum(1 for job in self._jobs.values() if job.status == "queued")
+
+    def status(self):
+        now = time.time()
+        while self._recent and now - self._recent[0][0] > THROUGHPUT_WINDOW_SECONDS:
+            self._recent.popleft()
+        window = min(THROUGHPUT_WINDOW_SECONDS, now - self._started) or 1
+        seconds = [item[1] for item in self._recent]
+        return {"queued": self._queued(), "receiving": self._receiving, "running": self._running, "queue_size": self.queue_size, "jobs": self.jobs,
+                "completed": dict(self._totals), "rejected": self._rejected, "uptime_seconds": round(now - self._started),
+                "throughput": {"window_seconds": round(window), "jobs_per_minute": round(len(seconds) * 60 / window, 2),
+                               "pages_per_second": round(sum(item[2] for item in self._recent) / window, 3),
+                               "mean_job_seconds": round(sum(seconds) / len(seconds), 3) if seconds else None}}
+
+    # --- HTTP ---
+    async def _handle(self, reader, writer):
+        try:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HEADER_TIMEOUT_SECONDS)
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+                return
+            try:
+                method, target, headers = _parse_head(head)
+                await self._route(method, target, headers, reader, writer)
+            except HttpError as e:
+                await _send_json(writer, e.status, {"error": str(e)}, e.headers)
+            except Exception as e:
+                await _send_json(writer, 500, {"error": f"{type(e).__name__}: {e}"})
+        except ConnectionError:
+            pass # The client went away
+        finally:
+            writer.close()
+
+    async def _route(self, method, target, headers, reader, writer):
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.strip("/").split("/")]
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if parts == ["status"]:
+            _allow(method, "GET")
+            await _send_json(writer, 200, self.status())
+        elif len(parts) == 2 and parts[0] == "convert":
+            _allow(method, "POST")
+            await self._submit(parts[1], query, headers, reader, writer)
+        elif len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self._jobs.get(parts[1])
+            if job is None:
+                raise HttpError(404, f"No job '{parts[1]}' (finished jobs are kept for {self.keep_seconds} s).")
+            if len(parts) == 3 and parts[2] == "result":
+                _allow(method, "GET")
+                await self._send_result(job, query, writer)
+            elif len(parts) == 2 and method == "DELETE":
+                job.cancel.set()
+                job.deleted = True
+                if job.status == "queued":
+                    job.status = "cancelled"
+                    self._totals["cancelled"] += 1
+                    job.finished_at = time.time()
+                    job.finished.set()
+                if job.status != "running": # A running job is forgotten once it stops
+                    self._forget(job)
+                await _send_json(writer, 200, job.describe())
+            elif len(parts) == 2:
+                _allow(method, "GET")
+                await _send_json(writer, 200, job.describe())
+            else:
+                raise HttpError(404, "Not found.")
+        else:
+            raise HttpError(404, "Not found. Use POST /convert/<conversion>, GET /jobs/<id>[/result] or GET /status.")
+
+    async def _submit(self, conversion, query, headers, reader, writer):
+        if conversion not in CONVERSIONS:
+            raise HttpError(404, f"Unknown conversion '{conversion}'. Use one of: {', '.join(CONVERSIONS)}.")
+        options = _job_options(conversion, query)
+        if self._queued() + self._receiving >= self.queue_size:
+            self._rejected += 1
+            raise HttpError(503, "The conversion queue is full, try again later.", {"Retry-After": "5"})
+        self._receiving += 1 # Holds a queue slot until the job is queued or the upload fails
+        try:
+            job = await self._receive(conversion, options, query, headers, reader)
+        finally:
+            self._receiving -= 1
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job)
+        await _send_json(writer, 202, dict(job.describe(), status_url=f"/jobs/{job.id}", result_url=f"/jobs/{job.id}/result"),
+                         {"Location": f"/jobs/{job.id}"})
+
+    async def _receive(self, conversion, options, query, headers, reader):
+        if "transfer-encoding" in headers:
+            raise HttpError(411, "Send the file with a Content-Length.")
+        try:
+            length = int(headers["content-length"])
+        except (KeyError, ValueError):
+            raise HttpError(411, "Send the file with a Content-Length.") from None
+        if length > self.max_upload_bytes:
+            raise HttpError(413, f"The upload is larger than the limit of {self.max_upload_bytes // (1024 * 1024)} MB.")
+        if length == 0:
+            raise HttpError(400, "The request has no file.")
+
+        directory = os.path.join(self.work_dir, secrets.token_hex(8))
+        os.makedirs(directory)
+        try:
+            name = _upload_name(query.get("filename"), headers.get("content-type"), conversion)
+            # In a folder of its own, so no file name can clash with images/ or output/
+            upload_path = os.path.join(directory, "upload", name)
+            os.makedirs(os.path.dirname(upload_path))
+            with open(upload_path, "wb") as f:
+                remaining = length
+                while remaining:
+                    chunk = await reader.read(min(IO_CHUNK_BYTES, remaining))
+                    if not chunk:
+                        raise HttpError(400, "The upload ended early.")
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            inputs = [upload_path]
+            if conversion == "images-to-pdf":
+                # Unpacking can take a while; off the event loop, so other requests are still served
+                inputs = await asyncio.get_running_loop().run_in_executor(
+                    None, _zip_images, upload_path, os.path.join(directory, "images")) or inputs
+            _, _, extension, _ = CONVERSIONS[conversion]
+            if options.get("file_type"):
+                extension = "." + options["file_type"]
+            output_path = os.path.join(directory, "output", os.path.splitext(os.path.basename(name))[0] + extension)
+            os.makedirs(os.path.dirname(output_path))
+        except BaseException:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        return Job(conversion, directory, inputs, output_path, options)
+
+    async def _send_result(self, job, query, writer):
+        try:
+            wait = min(float(query.get("wait", 0)), 3600)
+        except ValueError:
+            raise HttpError(400, "wait must be a number of seconds.") from None
+        if wait > 0 and not job.finished.is_set():
+            try:
+                await asyncio.wait_for(job.finished.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+        if job.status in ("queued", "running"):
+            raise HttpError(409, f"Job {job.id} is {job.status}; try again later or pass ?wait=<seconds>.", {"Retry-After": "2"})
+        if job.status == "failed" or job.result is None:
+            await _send_json(writer, 422, job.describe())
+            return
+        outputs = job.outputs()
+        try:
+            path = outputs[int(query.get("output", 0))]
+        except (ValueError, IndexError):
+            raise HttpError(404, f"Job {job.id} has {len(outputs)} output(s).") from None
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/"):
+            content_type += "; charset=utf-8"
+        size = os.path.getsize(path)
+        writer.write(_response_head(200, {"Content-Type": content_type, "Content-Length": str(size),
+                                          "Content-Disposition": _content_disposition(os.path.basename(path))}))
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(IO_CHUNK_BYTES), b""):
+                writer.write(chunk)
+                await writer.drain()
+
+
+def _accepted(function):
+    return inspect.signature(function).parameters
+
+
+def _job_options(conversion, query):
+    options = {}
+    for name, value in query.items():
+        if name == "filename":
+            continue
+        if name not in _OPTIONS[conversion]:
+            raise HttpError(400, f"Unknown option '{name}' for {conversion}. Use: {', '.join(list(_OPTIONS[conversion]) + ['filename'])}.")
+        keyword, parse = _OPTIONS[conversion][name]
+        try:
+            parsed = parse(value)
+        except ValueError as e:
+            raise HttpError(400, f"Invalid value for {name}: {e}") from None
+        if isinstance(parsed, dict): # Fields of one options object, e.g. the page checks
+            options.setdefault(keyword, {}).update(parsed)
+        else:
+            options[keyword] = parsed
+    if "checks" in options:
+        try:
+            options["checks"] = PageChecks(**options["checks"])
+        except ValueError as e:
+            raise HttpError(400, f"Invalid value for blank: {e}") from None
+    return options
+
+
+def _upload_name(filename, content_type, conversion):
+    # No control characters (CR/LF would end the Content-Disposition header) or quotes
+    name = re.sub(r'[\x00-\x1f\x7f"]', "", os.path.basename((filename or "").replace("\\", "/"))).strip(". ")
+    if not name:
+        extension = mimetypes.guess_extension((content_type or "").split(";")[0].strip()) or CONVERSIONS[conversion][1][0]
+        name = "input" + extension
+    return name
+
+
+def _content_disposition(name):
+    # A plain ASCII filename for old clients, and the real name as RFC 5987 UTF-8
+    fallback = name.encode("ascii", "replace").decode("ascii").replace("?", "_")
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(name, safe='')}"
+
+
+def _zip_images(upload_path, directory):
+    # The extracted images of a zip upload, or None for any other file
+    if not zipfile.is_zipfile(upload_path):
+        return None
+    return _extract_images(upload_path, directory)
+
+
+def _extract_images(zip_path, directory):
+    # Only the images, in name order; nothing is written outside directory
+    os.makedirs(directory)
+    paths = []
+    with zipfile.ZipFile(zip_path) as archive:
+        members = archive.infolist()
+        if len(members) > MAX_ZIP_MEMBERS:
+            raise HttpError(413, f"The zip file has more than {MAX_ZIP_MEMBERS} files.")
+        images = [info for info in members if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS)]
+        # file_size is what a member unpacks to; zipfile never reads past it
+        if sum(info.file_size for info in images) > MAX_EXTRACTED_BYTES:
+            raise HttpError(413, f"The images in the zip file unpack to more than {MAX_EXTRACTED_BYTES // (1024 * 1024)} MB.")
+        names = sorted(info.filename for info in images)
+        for n, member in enumerate(names):
+            path = os.path.join(directory, f"{n:05d}_{os.path.basename(member)}")
+            with archive.open(member) as source, open(path, "wb") as target:
+                shutil.copyfileobj(source, target, IO_CHUNK_BYTES)
+            paths.append(path)
+    if not paths:
+        raise HttpError(400, "The zip file contains no images.")
+    return paths
+
+
+def _allow(method, allowed):
+    if method != allowed:
+        raise HttpError(405, f"Use {allowed}.", {"Allow": allowed})
+
+
+def _parse_head(head):
+    try:
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "Malformed request line.") from None
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    return method.upper(), target, headers
+
+
+def _response_head(status, headers):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"] + [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines + ["Connection: close", "", ""])).encode("latin-1")
+
+
+async def _send_json(writer, status, data, headers=None):
+    body = json.dumps(data, indent=1).encode("utf-8")
+    writer.write(_response_head(status, dict(headers or {}, **{"Content-Type": "application/json", "Content-Length": str(len(body))})))
+    writer.write(body)
+    await writer.drain()
@@ -0,0 +1,658 @@
+import functools
+import glob
+import io
+import os
+from contextlib import closing, nullcontext
+from dataclasses import dataclass, field
+
+import metrics # Per-stage timings of every conversion
+from ocr_engine import ocr_images # Parallel OCR across CPU cores
+from ocr_sidecars import SIDECAR_KINDS, SidecarWriter
+from page_checks import CHECKS_KIND
+from search_index import file_hash # Full-text search over the extracted pages
+
+# --- Headless Conversion API ---
+# Every conversion offered by the GUI lives here as a plain function so it can also run
+# from the command line (converter_cli.py) or on machines without a display. Functions
+# report progress through an optional ``progress(message)`` callback, stop between pages
+# once the optional ``cancel`` event (threading.Event) is set, and raise ConversionError
+# subclasses for problems the user should be told about. The time spent in each stage
+# is returned in ConversionResult.metrics (see metrics.py). Conversions that produce page
+# text also add it to an optional ``index`` (search_index.SearchIndex).
+#
+# Heavy libraries (pandas, NumPy, PyPDF2, fpdf, Pillow, pytesseract) are imported by the
+# conversion that needs them, the first time it runs, so importing this module - and
+# opening the GUI - stays fast. Keep it that way: no heavy imports at module level here
+# or in the modules imported below.
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tiff", ".tif", ".bmp", ".gif")
+PDF_EXTENSIONS = (".pdf",)
+TEXT_EXTENSIONS = (".txt",)
+
+
+class ConversionError(Exception):
+    pass
+
+
+class EmptyInputError(ConversionError):
+    pass
+
+
+class NoTextFoundError(ConversionError):
+    pass
+
+
+class OcrUnavailableError(ConversionError):
+    pass
+
+
+class ConversionCancelled(ConversionError):
+    pass
+
+
+@dataclass
+class ConversionResult:
+    output_path: str
+    pages: int = 0
+    failed: list = field(default_factory=list) # (input path, error message) pairs
+    warnings: list = field(default_factory=list)
+    cancelled: bool = False # True if the output only holds the pages done before cancelling
+    stats: dict = field(default_factory=dict) # Counters shown in the final status, e.g. cache hits
+    extra_outputs: list = field(default_factory=list) # Sidecars or extra tables written next to output_path
+    metrics: object = None # metrics.Metrics with the time spent per stage
+
+    def stats_summary(self):
+        return ", ".join(f"{name}: {value}" for name, value in self.stats.items())
+
+
+def _report(progress, message):
+    if progress:
+        progress(message)
+
+
+def _cancelled(cancel):
+    return cancel is not None and cancel.is_set()
+
+
+def _instrumented(function):
+    # Collects the stage timings of one conversion call into its result
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with metrics.collect(function.__name__) as job_metrics:
+            with metrics.span("total"):
+                result = function(*args, **kwargs)
+        if result.pages:
+            job_metrics.count("pages", result.pages)
+        for name, value in result.stats.items():
+            job_metrics.count(name, value)
+        result.metrics = job_metrics
+        return result
+    return wrapper
+
+
+def _structured_type(output_path, file_type):
+    file_type = (file_type or os.path.splitext(output_path)[1].lstrip(".")).lower()
+    if file_type not in ("xlsx", "csv"):
+        raise ConversionError(f"Unsupported output format '{file_type}'. Use xlsx or csv.")
+    return file_type
+
+
+def _indexing(index, path):
+    # The search index writer for path's pages, or None when path is already indexed
+    # with its current content
+    if index is None:
+        return nullcontext()
+    with metrics.span("index.hash"):
+        content_hash = file_hash(path)
+    if index.is_current(path, content_hash):
+        metrics.count("index.unchanged")
+        return nullcontext()
+    return index.document(path, content_hash)
+
+
+# --- Image to Searchable PDF ---
+@_instrumented
+def images_to_pdf(image_paths, output_path, workers=None, lang=None, config="", cache=None, ocr_backend=None,
+                  sidecars=(), index=None, preprocessing=None, checks=None, work_dir=None, progress=None, cancel=None):
+    # sidecars: any of "txt", "hocr", "tsv", produced in the same Tesseract pass as the PDF.
+    # With an index, the text of that pass is indexed as the pages of the output PDF.
+    # preprocessing: an image_preprocess.Preprocessing applied to every image before OCR.
+    # checks: a page_checks.PageChecks for skipping blank pages and turning pages upright.
+    # work_dir: keep every finished page there, so a rerun only OCRs the missing pages
+    # (see ocr_checkpoint.py).
+    if not image_paths:
+        raise EmptyInputError("No image files were given.")
+    unknown = set(sidecars) - set(SIDECAR_KINDS)
+    if unknown:
+        raise ConversionError(f"Unknown sidecar format(s): {', '.join(sorted(unknown))}. Use {', '.join(SIDECAR_KINDS)}.")
+
+    import pytesseract
+    from ocr_engine import image_pages
+    from pdf_writer import PdfStreamWriter
+
+    # A work directory always keeps the text, so a run can be resumed with or without the index
+    kinds = ("pdf",) + tuple(sidecars) + (("txt",) if (index is not None or work_dir is not None) and "txt" not in sidecars else ())
+    pages = list(image_pages(image_paths)) # (name, image path, frame) of every page
+    checkpoint = None
+    done = set()
+    if work_dir is not None:
+        from ocr_checkpoint import OcrCheckpoint
+        settings = {"kinds": sorted(kinds), "lang": lang, "config": config,
+                    "options": [options.cache_key() for options in (preprocessing, checks) if options is not None]}
+        try:
+            checkpoint = OcrCheckpoint(work_dir, settings)
+        except ValueError as e:
+            raise ConversionError(str(e)) from None
+        done = {i for i, (_, image_path, frame) in enumerate(pages) if checkpoint.finished(i, image_path, frame)}
+        if done:
+            _report(progress, f"Resuming: {len(done)} page(s) were finished before.")
+
+    result = ConversionResult(output_path)
+    sidecar_writer = SidecarWriter(output_path, sidecars)
+    _report(progress, f"Performing OCR on {len(image_paths)} image(s)...")
+    if cache is not None:
+        hits_before, misses_before = cache.hits, cache.misses
+    try:
+        # Every page is appended to the output as soon as its OCR result comes back (in
+        # the original order of image_paths), so only the pages in flight are in memory
+        with open(output_path, "wb") as out, \
+                (index.document(output_path) if index is not None else nullcontext()) as indexed:
+            writer = PdfStreamWriter(out, font=None)
+            ocr_results = ocr_images(image_paths, kinds, workers=workers, lang=lang, config=config, cache=cache,
+                                     backend=ocr_backend, preprocessing=preprocessing, checks=checks, done=done)
+            with closing(ocr_results):
+                for i, (page_name, image_path, frame) in enumerate(pages):
+                    if _cancelled(cancel):
+                        result.cancelled = True
+                        break
+                    if i in done:
+                        outputs, error = checkpoint.outputs(i), None
+                    else:
+                        _, outputs, error = next(ocr_results)
+                        if checkpoint is not None and error is None:
+                            checkpoint.add(i, image_path, frame, outputs)
+                    if error is None and outputs.get(CHECKS_KIND):
+                        # Counted here so pages from the cache or the work directory count as well
+                        metrics.count("checks.blank_pages" if outputs[CHECKS_KIND] == b"blank" else "checks.rotated_pages")
+                    if error is None and "pdf" not in outputs:
+                        _report(progress, f"Leaving out blank page {os.path.basename(page_name)}")
+                        continue
+                    if error is None:
+                        _report(progress, f"Merging page {i+1}: {os.path.basename(page_name)}...")
+                        try:
+                            with metrics.span("pdf.merge"):
+                                writer.add_pdf_page(outputs["pdf"])
+                            with metrics.span("sidecar.write"):
+                                sidecar_writer.add_page(writer.page_count, outputs)
+                            if indexed is not None:
+                                with metrics.span("index.write"):
+                                    indexed.add_page(writer.page_count, outputs["txt"].decode("utf-8"))
+                            continue
+                        except Exception as e:
+                            error = e
+                    _report(progress, f"Error processing {os.path.basename(page_name)}: {error}")
+                    result.failed.append((page_name, str(error))) # Try to continue with other pages
+
+            if not writer.page_count:
+                if result.cancelled:
+                    raise ConversionCancelled("Conversion cancelled before any page was finished.")
+                if checks is not None and checks.blank == "drop" and not result.failed:
+                    raise ConversionError("All images were blank pages, so no PDF was created.")
+                raise ConversionError("No images were successfully processed to create PDF pages.")
+
+            with metrics.span("pdf.write"):
+                writer.close()
+            result.pages = writer.page_count
+            if indexed is not None:
+                out.close() # Hashed as written
+                indexed.complete(file_hash(output_path))
+        result.extra_outputs = list(sidecar_writer.paths.values())
+        if cache is not None:
+            result.stats["OCR cache hits"] = cache.hits - hits_before
+            result.stats["OCR cache misses"] = cache.misses - misses_before
+        if checkpoint is not None:
+            result.stats["Pages resumed"] = len(done)
+            if result.cancelled or result.failed:
+                result.warnings.append(f"Finished pages are kept in {work_dir}; run the same job again to resume.")
+            else:
+                checkpoint.remove()
+        if checks is not None:
+            counters = metrics.current().counters
+            if checks.blank != "ocr":
+                label = "Blank pages left out" if checks.blank == "drop" else "Blank pages not OCR'd"
+                result.stats[label] = counters.get("checks.blank_pages", 0)
+            if checks.orientation:
+                result.stats["Pages rotated"] = counters.get("checks.rotated_pages", 0)
+    except pytesseract.TesseractNotFoundError:
+        raise OcrUnavailableError("Tesseract-OCR is not installed or not in your PATH. Please install it or set TESSERACT_CMD.") from None
+    finally:
+        sidecar_writer.close()
+        if checkpoint is not None:
+            checkpoint.close()
+        if not result.pages: # No PDF was finished, so don't leave it, its sidecars or its pages behind
+            for path in [output_path] + list(sidecar_writer.paths.values()):
+                _remove_quietly(path)
+            if index is not None:
+                index.remove(output_path)
+    return result
+
+
+# --- Scanned PDF to Searchable PDF ---
+@_instrumented
+def pdf_to_searchable_pdf(pdf_path, output_path, workers=None, lang=None, config="", cache=None, ocr_backend=None,
+                          index=None, progress=None, cancel=None):
+    # Hybrid OCR: pages that already have a text layer are copied unchanged and only the
+    # image-only pages go through Tesseract. Their scan (the largest image on the page) is
+    # OCR'd and just the invisible text layer of the result is laid over the original page,
+    # so no page is re-rendered and born-digital pages cost no OCR at all.
+    if os.path.abspath(output_path) == os.path.abspath(pdf_path):
+        raise ConversionError("The searchable PDF can't replace the input PDF; choose another output path.")
+
+    import tempfile
+    import pytesseract
+    from PyPDF2 import PdfReader
+    from pdf_text import count_pages, map_pages, text_or_scan
+    from pdf_writer import PdfStreamWriter
+
+    result = ConversionResult(output_path)
+    if cache is not None:
+        hits_before, misses_before = cache.hits, cache.misses
+    try:
+        with tempfile.TemporaryDirectory(prefix="pdf-ocr-") as work_dir:
+            # 1. Find the pages without a text layer (in parallel) and save their scans
+            num_pages = count_pages(pdf_path)
+            _report(progress, f"Looking for pages without text in {num_pages} page(s)...")
+            scans = {} # Page index: scan image path
+            texts = {} # Page index: text, only kept for the index
+            no_scan = []
+            with closing(map_pages(pdf_path, text_or_scan, workers=workers, stage="pdf.classify")) as pages:
+                for i, (text, scan) in pages:
+                    if _cancelled(cancel):
+                        raise ConversionCancelled("Conversion cancelled before any page was finished.")
+                    if scan is not None:
+                        extension, data = scan
+                        scans[i] = os.path.join(work_dir, f"page{i+1}{extension}")
+                        with open(scans[i], "wb") as f:
+                            f.write(data)
+                    elif not text.strip():
+                        no_scan.append(i + 1)
+                    elif index is not None:
+                        texts[i] = text
+            if no_scan:
+                result.warnings.append(f"Page(s) {', '.join(map(str, no_scan))} have neither text nor a scan that could be read; copied without OCR.")
+            _report(progress, f"{len(scans)} of {num_pages} page(s) need OCR.")
+
+            # 2. Copy the pages in order, laying each OCR'd text layer over its page as it arrives
+            kinds = ("pdf", "txt")
+            ocr_config = f"{config or ''} -c textonly_pdf=1".strip()
+            ocr_results = ocr_images([scans[i] for i in sorted(scans)], kinds, workers=workers, lang=lang,
+                                     config=ocr_config, cache=cache, backend=ocr_backend)
+            with open(pdf_path, "rb") as source, open(output_path, "wb") as out, closing(ocr_results), \
+                    (index.document(output_path) if index is not None else nullcontext()) as indexed:
+                reader = PdfReader(source)
+                writer = PdfStreamWriter(out, font=None)
+                shared = {} # Fonts and other resources the pages have in common are written once
+                for i, page in enumerate(reader.pages):
+                    if _cancelled(cancel):
+                        result.cancelled = True
+                        break
+                    text = texts.pop(i, "")
+                    if i in scans:
+                        _, outputs, error = next(ocr_results)
+                        if error is None:
+                            _report(progress, f"OCR'd page {i+1}/{num_pages}...")
+                            try:
+                                with metrics.span("pdf.overlay"):
+                                    _overlay_text_layer(page, outputs["pdf"])
+                                text = outputs["txt"].decode("utf-8")
+                            except Exception as e:
+                                error = e
+                        if error is not None: # The page is still copied, just without text
+                            _report(progress, f"Error OCR'ing page {i+1}: {error}")
+                            result.failed.append((f"{pdf_path} page {i+1}", str(error)))
+                    with metrics.span("pdf.merge"):
+                        writer.copy_page(page, shared)
+                    if indexed is not None:
+                        with metrics.span("index.write"):
+                            indexed.add_page(writer.page_count, text)
+
+                if not writer.page_count:
+                    raise ConversionCancelled("Conversion cancelled before any page was finished.")
+                with metrics.span("pdf.write"):
+                    writer.close()
+                result.pages = writer.page_count
+                if indexed is not None:
+                    out.close() # Hashed as written
+                    indexed.complete(file_hash(output_path))
+        ocr_done = len(scans) - len(result.failed)
+        result.stats["Pages with text"] = num_pages - len(scans) - len(no_scan)
+        result.stats["Pages OCR'd"] = ocr_done
+        if cache is not None:
+            result.stats["OCR cache hits"] = cache.hits - hits_before
+            result.stats["OCR cache misses"] = cache.misses - misses_before
+    except pytesseract.TesseractNotFoundError:
+        raise OcrUnavailableError("Tesseract-OCR is not installed or not in your PATH. Please install it or set TESSERACT_CMD.") from None
+    finally:
+        if not result.pages:
+            _remove_quietly(output_path)
+            if index is not None:
+                index.remove(output_path)
+    return result
+
+
+def _overlay_text_layer(page, pdf_data):
+    # Scale Tesseract's one-page text-only PDF onto the page it was made from
+    from PyPDF2 import PdfReader, Transformation
+    overlay = PdfReader(io.BytesIO(pdf_data)).pages[0]
+    box, overlay_box = page.mediabox, overlay.mediabox
+    overlay.add_transformation(Transformation()
+                               .translate(-float(overlay_box.left), -float(overlay_box.bottom))
+                               .scale(float(box.width) / float(overlay_box.width), float(box.height) / float(overlay_box.height))
+                               .translate(float(box.left), float(box.bottom)))
+    overlay.mediabox = overlay.trimbox = box # merge_page() clips the overlay to its trim box
+    page.merge_page(overlay)
+
+
+# --- Searchable PDF to Plain Text ---
+@_instrumented
+def pdf_to_text(pdf_path, output_path, page_range=None, workers=None, index=None, progress=None, cancel=None):
+    # Each page's text is written out (and indexed) as soon as it is extracted, so memory
+    # use doesn't grow with the size of the document
+    from pdf_text import count_pages, extract_page_texts # Page-parallel text extraction
+
+    found_text = False
+    pages_done = 0
+    try:
+        total_pages = count_pages(pdf_path)
+        page_numbers = parse_page_range(page_range, total_pages)
+        num_pages = len(page_numbers)
+        with open(output_path, 'w', encoding='utf-8') as output_file, _indexing(index, pdf_path) as indexed, \
+                closing(extract_page_texts(pdf_path, page_numbers, workers=workers)) as page_texts:
+            for n, (i, page_text) in enumerate(page_texts):
+                if _cancelled(cancel):
+                    break
+                _report(progress, f"Extracted text from page {i+1} ({n+1}/{num_pages})...")
+                if page_text:
+                    with metrics.span("text.write"):
+                        output_file.write(page_text + "\n")
+                    found_text = found_text or bool(page_text.strip())
+                    if indexed is not None:
+                        with metrics.span("index.write"):
+                            indexed.add_page(i + 1, page_text)
+                pages_done += 1
+            if indexed is not None and pages_done == total_pages:
+                indexed.complete()
+    except BaseException:
+        _remove_quietly(output_path)
+        raise
+
+    cancelled = pages_done < num_pages
+    if not found_text:
+        _remove_quietly(output_path)
+        if cancelled:
+            raise ConversionCancelled("Text extraction cancelled before any text was found.")
+        raise NoTextFoundError("No selectable text was found in the PDF. It might be an image-only PDF without an OCR layer.")
+    return ConversionResult(output_path, pages=pages_done, cancelled=cancelled)
+
+
+@_instrumented
+def index_pdf(pdf_path, index, workers=None, progress=None, cancel=None):
+    """Add the text of every page of the PDF to the search index, unless it is already
+    indexed unchanged. Returns a result for the index file."""
+    from pdf_text import count_pages, extract_page_texts
+
+    result = ConversionResult(index.path)
+    with _indexing(index, pdf_path) as indexed:
+        if indexed is None:
+            result.stats["unchanged"] = 1
+            return result
+        num_pages = count_pages(pdf_path)
+        with closing(extract_page_texts(pdf_path, workers=workers)) as page_texts:
+            for i, page_text in page_texts:
+                if _cancelled(cancel):
+                    result.cancelled = True
+                    break
+                _report(progress, f"Indexed page {i+1}/{num_pages}...")
+                with metrics.span("index.write"):
+                    indexed.add_page(i + 1, page_text)
+                result.pages += 1
+        if not result.cancelled:
+            indexed.complete()
+    return result
+
+
+def parse_page_range(page_range, num_pages):
+    """Turn a 1-based spec like "1-5, 8, 10-" into a list of 0-based page indices."""
+    if not page_range or not page_range.strip():
+        return list(range(num_pages))
+    pages = []
+    for part in page_range.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                start, end = part.split("-", 1)
+                start = int(start) if start.strip() else 1
+                end = int(end) if end.strip() else max(start, num_pages) # "10-" runs to the end
+            else:
+                start = end = int(part)
+        except ValueError:
+            raise ConversionError(f"Invalid page range '{part}'. Use e.g. 1-5, 8, 10-") from None
+        if start < 1 or end < 1 or start > num_pages:
+            raise ConversionError(f"Page range '{part}' is outside the document (1-{num_pages}).")
+        if end < start:
+            raise ConversionError(f"Page range '{part}' is reversed; write it as {end}-{start}.")
+        pages.extend(range(start - 1, min(end, num_pages)))
+    if not pages:
+        raise ConversionError(f"Invalid page range '{page_range.strip()}'. Use e.g. 1-5, 8, 10-")
+    return list(dict.fromkeys(pages))
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# --- Plain Text File to PDF ---
+@_instrumented
+def text_file_to_pdf(text_path, output_path, workers=None, page_numbers=False, progress=None, cancel=None):
+    from pdf_writer import PdfStreamWriter
+    from text_pdf import render_text_pages # Streaming, page-parallel text-to-PDF
+
+    with open(text_path, 'r', encoding='utf-8') as f:
+        if not any(line.strip() for line in f): # Stops at the first line with text
+            raise EmptyInputError("The selected text file is empty or contains only whitespace.")
+
+    # Lines are read, laid out and written page by page (large files on several
+    # processes), so memory use stays flat and time grows linearly with the file size
+    _report(progress, "Converting text file to PDF...")
+    result = ConversionResult(output_path)
+    layout_options = {"font": "Arial", "font_size": 12, "page_numbers": page_numbers} # 10 mm lines on A4, as before
+    finished = False
+    try:
+        with closing(render_text_pages(text_path, layout_options, workers)) as pages, open(output_path, 'wb') as out:
+            writer = PdfStreamWriter(out)
+            for content in pages:
+                if _cancelled(cancel):
+                    result.cancelled = True
+                    break
+                with metrics.span("pdf.write"):
+                    writer.add_page(content, compressed=True)
+                if writer.page_count % 100 == 0:
+                    _report(progress, f"Wrote {writer.page_count} pages...")
+            with metrics.span("pdf.write"):
+                writer.close()
+            result.pages = writer.page_count
+        finished = True
+    finally:
+        if not finished:
+            _remove_quietly(output_path)
+    return result
+
+
+# --- PDF to Excel/CSV ---
+@_instrumented
+def pdf_to_structured(pdf_path, output_path, file_type=None, workers=None, tables=True, progress=None, cancel=None):
+    import pandas as pd
+    from pdf_tables import TableCollector, page_layout, table_frame
+    from pdf_text import map_pages
+
+    file_type = _structured_type(output_path, file_type)
+    result = ConversionResult(output_path)
+
+    _report(progress, f"Extracting text from PDF for {file_type.upper()} conversion...")
+    lines = []
+    collector = TableCollector()
+    with closing(map_pages(pdf_path, page_layout, workers=workers, stage="pdf.table_layout")) as layouts:
+        for _, (page_lines, page_tables) in layouts:
+            if _cancelled(cancel):
+                result.cancelled = True
+                break
+            lines.extend(line for line in page_lines if line.strip())
+            collector.add_page(page_tables if tables else [])
+            result.pages += 1
+
+    if result.cancelled and not lines:
+        raise ConversionCancelled("Conversion cancelled before any text was extracted.")
+    if not lines:
+        # Still save an (empty) file, but let the caller know
+        result.warnings.append("No selectable text was found in the PDF. The converted file will be empty.")
+
+    with metrics.span("dataframe.build"):
+        if collector.tables:
+            frames = [table_frame(rows) for rows in collector.tables]
+            result.stats["tables"] = len(frames)
+        else:
+            # No tables (or table detection turned off): one line of text per row
+            frames = [pd.DataFrame(lines, columns=["Extracted Text"])]
+
+    _report(progress, f"Writing {file_type.upper()} file...")
+    with metrics.span(f"{file_type}.write"):
+        if file_type == "xlsx":
+            with pd.ExcelWriter(output_path) as writer:
+                for n, df in enumerate(frames, 1):
+                    df.to_excel(writer, sheet_name=f"Table {n}" if collector.tables else "Sheet1", index=False)
+        else: # csv: the first table goes to output_path, any others next to it
+            stem = os.path.splitext(output_path)[0]
+            for n, df in enumerate(frames, 1):
+                path = output_path if n == 1 else f"{stem}_table{n}.csv"
+                df.to_csv(path, index=False, encoding='utf-8')
+                if n > 1:
+                    result.extra_outputs.append(path)
+    return result
+
+
+# --- Text File to Excel/CSV ---
+@_instrumented
+def text_to_structured(text_path, output_path, file_type=None, chunk_rows=None, progress=None, cancel=None):
+    import pandas as pd
+    from delimited_text import CHUNK_ROWS, CsvChunkWriter, XlsxChunkWriter, read_chunks, read_sample, sniff_format
+
+    file_type = _structured_type(output_path, file_type)
+    sample = read_sample(text_path)
+    if not sample.strip():
+        raise EmptyInputError("The selected text file is empty or contains only whitespace.")
+
+    _report(progress, f"Converting text file to {file_type.upper()}...")
+    delimiter, dtypes = sniff_format(sample)
+    result = ConversionResult(output_path)
+    rows = 0
+    writer = XlsxChunkWriter(output_path) if file_type == "xlsx" else CsvChunkWriter(output_path)
+    finished = False
+    try:
+        for chunk in metrics.timed(read_chunks(text_path, delimiter, dtypes, chunk_rows or CHUNK_ROWS), "dataframe.read_chunk"):
+            # A partial table isn't useful, so a cancelled conversion leaves no file behind
+            if _cancelled(cancel):
+                raise ConversionCancelled("Conversion cancelled.")
+            with metrics.span(f"{file_type}.write"):
+                writer.write(chunk)
+            rows += len(chunk)
+            _report(progress, f"Converted {rows:,} rows...")
+        finished = True
+    except pd.errors.EmptyDataError:
+        raise EmptyInputError("The text file appears to have no data to convert to a structured format.") from None
+    finally:
+        with metrics.span(f"{file_type}.write"):
+            writer.close(discard=not finished)
+        if not finished:
+            _remove_quietly(output_path)
+
+    result.stats["rows"] = rows
+    if file_type == "xlsx" and writer.sheets > 1:
+        result.stats["sheets"] = writer.sheets
+        result.warnings.append(f"The data has more rows than fit on one Excel sheet, so it was split over {writer.sheets} sheets.")
+    return result
+
+
+# --- Batch Jobs ---
+# name: (function, accepted input extensions, output extension, merges all inputs into one output)
+CONVERSIONS = {
+    "images-to-pdf": (images_to_pdf, IMAGE_EXTENSIONS, ".pdf", True),
+    "pdf-to-text": (pdf_to_text, PDF_EXTENSIONS, ".txt", False),
+    "pdf-to-searchable-pdf": (pdf_to_searchable_pdf, PDF_EXTENSIONS, "_ocr.pdf", False),
+    "text-to-pdf": (text_file_to_pdf, TEXT_EXTENSIONS, ".pdf", False),
+    "pdf-to-excel": (pdf_to_structured, PDF_EXTENSIONS, ".xlsx", False),
+    "text-to-excel": (text_to_structured, TEXT_EXTENSIONS, ".xlsx", False),
+}
+
+
+def expand_inputs(patterns, extensions):
+    """Resolve files, directories and glob patterns into a de-duplicated list of input files."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in sorted(os.listdir(pattern))]
+        elif any(char in pattern for char in "*?["):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            paths.append(pattern) # Explicitly named files are taken as-is
+            continue
+        paths.extend(path for path in matches if os.path.isfile(path) and path.lower().endswith(extensions))
+    return list(dict.fromkeys(paths))
+
+
+def run_batch(conversion, inputs, output=None, output_dir=None, progress=None, **options):
+    """Run one conversion over many inputs as a single job.
+
+    Image batches are merged into one PDF; every other conversion writes one output per
+    input, next to it or in ``output_dir``. Extra ``options`` (workers, file_type, ...)
+    are passed through to the conversion function. Returns a list of
+    (input paths, ConversionResult or error message) pairs.
+    """
+    function, extensions, extension, merges_inputs = CONVERSIONS[conversion]
+    paths = expand_inputs(inputs, extensions)
+    if not paths:
+        raise EmptyInputError("No matching input files were found.")
+    if options.get("file_type"):
+        extension = "." + options["file_type"]
+
+    if merges_inputs:
+        output = output or os.path.join(output_dir or os.path.dirname(paths[0]) or ".", "ocr_output" + extension)
+        jobs = [(paths, output)]
+    else:
+        if output and len(paths) > 1:
+            raise ConversionError("A single output path can only be used with one input file; use an output directory instead.")
+        jobs = [([path], output or _output_path(path, output_dir, extension)) for path in paths]
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    outcomes = []
+    for i, (job_inputs, job_output) in enumerate(jobs):
+        _report(progress, f"[{i+1}/{len(jobs)}] {len(job_inputs)} input(s) -> {job_output}")
+        try:
+            outcome = function(job_inputs if merges_inputs else job_inputs[0], job_output, progress=progress, **options)
+        except OcrUnavailableError:
+            raise # Every later job would fail the same way
+        except Exception as e:
+            outcome = str(e)
+        outcomes.append((job_inputs, outcome))
+    return outcomes
+
+
+def _output_path(input_path, output_dir, extension):
+    base = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir or os.path.dirname(input_path), base + extension)
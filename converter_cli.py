@@ -0,0 +1,305 @@
+import argparse
+import asyncio
+import multiprocessing
+import sys
+import time
+from contextlib import nullcontext
+
+import metrics
+from conversion_service import DEFAULT_PORT, MAX_UPLOAD_BYTES, ConversionService
+from conversions import CONVERSIONS, PDF_EXTENSIONS, ConversionError, ConversionResult, expand_inputs, index_pdf, run_batch
+from ocr_backends import BACKENDS
+from ocr_cache import DEFAULT_MAX_BYTES, OcrCache
+from ocr_engine import default_worker_count
+from ocr_sidecars import SIDECAR_KINDS
+from hot_folder import DEFAULT_ROUTES, SETTLE_SECONDS, HotFolder
+from image_preprocess import DEFAULT_DPI, STEPS, Preprocessing, preprocessing_steps
+from page_checks import BLANK_POLICIES, PageChecks
+from search_index import SearchIndex
+
+# --- Command-Line Entry Point ---
+# Runs the same conversions as the GUI without Tk, e.g. on headless Linux workers:
+#   python converter_cli.py images-to-pdf scans/*.png -o scans.pdf --workers 8
+#   python converter_cli.py images-to-pdf archive/ -o archive.pdf --work-dir archive.ocr-work
+#   python converter_cli.py pdf-to-text reports/ --output-dir text/
+#   python converter_cli.py pdf-to-excel "reports/**/*.pdf" --format csv
+#   python converter_cli.py pdf-to-text big.pdf --timings --metrics-jsonl metrics.jsonl
+#   python converter_cli.py pdf-to-text reports/ --index
+#   python converter_cli.py pdf-to-searchable-pdf scanned.pdf --workers 4
+#   python converter_cli.py index "archive/**/*.pdf"
+#   python converter_cli.py search "quarterly revenue" -n 10
+#   python converter_cli.py watch /srv/scans --jobs 2 --pdf pdf-to-excel
+#   python converter_cli.py serve --port 8765 --jobs 2
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Batch document conversions (images, PDF, text, Excel/CSV).")
+    subparsers = parser.add_subparsers(dest="conversion", required=True)
+    for name in CONVERSIONS:
+        sub = subparsers.add_parser(name, help=f"Convert {name.replace('-to-', ' files to ')}")
+        sub.add_argument("inputs", nargs="+", help="Input files, directories or glob patterns")
+        sub.add_argument("-o", "--output", help="Output file (merged PDF for images-to-pdf, otherwise only for a single input)")
+        sub.add_argument("-d", "--output-dir", help="Directory for the output files (default: next to each input)")
+        sub.add_argument("-q", "--quiet", action="store_true", help="Only print the final summary")
+        sub.add_argument("-t", "--timings", action="store_true", help="Print the time spent in each stage of every job")
+        sub.add_argument("--metrics-jsonl", help="Append every job's stage timings and counters to this JSON lines file")
+        sub.add_argument("--metrics-prom", help="Write the stage timings and counters to this Prometheus text file")
+        sub.add_argument("--profile", metavar="PREFIX", help="Profile the run with cProfile and tracemalloc, writing PREFIX.prof, PREFIX.profile.txt and PREFIX.memory.txt")
+        if name in ("images-to-pdf", "pdf-to-text", "pdf-to-searchable-pdf", "text-to-pdf", "pdf-to-excel"):
+            sub.add_argument("-j", "--workers", type=int, help="Number of parallel worker processes (default: CPU core count)")
+        if name in ("images-to-pdf", "pdf-to-searchable-pdf"):
+            sub.add_argument("-l", "--lang", help="Tesseract language(s), e.g. eng or eng+deu")
+            if name == "images-to-pdf":
+                sub.add_argument("--sidecar", dest="sidecars", nargs="+", choices=SIDECAR_KINDS, default=[], help="Also write the OCR text/hOCR/TSV from the same Tesseract pass next to the PDF")
+            sub.add_argument("--ocr-backend", choices=BACKENDS, default="auto", help="subprocess: one tesseract run per image; tesserocr: persistent in-process workers (default: tesserocr if installed)")
+            sub.add_argument("--no-cache", action="store_true", help="Always OCR, don't read or write the OCR result cache")
+            sub.add_argument("--cache-dir", help="OCR result cache directory (default: per-user cache directory)")
+            sub.add_argument("--cache-size-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), help="OCR cache size limit in MB")
+        if name == "images-to-pdf":
+            add_preprocess_arguments(sub)
+            sub.add_argument("--work-dir", help="Keep every finished page in this (new or empty) folder; run the same command again to resume an interrupted batch. The folder is deleted once every page is done")
+        if name == "pdf-to-text":
+            sub.add_argument("-p", "--pages", dest="page_range", help="Pages to extract, e.g. 1-5,8,10- (default: all)")
+        if name in ("images-to-pdf", "pdf-to-text", "pdf-to-searchable-pdf"):
+            sub.add_argument("--index", action="store_true", help="Also add the text of every page to the search index")
+            add_index_file_argument(sub)
+        if name == "text-to-pdf":
+            sub.add_argument("--page-numbers", action="store_true", help="Print \"Page N\" at the bottom of every page")
+        if name == "pdf-to-excel":
+            sub.add_argument("--no-tables", dest="tables", action="store_false", help="Don't detect tables, write one line of text per row")
+        if name in ("pdf-to-excel", "text-to-excel"):
+            sub.add_argument("-f", "--format", dest="file_type", choices=("xlsx", "csv"), default="xlsx", help="Output format (default: xlsx)")
+
+    sub = subparsers.add_parser("index", help="Add the text of PDFs to the search index, skipping unchanged ones")
+    sub.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    sub.add_argument("-j", "--workers", type=int, help="Number of parallel worker processes (default: CPU core count)")
+    sub.add_argument("-q", "--quiet", action="store_true", help="Only print the final summary")
+    add_index_file_argument(sub)
+
+    sub = subparsers.add_parser("search", help="Search the indexed pages")
+    sub.add_argument("query", nargs="+", help="Words that must all occur on the page; \"quoted phrase\", prefix*")
+    sub.add_argument("-n", "--limit", type=int, default=20, help="Number of hits (default: 20)")
+    sub.add_argument("--raw", action="store_true", help="Pass the query to SQLite FTS5 as is (OR, NOT, NEAR(...))")
+    add_index_file_argument(sub)
+
+    sub = subparsers.add_parser("watch", help="Convert every file dropped into hot folders, until Ctrl+C")
+    sub.add_argument("inputs", nargs="+", help="Folders to watch")
+    sub.add_argument("--jobs", type=int, default=1, help="Conversions running at the same time (default: 1)")
+    sub.add_argument("--workers", type=int, help="Worker processes per conversion (default: CPU core count / jobs)")
+    sub.add_argument("--queue-size", type=int, help="Files queued for conversion at most; the rest wait in the folder (default: 2 x jobs)")
+    sub.add_argument("--settle", type=float, default=SETTLE_SECONDS, help=f"Seconds a file must stay unchanged before it is converted (default: {SETTLE_SECONDS:g})")
+    sub.add_argument("--poll", action="store_true", help="Rescan the folders instead of using inotify (e.g. for network shares)")
+    sub.add_argument("--pdf", choices=("pdf-to-text", "pdf-to-searchable-pdf", "pdf-to-excel"), default="pdf-to-text", help="Conversion for PDF files (default: pdf-to-text)")
+    sub.add_argument("--text", choices=("text-to-pdf", "text-to-excel"), default="text-to-pdf", help="Conversion for text files (default: text-to-pdf)")
+    sub.add_argument("-f", "--format", dest="file_type", choices=("xlsx", "csv"), help="Output format of pdf-to-excel and text-to-excel (default: xlsx)")
+    sub.add_argument("-l", "--lang", help="Tesseract language(s), e.g. eng or eng+deu")
+    sub.add_argument("-o", "--output-dir", help="Folder for the outputs (default: output/ in every watched folder)")
+    sub.add_argument("--done-dir", help="Folder for converted inputs (default: done/ in every watched folder)")
+    sub.add_argument("--failed-dir", help="Folder for inputs that failed (default: failed/ in every watched folder)")
+    sub.add_argument("--no-cache", action="store_true", help="Always OCR, don't read or write the OCR result cache")
+    sub.add_argument("--index", action="store_true", help="Also add the text of PDFs and scans to the search index")
+    add_index_file_argument(sub)
+    add_preprocess_arguments(sub)
+
+    sub = subparsers.add_parser("serve", help="Run the conversions as a local HTTP service, until Ctrl+C")
+    sub.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1, this machine only)")
+    sub.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    sub.add_argument("--jobs", type=int, default=1, help="Conversions running at the same time (default: 1)")
+    sub.add_argument("--workers", type=int, help="Worker processes per conversion (default: CPU core count / jobs)")
+    sub.add_argument("--queue-size", type=int, default=16, help="Jobs waiting at most; further uploads get 503 (default: 16)")
+    sub.add_argument("--max-upload-mb", type=int, default=MAX_UPLOAD_BYTES // (1024 * 1024), help="Largest accepted upload in MB")
+    sub.add_argument("--work-dir", help="Folder for uploads and results (default: a temporary folder)")
+    sub.add_argument("--no-cache", action="store_true", help="Always OCR, don't read or write the OCR result cache")
+    sub.add_argument("--index", action="store_true", help="Also add the text of PDFs and scans to the search index")
+    add_index_file_argument(sub)
+    return parser
+
+
+def add_index_file_argument(sub):
+    sub.add_argument("--index-file", help="Search index database (default: per-user data directory)")
+
+
+def add_preprocess_arguments(sub):
+    sub.add_argument("--preprocess", action="store_true", help="Clean the images up before OCR (faster on big photos and scans)")
+    sub.add_argument("--preprocess-steps", type=preprocessing_steps, default=STEPS, metavar="STEPS",
+                     help=f"Comma-separated preprocessing steps: {', '.join(STEPS)} (default: all)")
+    sub.add_argument("--target-dpi", type=int, default=DEFAULT_DPI, help=f"Resolution images are downsampled to (default: {DEFAULT_DPI})")
+    sub.add_argument("--blank-pages", choices=BLANK_POLICIES, default="ocr",
+                     help="Blank pages: ocr them like any page, keep them without OCR or drop them from the PDF (default: ocr)")
+    sub.add_argument("--auto-rotate", action="store_true", help="Detect the orientation of every page and turn it upright before OCR")
+
+
+def preprocessing_option(args):
+    if not getattr(args, "preprocess", False):
+        return None
+    return Preprocessing(args.preprocess_steps, args.target_dpi)
+
+
+def page_checks_option(args):
+    if getattr(args, "blank_pages", "ocr") == "ocr" and not getattr(args, "auto_rotate", False):
+        return None
+    return PageChecks(args.blank_pages, args.auto_rotate)
+
+
+def conversion_options(args):
+    options = {name: getattr(args, name) for name in ("workers", "lang", "ocr_backend", "sidecars", "work_dir", "page_range", "file_type", "tables", "page_numbers") if hasattr(args, name)}
+    if hasattr(args, "no_cache") and not args.no_cache:
+        options["cache"] = OcrCache(args.cache_dir, max_bytes=args.cache_size_mb * 1024 * 1024)
+    if getattr(args, "index", False) or getattr(args, "index_file", None):
+        options["index"] = SearchIndex(args.index_file)
+    if preprocessing_option(args):
+        options["preprocessing"] = preprocessing_option(args)
+    if page_checks_option(args):
+        options["checks"] = page_checks_option(args)
+    return options
+
+
+def print_summary(outcomes, timings=False):
+    failures = 0
+    for inputs, outcome in outcomes:
+        if isinstance(outcome, ConversionResult):
+            print(f"OK    {outcome.output_path}" + (f" ({outcome.pages} page(s))" if outcome.pages else ""))
+            if timings and outcome.metrics is not None:
+                for line in outcome.metrics.format_summary():
+                    print(f"      {line}")
+            for path in outcome.extra_outputs:
+                print(f"      + {path}")
+            if outcome.stats:
+                print(f"      {outcome.stats_summary()}")
+            for warning in outcome.warnings:
+                print(f"      warning: {warning}")
+            for path, error in outcome.failed:
+                failures += 1
+                print(f"      skipped {path}: {error}")
+        else:
+            failures += 1
+            print(f"FAIL  {', '.join(inputs)}: {outcome}")
+    return failures
+
+
+def index_documents(args, progress):
+    paths = expand_inputs(args.inputs, PDF_EXTENSIONS)
+    if not paths:
+        raise ConversionError("No matching input files were found.")
+    outcomes = []
+    with SearchIndex(args.index_file) as index:
+        for n, path in enumerate(paths):
+            if progress:
+                progress(f"[{n+1}/{len(paths)}] {path}")
+            try:
+                outcome = index_pdf(path, index, workers=args.workers, progress=progress)
+            except Exception as e:
+                outcome = str(e)
+            outcomes.append(([path], outcome))
+    failures = 0
+    for (path,), outcome in outcomes:
+        if isinstance(outcome, ConversionResult):
+            print(f"{'SAME' if outcome.stats.get('unchanged') else 'OK'}  {path}" + (f" ({outcome.pages} page(s))" if outcome.pages else ""))
+        else:
+            failures += 1
+            print(f"FAIL  {path}: {outcome}")
+    return 1 if failures else 0
+
+
+def search(args):
+    with SearchIndex(args.index_file) as index:
+        start = time.perf_counter()
+        try:
+            hits = index.search(" ".join(args.query), limit=args.limit, raw=args.raw)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+        elapsed = time.perf_counter() - start
+    for hit in hits:
+        print(f"{hit.path}:{hit.page}  {' '.join(hit.snippet.split())}")
+    print(f"{len(hits)} hit(s) in {elapsed * 1000:.1f} ms", file=sys.stderr)
+    return 0 if hits else 1
+
+
+def job_options_factory(args):
+    # For the long-running modes: every job thread gets its own cache and index connection
+    workers = args.workers or max(1, default_worker_count() // args.jobs)
+
+    def make_options():
+        options = {"workers": workers}
+        if getattr(args, "lang", None):
+            options["lang"] = args.lang
+        if getattr(args, "file_type", None):
+            options["file_type"] = args.file_type
+        if preprocessing_option(args):
+            options["preprocessing"] = preprocessing_option(args)
+        if page_checks_option(args):
+            options["checks"] = page_checks_option(args)
+        if not args.no_cache:
+            options["cache"] = OcrCache()
+        if args.index or args.index_file:
+            options["index"] = SearchIndex(args.index_file)
+        return options
+    return make_options
+
+
+def watch(args):
+    routes = dict(DEFAULT_ROUTES)
+    routes[CONVERSIONS[args.pdf][1]] = args.pdf
+    routes[CONVERSIONS[args.text][1]] = args.text
+    make_options = job_options_factory(args)
+    try:
+        hot_folder = HotFolder(args.inputs, routes, jobs=args.jobs, queue_size=args.queue_size, settle_seconds=args.settle,
+                               output_dir=args.output_dir, done_dir=args.done_dir, failed_dir=args.failed_dir,
+                               polling=args.poll, make_options=make_options)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    hot_folder.run()
+    return 0
+
+
+def serve(args):
+    service = ConversionService(args.host, args.port, jobs=args.jobs, queue_size=args.queue_size,
+                                max_upload_bytes=args.max_upload_mb * 1024 * 1024, work_dir=args.work_dir,
+                                make_options=job_options_factory(args))
+    try:
+        asyncio.run(service.serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.conversion == "search":
+        return search(args)
+    if args.conversion == "watch":
+        return watch(args)
+    if args.conversion == "serve":
+        return serve(args)
+    progress = None if args.quiet else lambda message: print(message, file=sys.stderr)
+    if args.conversion == "index":
+        try:
+            return index_documents(args, progress)
+        except ConversionError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+    try:
+        with metrics.profiled(args.profile) if args.profile else nullcontext():
+            outcomes = run_batch(args.conversion, args.inputs, output=args.output, output_dir=args.output_dir,
+                                 progress=progress, **conversion_options(args))
+    except ConversionError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    export_metrics(args, [outcome.metrics for _, outcome in outcomes if isinstance(outcome, ConversionResult)])
+    return 1 if print_summary(outcomes, args.timings) else 0
+
+
+def export_metrics(args, all_metrics):
+    all_metrics = [job_metrics for job_metrics in all_metrics if job_metrics is not None]
+    if args.metrics_jsonl:
+        for job_metrics in all_metrics:
+            metrics.write_jsonl(args.metrics_jsonl, job_metrics)
+    if args.metrics_prom:
+        metrics.write_prometheus(args.metrics_prom, all_metrics)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
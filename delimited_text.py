@@ -0,0 +1,125 @@
+import csv
+import io
+
+import pandas as pd
+
+# --- Streaming Delimited Text to Excel/CSV ---
+# Delimited exports can be many GB, so they are never loaded whole: the delimiter and
+# the column types are sniffed from a sample at the start of the file, then pandas reads
+# the file in chunks of rows that are written out one at a time. XLSX goes through
+# openpyxl's write-only workbook, which streams rows to disk instead of keeping the
+# sheet in memory, and starts a new sheet whenever one reaches Excel's row limit.
+
+CHUNK_ROWS = 50000
+SAMPLE_BYTES = 256 * 1024
+EXCEL_MAX_ROWS = 1048576 # Rows per worksheet, including the header row
+DELIMITERS = ",;\t|"
+
+
+def read_sample(text_path, size=SAMPLE_BYTES):
+    """Return the first complete lines of the file, up to about size bytes."""
+    with open(text_path, 'r', encoding='utf-8') as f:
+        sample = f.read(size)
+        if len(sample) == size and "\n" in sample:
+            sample = sample[:sample.rindex("\n") + 1] # Drop the partial last line
+    return sample
+
+
+def sniff_format(sample):
+    """Return (delimiter, column types) for the file the sample was taken from.
+
+    Every chunk gets the types decided from the sample, so a column can't flip between
+    numbers and strings, or between 5 and 5.0, halfway through the file: columns that
+    aren't numeric are text, whole numbers are a nullable Int64 (a blank cell further
+    on stays blank) and columns with blanks or fractions are float64.
+    """
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = "," # A single column, or nothing the sniffer recognises
+    try:
+        df = pd.read_csv(io.StringIO(sample), sep=delimiter)
+    except (pd.errors.ParserError, ValueError):
+        return delimiter, {}
+    dtypes = {}
+    for name in df.columns:
+        column = df[name]
+        if pd.api.types.is_bool_dtype(column):
+            dtypes[name] = "boolean"
+        elif pd.api.types.is_integer_dtype(column):
+            dtypes[name] = "Int64"
+        elif pd.api.types.is_numeric_dtype(column):
+            dtypes[name] = "float64"
+        else:
+            dtypes[name] = str
+    return delimiter, dtypes
+
+
+def read_chunks(text_path, delimiter, dtypes=None, chunk_rows=CHUNK_ROWS):
+    """Yield the file as DataFrames of chunk_rows rows with the column types from sniff_format()."""
+    dtypes = dtypes or {}
+    # Numbers are parsed by pandas' own inference (pinning Int64 in read_csv is several
+    # times slower) and then cast to the column's type
+    numeric = {name: dtype for name, dtype in dtypes.items() if dtype is not str}
+    with pd.read_csv(text_path, sep=delimiter, encoding='utf-8', chunksize=chunk_rows,
+                     dtype={name: str for name, dtype in dtypes.items() if dtype is str}) as reader:
+        for chunk in reader:
+            for name, dtype in numeric.items():
+                if name in chunk and chunk[name].dtype != dtype and pd.api.types.is_numeric_dtype(chunk[name]):
+                    try:
+                        chunk[name] = chunk[name].astype(dtype)
+                    except (TypeError, ValueError):
+                        pass # E.g. 2.5 in a column of whole numbers; kept as read
+            yield chunk
+
+
+class CsvChunkWriter:
+    def __init__(self, output_path):
+        self.sheets = 1
+        self._file = open(output_path, 'w', encoding='utf-8', newline='')
+        self._header = True
+
+    def write(self, chunk):
+        chunk.to_csv(self._file, index=False, header=self._header)
+        self._header = False
+
+    def close(self, discard=False):
+        self._file.close()
+
+
+class XlsxChunkWriter:
+    def __init__(self, output_path, max_rows=EXCEL_MAX_ROWS):
+        from openpyxl import Workbook
+        self.output_path = output_path
+        self.max_rows = max_rows
+        self.sheets = 0
+        self._workbook = Workbook(write_only=True)
+        self._sheet = None
+        self._rows_left = 0
+
+    def write(self, chunk):
+        header = [str(name) for name in chunk.columns]
+        values = chunk.astype(object).where(chunk.notna(), None) # Empty cells, not NaN
+        for row in values.itertuples(index=False, name=None):
+            if self._rows_left == 0:
+                # Roll over to a new sheet, repeating the header
+                self.sheets += 1
+                self._sheet = self._workbook.create_sheet(f"Sheet{self.sheets}")
+                self._sheet.append(header)
+                self._rows_left = self.max_rows - 1
+            self._sheet.append(row)
+            self._rows_left -= 1
+        if self._sheet is None: # Header only
+            self.sheets = 1
+            self._sheet = self._workbook.create_sheet("Sheet1")
+            self._sheet.append(header)
+            self._rows_left = self.max_rows - 1
+
+    def close(self, discard=False):
+        if self._workbook is not None:
+            if self._sheet is not None and not discard:
+                self._workbook.save(self.output_path)
+            else:
+                for sheet in self._workbook.worksheets:
+                    sheet.close() # Finish the sheets' temp files without building the workbook
+            self._workbook = None
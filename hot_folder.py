@@ -0,0 +1,338 @@
+import ctypes
+import ctypes.util
+import inspect
+import os
+import queue
+import select
+import shutil
+import struct
+import sys
+import threading
+import time
+
+from conversions import CONVERSIONS, IMAGE_EXTENSIONS, PDF_EXTENSIONS, TEXT_EXTENSIONS
+
+# --- Hot Folders ---
+# Watches input directories and converts every file dropped into them: images to
+# searchable PDFs, PDFs and text files with the conversion chosen for them. Changes are
+# picked up through inotify on Linux and by rescanning the folders everywhere else. A
+# file is only taken once its size and modification time have stayed the same for
+# settle_seconds, so files still being copied are never converted half-written. Ready
+# files go into a bounded queue served by a fixed number of worker threads; while the
+# queue is full, new files simply wait in the folder. Afterwards the input is moved to
+# the done or failed folder (with an .error.txt next to failed ones).
+
+SETTLE_SECONDS = 2.0
+POLL_SECONDS = 1.0
+INTERRUPT_GRACE_SECONDS = 0.5 # For Ctrl+C to reach the main thread after it broke a conversion
+IGNORED_SUFFIXES = (".tmp", ".part", ".partial", ".crdownload", ".download", ".error.txt")
+
+DEFAULT_ROUTES = {IMAGE_EXTENSIONS: "images-to-pdf", PDF_EXTENSIONS: "pdf-to-text", TEXT_EXTENSIONS: "text-to-pdf"}
+
+
+def log(message):
+    print(f"{time.strftime('%H:%M:%S')} {message}", file=sys.stderr, flush=True)
+
+
+def is_candidate(name):
+    lower = name.lower()
+    return not (lower.startswith((".", "~$")) or lower.endswith(IGNORED_SUFFIXES))
+
+
+def list_files(directory):
+    try:
+        with os.scandir(directory) as entries:
+            return [entry.path for entry in entries if entry.is_file() and is_candidate(entry.name)]
+    except FileNotFoundError:
+        return []
+
+
+# --- Watchers ---
+# changes(timeout) waits up to timeout seconds and returns the paths that may have
+# changed; the first call returns everything already in the folders.
+class PollingWatcher:
+    def __init__(self, directories, interval=POLL_SECONDS):
+        self.directories = directories
+        self.interval = interval
+        self._started = False
+
+    def changes(self, timeout):
+        if self._started:
+            time.sleep(min(timeout, self.interval))
+        self._started = True
+        return [path for directory in self.directories for path in list_files(directory)]
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_Q_OVERFLOW = 0x4000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    _EVENT = struct.Struct("iIII") # wd, mask, cookie, length of the name that follows
+
+    def __init__(self, directories):
+        self.directories = directories
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directory_of = {}
+        try:
+            for directory in directories:
+                wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.IN_CLOSE_WRITE | self.IN_MOVED_TO)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f"Can't watch {directory}")
+                self._directory_of[wd] = directory
+        except OSError:
+            self.close()
+            raise
+        self._rescan = True # Files that were there before the watches started
+
+    def changes(self, timeout):
+        if self._rescan:
+            self._rescan = False
+            return [path for directory in self.directories for path in list_files(directory)]
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        paths = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self._EVENT.unpack_from(data, offset)
+            name = data[offset + self._EVENT.size:offset + self._EVENT.size + length].rstrip(b"\0")
+            offset += self._EVENT.size + length
+            if mask & self.IN_Q_OVERFLOW:
+                self._rescan = True # Events were lost
+            elif name and wd in self._directory_of and is_candidate(os.fsdecode(name)):
+                paths.append(os.path.join(self._directory_of[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(directories, polling=False):
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError) as e: # No inotify (e.g. some network filesystems) or no libc
+            log(f"inotify unavailable ({e}); polling the folders instead.")
+    return PollingWatcher(directories)
+
+
+# --- Job Queue ---
+class HotFolder:
+    """Watch directories and convert the files dropped into them.
+
+    routes maps tuples of extensions to a conversion name (see conversions.CONVERSIONS);
+    options are passed to every conversion that accepts them. Outputs go to output_dir,
+    inputs to done_dir or failed_dir; each defaults to a subfolder of the watched folder.
+    """
+
+    def __init__(self, directories, routes=None, jobs=1, queue_size=None, settle_seconds=SETTLE_SECONDS,
+                 output_dir=None, done_dir=None, failed_dir=None, polling=False, make_options=None):
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.routes = routes or DEFAULT_ROUTES
+        self.jobs = jobs
+        self.settle_seconds = settle_seconds
+        self.polling = polling
+        self.make_options = make_options or dict # Called once per worker thread
+        self._folders = {directory: {"output": output_dir or os.path.join(directory, "output"),
+                                     "done": done_dir or os.path.join(directory, "done"),
+                                     "failed": failed_dir or os.path.join(directory, "failed")}
+                         for directory in self.directories}
+        for folders in self._folders.values():
+            for folder in folders.values():
+                if os.path.abspath(folder) in self.directories:
+                    raise ValueError(f"{folder} is watched itself; use a different folder for outputs and processed inputs.")
+        self._queue = queue.Queue(maxsize=queue_size or 2 * jobs)
+        self._pending = {} # path -> (size, mtime, time first seen with them)
+        self._active = set() # Queued or being converted
+        self._stuck = {} # path -> (size, mtime) of inputs that couldn't be moved away
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._queue_full = False
+        self.done = 0
+        self.failed = 0
+
+    def conversion_for(self, path):
+        lower = path.lower()
+        for extensions, conversion in self.routes.items():
+            if lower.endswith(extensions):
+                return conversion
+        return None
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        """Watch until stop() is called (or Ctrl+C), then finish the running conversions."""
+        for folders in self._folders.values():
+            for folder in folders.values():
+                os.makedirs(folder, exist_ok=True)
+        watcher = create_watcher(self.directories, self.polling)
+        workers = [threading.Thread(target=self._work, name=f"hot-folder-{n + 1}") for n in range(self.jobs)]
+        for worker in workers:
+            worker.start()
+        log(f"Watching {', '.join(self.directories)} with {type(watcher).__name__}, {self.jobs} job(s) at a time.")
+        try:
+            while not self._stop.is_set():
+                for path in watcher.changes(timeout=min(POLL_SECONDS, self.settle_seconds / 2) if self._pending else POLL_SECONDS):
+                    if self.conversion_for(path) and path not in self._active:
+                        self._pending.setdefault(path, None)
+                self._admit_settled()
+        except KeyboardInterrupt:
+            log("Stopping; waiting for the running conversions to finish...")
+        finally:
+            self._stop.set()
+            watcher.close()
+            for worker in workers:
+                worker.join()
+        log(f"Stopped. {self.done} converted, {self.failed} failed.")
+
+    def _admit_settled(self):
+        now = time.monotonic()
+        for path, seen in list(self._pending.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                del self._pending[path] # Moved or deleted again
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            with self._lock:
+                stuck = self._stuck.get(path) == signature
+            if stuck:
+                del self._pending[path]
+                continue
+            if seen is None or seen[:2] != signature:
+                self._pending[path] = signature + (now,) # New or still changing: start settling again
+                continue
+            if now - seen[2] < self.settle_seconds or not _readable(path):
+                continue
+            if self._queue.empty():
+                self._queue_full = False # Caught up; report the next backlog again
+            try:
+                self._queue.put_nowait(path)
+            except queue.Full:
+                if not self._queue_full:
+                    log(f"Queue full; {len(self._pending)} file(s) wait in the folder.")
+                self._queue_full = True
+                return # Backpressure: try again on the next round
+            del self._pending[path]
+            with self._lock:
+                self._active.add(path)
+
+    def _work(self):
+        options = self.make_options()
+        while True:
+            try:
+                path = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            if self._stop.is_set():
+                with self._lock:
+                    self._active.discard(path) # Left in the folder for the next run
+                continue
+            try:
+                self._convert(path, options)
+            finally:
+                with self._lock:
+                    self._active.discard(path)
+
+    def _convert(self, path, options):
+        conversion = self.conversion_for(path)
+        function, _, extension, merges_inputs = CONVERSIONS[conversion]
+        accepted = inspect.signature(function).parameters
+        kwargs = {name: value for name, value in options.items() if name in accepted}
+        if kwargs.get("file_type"):
+            extension = "." + kwargs["file_type"]
+        folders = self._folders[os.path.dirname(path)]
+        output_path = reserve_path(folders["output"], os.path.splitext(os.path.basename(path))[0] + extension)
+        log(f"{conversion}: {os.path.basename(path)}")
+        start = time.perf_counter()
+        try:
+            result = function([path] if merges_inputs else path, output_path, **kwargs)
+            if result.failed:
+                raise RuntimeError("; ".join(error for _, error in result.failed))
+        except Exception as e:
+            # Ctrl+C also reaches Tesseract processes started by this thread; a conversion
+            # broken that way is not a failed input, so it stays in the folder for the next run
+            if self._stop.wait(INTERRUPT_GRACE_SECONDS):
+                if os.path.exists(output_path): # Pages missing; it is converted again next time
+                    os.remove(output_path)
+                log(f"Interrupted {os.path.basename(path)}; left in the folder.")
+                return
+            if os.path.exists(output_path) and os.path.getsize(output_path) == 0:
+                os.remove(output_path) # Only the reserved name; nothing was written
+            with self._lock:
+                self.failed += 1
+            log(f"FAIL  {os.path.basename(path)}: {e}")
+            moved = self._move(path, folders["failed"])
+            if moved:
+                with open(moved + ".error.txt", "w", encoding="utf-8") as f:
+                    f.write(f"{conversion} failed: {e}\n")
+            return
+        with self._lock:
+            self.done += 1
+        log(f"OK    {os.path.basename(path)} -> {output_path} ({time.perf_counter() - start:.1f} s)")
+        self._move(path, folders["done"])
+
+    def _move(self, path, folder):
+        target = None
+        try:
+            target = reserve_path(folder, os.path.basename(path))
+            try:
+                os.replace(path, target) # Over the reserved, empty file
+            except OSError:
+                shutil.move(path, target) # On another drive
+            return target
+        except OSError as e:
+            if target is not None and os.path.exists(path):
+                try:
+                    os.remove(target)
+                except OSError:
+                    pass
+            log(f"Can't move {path} to {folder}: {e}; it is skipped until it changes.")
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            with self._lock:
+                self._stuck[path] = (stat.st_size, stat.st_mtime_ns)
+            return None
+
+
+def reserve_path(folder, name):
+    """Create and return an empty folder/name, or folder/name (2), (3), ... if that is taken.
+
+    The name is taken atomically, so concurrent jobs never get the same path."""
+    base, extension = os.path.splitext(name)
+    path = os.path.join(folder, name)
+    n = 2
+    while True:
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return path
+        except FileExistsError:
+            path = os.path.join(folder, f"{base} ({n}){extension}")
+            n += 1
+
+
+def _readable(path):
+    # On Windows a file that is still open for writing can't be opened for reading
+    try:
+        with open(path, "rb"):
+            return True
+    except OSError:
+        return False
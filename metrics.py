@@ -0,0 +1,191 @@
+import contextvars
+import io
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+# --- Per-Stage Metrics ---
+# Conversions time their stages (image decode, Tesseract, PDF merge, text extraction,
+# DataFrame building, writing the output, ...) with span() and count things with
+# count(). Both record into the Metrics of the job running in the current thread, set
+# up by collect(), and do nothing outside a job, so library code can call them freely.
+# Worker processes collect their own Metrics and send summary() back with their
+# results for the parent to merge(); their times are summed over all workers.
+
+_current = contextvars.ContextVar("metrics", default=None)
+
+
+class Metrics:
+    def __init__(self, job=None):
+        self.job = job
+        self.spans = {} # name -> [calls, total seconds, longest call]
+        self.counters = {}
+
+    def add_time(self, name, seconds, calls=1, longest=None):
+        span = self.spans.setdefault(name, [0, 0.0, 0.0])
+        span[0] += calls
+        span[1] += seconds
+        span[2] = max(span[2], seconds if longest is None else longest)
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def merge(self, summary):
+        for name, span in summary["spans"].items():
+            self.add_time(name, span["seconds"], span["calls"], span["max_seconds"])
+        for name, amount in summary["counters"].items():
+            self.count(name, amount)
+
+    def summary(self):
+        return {"spans": {name: {"calls": calls, "seconds": round(total, 6), "max_seconds": round(longest, 6)}
+                          for name, (calls, total, longest) in self.spans.items()},
+                "counters": dict(self.counters)}
+
+    def format_summary(self):
+        """One line per stage, slowest first, then the counters."""
+        lines = [f"{name:<24} {total:9.3f} s  {calls:>7} call(s)  max {longest:.3f} s"
+                 for name, (calls, total, longest) in sorted(self.spans.items(), key=lambda item: -item[1][1])]
+        lines += [f"{name:<24} {amount:>9}" for name, amount in sorted(self.counters.items())]
+        return lines
+
+
+@contextmanager
+def collect(job=None):
+    """Record the spans and counters of everything run inside the block into a new Metrics."""
+    metrics = Metrics(job)
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def span(name):
+    metrics = _current.get()
+    if metrics is None:
+        yield
+    else:
+        with metrics.span(name):
+            yield
+
+
+def count(name, amount=1):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.count(name, amount)
+
+
+def merge(summary):
+    metrics = _current.get()
+    if metrics is not None and summary:
+        metrics.merge(summary)
+
+
+def timed(iterable, name):
+    """Iterate over iterable, counting the time spent producing every item as a span."""
+    iterator = iter(iterable)
+    while True:
+        with span(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+# --- Export ---
+def write_jsonl(path, metrics):
+    """Append one JSON line for the job."""
+    record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "job": metrics.job, **metrics.summary()}
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def write_prometheus(path, all_metrics):
+    """Write the jobs' metrics in the Prometheus text format, e.g. for node_exporter's
+    textfile collector. The file is replaced atomically."""
+    lines = ["# HELP conversion_stage_seconds_total Time spent per conversion stage.",
+             "# TYPE conversion_stage_seconds_total counter"]
+    calls = ["# HELP conversion_stage_calls_total Calls per conversion stage.",
+             "# TYPE conversion_stage_calls_total counter"]
+    counters = ["# HELP conversion_items_total Items processed by conversions.",
+                "# TYPE conversion_items_total counter"]
+    totals = {}
+    for metrics in all_metrics:
+        summary = metrics.summary()
+        for name, span in summary["spans"].items():
+            total = totals.setdefault(("stage", metrics.job, name), [0, 0.0])
+            total[0] += span["calls"]
+            total[1] += span["seconds"]
+        for name, amount in summary["counters"].items():
+            totals.setdefault(("counter", metrics.job, name), [0, 0.0])[0] += amount
+    for (kind, job, name), (amount, seconds) in sorted(totals.items()):
+        labels = f'job="{_label(job)}",stage="{_label(name)}"' if kind == "stage" else f'job="{_label(job)}",name="{_label(name)}"'
+        if kind == "stage":
+            lines.append(f"conversion_stage_seconds_total{{{labels}}} {seconds:.6f}")
+            calls.append(f"conversion_stage_calls_total{{{labels}}} {amount}")
+        else:
+            counters.append(f"conversion_items_total{{{labels}}} {amount}")
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines + calls + counters) + "\n")
+    os.replace(temp_path, path)
+
+
+def _label(value):
+    return str(value or "").replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# --- Profiling ---
+@contextmanager
+def profiled(prefix, top=30):
+    """Profile one run with cProfile and tracemalloc (opt-in; both slow the run down).
+
+    Writes <prefix>.prof (open with pstats or snakeviz), <prefix>.profile.txt with the
+    functions taking the most cumulative time and <prefix>.memory.txt with the lines
+    that allocated the most memory still in use, plus the peak. Only the current thread
+    and process are profiled.
+    """
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+
+        profiler.dump_stats(prefix + ".prof")
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(top)
+        with open(prefix + ".profile.txt", "w", encoding="utf-8") as f:
+            f.write(text.getvalue())
+        with open(prefix + ".memory.txt", "w", encoding="utf-8") as f:
+            f.write(f"Peak traced memory: {peak / 2 ** 20:.1f} MB\n\n")
+            for stat in snapshot.statistics("lineno")[:top]:
+                f.write(f"{stat}\n")
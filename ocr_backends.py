@@ -0,0 +1,149 @@
+import os
+import shlex
+import tempfile
+
+# --- OCR Backends ---
+# "subprocess" runs the tesseract executable once per image through pytesseract. That
+# costs a process start, a temp file and a language model load for every page, which
+# dominates for small images. "tesserocr" keeps libtesseract loaded in-process through
+# the optional tesserocr bindings (pip install tesserocr): each OCR worker initialises
+# one API object with the model loaded and reuses it for every image it is given.
+#
+# Both produce any mix of OUTPUT_KINDS from a single Tesseract pass over the image, and
+# detect the page orientation (Tesseract's OSD, which needs the osd language data) as
+# (clockwise degrees that make the page upright, confidence); (0, 0.0) when unsure.
+
+OUTPUT_KINDS = ("pdf", "txt", "hocr", "tsv")
+_CREATE_VARIABLES = {"pdf": "tessedit_create_pdf", "txt": "tessedit_create_txt",
+                     "hocr": "tessedit_create_hocr", "tsv": "tessedit_create_tsv"}
+
+BACKENDS = ("auto", "subprocess", "tesserocr")
+
+
+def tesserocr_available():
+    try:
+        import tesserocr # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_backend(name=None):
+    name = name or "auto"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend '{name}'. Choose one of: {', '.join(BACKENDS)}")
+    if name == "auto":
+        return "tesserocr" if tesserocr_available() else "subprocess"
+    if name == "tesserocr" and not tesserocr_available():
+        raise ImportError("The tesserocr OCR backend needs the tesserocr package (pip install tesserocr).")
+    return name
+
+
+def create_backend(name, lang=None, config=""):
+    if resolve_backend(name) == "tesserocr":
+        return TesserocrBackend(lang, config)
+    return SubprocessBackend(lang, config)
+
+
+def backend_version(name):
+    # Part of the OCR cache key: different Tesseract builds can give different results
+    if resolve_backend(name) == "tesserocr":
+        import tesserocr
+        return "tesserocr " + tesserocr.tesseract_version().splitlines()[0]
+    from ocr_engine import tesseract
+    return f"tesseract {tesseract().get_tesseract_version()}"
+
+
+class SubprocessBackend:
+    def __init__(self, lang=None, config=""):
+        self.lang = lang
+        self.config = config
+
+    def ocr(self, image, kinds=("pdf",)):
+        # Same as pytesseract.run_and_get_multiple_output, but keeping our own config
+        from ocr_engine import tesseract
+        pytesseract = tesseract()
+        config = " ".join(f"-c {_CREATE_VARIABLES[kind]}=1" for kind in kinds)
+        with pytesseract.pytesseract.save(image) as (temp_name, input_filename):
+            pytesseract.pytesseract.run_tesseract(input_filename, temp_name, " ".join(kinds), self.lang,
+                                                  config=f"{config} {self.config or ''}".strip())
+            return {kind: _read_output(f"{temp_name}.{kind}") for kind in kinds}
+
+    def orientation(self, image):
+        from ocr_engine import tesseract
+        pytesseract = tesseract()
+        try:
+            osd = pytesseract.image_to_osd(image, config="--psm 0", output_type=pytesseract.Output.DICT)
+        except pytesseract.TesseractError: # Too little text to tell, or no osd language data
+            return 0, 0.0
+        return int(osd["rotate"]), float(osd["orientation_conf"])
+
+    def close(self):
+        pass
+
+
+class TesserocrBackend:
+    def __init__(self, lang=None, config=""):
+        import tesserocr
+        psm, oem, variables = parse_tesseract_config(config)
+        options = {"lang": lang or "eng"}
+        if psm is not None:
+            options["psm"] = psm
+        if oem is not None:
+            options["oem"] = oem
+        self._api = tesserocr.PyTessBaseAPI(**options) # Loads the language model once
+        for name, value in variables:
+            self._api.SetVariable(name, value)
+        self._osd_api = None # Loaded on first use; False if the osd language data is missing
+
+    def ocr(self, image, kinds=("pdf",)):
+        for kind, variable in _CREATE_VARIABLES.items():
+            self._api.SetVariable(variable, "1" if kind in kinds else "0")
+        # libtesseract's renderers write to <outputbase>.<kind>
+        with tempfile.TemporaryDirectory(prefix="ocr-page-") as work_dir:
+            outputbase = os.path.join(work_dir, "page")
+            if not self._api.ProcessPage(outputbase, image, 0, "page"):
+                raise RuntimeError("Tesseract could not process the image.")
+            return {kind: _read_output(f"{outputbase}.{kind}") for kind in kinds}
+
+    def orientation(self, image):
+        import tesserocr
+        if self._osd_api is None:
+            try:
+                self._osd_api = tesserocr.PyTessBaseAPI(lang="osd", psm=tesserocr.PSM.OSD_ONLY)
+            except RuntimeError: # No osd language data
+                self._osd_api = False
+        if not self._osd_api:
+            return 0, 0.0
+        self._osd_api.SetImage(image)
+        result = self._osd_api.DetectOrientationScript()
+        if not result:
+            return 0, 0.0
+        # orient_deg is the detected clockwise rotation of the image
+        return (360 - result["orient_deg"]) % 360, result["orient_conf"]
+
+    def close(self):
+        self._api.End()
+        if self._osd_api:
+            self._osd_api.End()
+
+
+def _read_output(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def parse_tesseract_config(config):
+    """Split a tesseract command-line config ("--psm 6 -c name=value") into psm, oem and variables."""
+    psm = oem = None
+    variables = []
+    args = shlex.split(config or "")
+    for i, arg in enumerate(args):
+        value = args[i + 1] if i + 1 < len(args) else ""
+        if arg == "--psm":
+            psm = int(value)
+        elif arg == "--oem":
+            oem = int(value)
+        elif arg == "-c" and "=" in value:
+            variables.append(tuple(value.split("=", 1)))
+    return psm, oem, variables
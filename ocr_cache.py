@@ -0,0 +1,127 @@
+import hashlib
+import os
+import tempfile
+
+# --- On-Disk OCR Result Cache ---
+# OCR output (the searchable page PDF and any text/hOCR/TSV sidecars) is stored under a key
+# derived from the image bytes plus everything that changes Tesseract's output: the
+# engine and its version, the language and the config string. Re-running a scan batch then skips OCR
+# for every page seen before. The cache is capped in size; the least recently used
+# entries (by file modification time, refreshed on every hit) are evicted first.
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024 # 1 GB
+CACHE_KEY_VERSION = "1" # Bump when the cached format changes to invalidate old entries
+
+
+def default_cache_dir():
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ImageAndTextPDFTools", "ocr-cache")
+
+
+class OcrCache:
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None # Total bytes on disk, computed on first write
+
+    def key_for_image(self, image_path, engine_version, lang=None, config=""):
+        digest = hashlib.sha256()
+        with open(image_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        digest.update(f"\0{CACHE_KEY_VERSION}\0{engine_version}\0{lang or ''}\0{config or ''}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def key_for_frame(self, image_key, frame):
+        # The frames of a multi-frame image are keyed by the file's key and their number
+        return hashlib.sha256(f"{image_key}\0frame\0{frame}".encode("utf-8")).hexdigest()
+
+    def _path(self, key, kind):
+        return os.path.join(self.directory, key[:2], f"{key}.{kind}")
+
+    def lookup(self, key, kinds=("pdf",)):
+        """Return {kind: path} if every kind is cached, else None (counting a miss).
+        The hit is counted by read()."""
+        paths = {kind: self._path(key, kind) for kind in kinds}
+        try:
+            for path in paths.values():
+                os.utime(path) # Mark as recently used
+        except OSError:
+            self.misses += 1
+            return None
+        return paths
+
+    def read(self, paths):
+        """Return {kind: data} for the paths lookup() returned (counting a hit), or None
+        (counting a miss) if an entry was evicted since."""
+        outputs = {kind: read_entry(path) for kind, path in paths.items()}
+        if any(data is None for data in outputs.values()):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return outputs
+
+    def put(self, key, kind, data):
+        path = self._path(key, kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file first so concurrent readers never see half an entry
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            try:
+                replaced = os.path.getsize(path) # An entry written again (e.g. by another process)
+            except OSError:
+                replaced = 0
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        else:
+            self._size += len(data) - replaced
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[2]) # Oldest use first
+        self._size = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue # Already evicted by another process
+            self._size -= size
+
+    def _entries(self):
+        if not os.path.isdir(self.directory):
+            return
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield entry.path, stat.st_size, stat.st_mtime
+
+
+def read_entry(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None # Evicted between lookup and read
@@ -0,0 +1,138 @@
+import json
+import os
+import re
+import tempfile
+
+import metrics
+
+# --- Resumable OCR Jobs ---
+# A long images-to-pdf run can keep its progress in a work directory: the OCR outputs of
+# every finished page are stored there as files, and the page is then recorded in
+# manifest.jsonl (flushed to disk page by page). Run the same job again with the same
+# work directory after a crash, a cancel or failed pages, and the recorded pages are
+# taken from the work directory instead of being OCR'd again; only the missing pages
+# go through Tesseract. The output is assembled from the stored pages in input order.
+# Once a run finishes with every page done, the files the checkpoint wrote are deleted,
+# and so is the work directory if nothing else is left in it.
+#
+# The first manifest line holds the settings that change the OCR output; a work
+# directory made with other settings is never resumed: its pages are deleted and the
+# job starts over. Every page entry records its input
+# file's size and modification time, so a page whose image was replaced (e.g. a fixed
+# scan after a failure) is OCR'd again.
+
+MANIFEST_NAME = "manifest.jsonl"
+_PAGE_FILE = re.compile(r"(page\d{6}\.\w+|\.page-\w+\.tmp)$") # Page outputs, and temp files of a crashed run
+
+
+def default_work_dir(output_path):
+    return os.path.splitext(output_path)[0] + ".ocr-work"
+
+
+def _source(image_path, frame):
+    # Where a page comes from, as it is on disk now
+    try:
+        stat = os.stat(image_path)
+    except OSError:
+        return None
+    return [os.path.abspath(image_path), frame, stat.st_size, stat.st_mtime_ns]
+
+
+class OcrCheckpoint:
+    def __init__(self, work_dir, settings):
+        # settings: a JSON-able dict of everything that changes the OCR output (lang, config, ...)
+        self.work_dir = work_dir
+        self._pages = {} # Page index: manifest entry
+        self._path = os.path.join(work_dir, MANIFEST_NAME)
+        os.makedirs(work_dir, exist_ok=True)
+        settings = json.loads(json.dumps(settings)) # Compared as read back from the manifest
+        if not os.path.exists(self._path) and os.listdir(work_dir):
+            # Never mix page files into (and later delete them from) a folder of other files
+            raise ValueError(f"The work directory {work_dir} isn't empty and holds no unfinished OCR job. "
+                             "Choose an empty or new folder.")
+        if os.path.exists(self._path) and self._read(settings):
+            self._manifest = open(self._path, "a", encoding="utf-8")
+        else:
+            self._delete_files() # Pages made with other settings are of no use
+            self._manifest = open(self._path, "w", encoding="utf-8")
+            self._append({"settings": settings})
+
+    def _read(self, settings):
+        # False if the manifest was written with other settings
+        with open(self._path, encoding="utf-8") as f:
+            lines = iter(f)
+            try:
+                header = json.loads(next(lines, "{}"))
+            except ValueError:
+                header = {}
+            if header.get("settings") != settings:
+                return False
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue # Half-written last line of a crashed run
+                self._pages[entry["page"]] = entry
+        return True
+
+    def finished(self, page, image_path, frame=None):
+        """True if the page (0-based) was stored before from the same, unchanged image."""
+        entry = self._pages.get(page)
+        return (entry is not None and entry["source"] == _source(image_path, frame)
+                and all(os.path.exists(self._page_path(page, kind)) for kind in entry["kinds"]))
+
+    def _append(self, entry):
+        self._manifest.write(json.dumps(entry) + "\n")
+        self._manifest.flush()
+        os.fsync(self._manifest.fileno())
+
+    def _page_path(self, page, kind):
+        return os.path.join(self.work_dir, f"page{page + 1:06d}.{kind}")
+
+    def add(self, page, image_path, frame, outputs):
+        """Store the OCR outputs of a page (0-based) and record it as finished."""
+        with metrics.span("checkpoint.write"):
+            for kind, data in outputs.items():
+                # Written in full before the manifest mentions it
+                fd, temp_path = tempfile.mkstemp(dir=self.work_dir, prefix=".page-", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(data)
+                    os.replace(temp_path, self._page_path(page, kind))
+                except BaseException:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
+            entry = {"page": page, "source": _source(image_path, frame), "kinds": sorted(outputs)}
+            self._append(entry)
+        self._pages[page] = entry
+
+    def outputs(self, page):
+        """The stored outputs of a finished page."""
+        with metrics.span("checkpoint.read"):
+            outputs = {}
+            for kind in self._pages[page]["kinds"]:
+                with open(self._page_path(page, kind), "rb") as f:
+                    outputs[kind] = f.read()
+            return outputs
+
+    def close(self):
+        self._manifest.close()
+
+    def remove(self):
+        """Delete the manifest and page files, and the work directory if that leaves it empty."""
+        self.close()
+        self._delete_files(MANIFEST_NAME)
+        try:
+            os.rmdir(self.work_dir)
+        except OSError:
+            pass # Not empty: other files were put there
+
+    def _delete_files(self, *names):
+        # The page files (and names) in the work directory; nothing else
+        for name in os.listdir(self.work_dir):
+            if name in names or _PAGE_FILE.match(name):
+                try:
+                    os.remove(os.path.join(self.work_dir, name))
+                except OSError:
+                    pass
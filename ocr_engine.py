@@ -0,0 +1,301 @@
+import contextvars
+import functools
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import metrics
+from image_preprocess import draft, preprocess
+from ocr_backends import backend_version, create_backend, resolve_backend
+from page_checks import CHECKS_KIND, blank_page_outputs, is_blank, upright
+
+# --- Configuration ---
+# Tesseract is looked up on the PATH. Set the TESSERACT_CMD environment variable to use a
+# specific executable; the default Windows install location is picked up automatically.
+# pytesseract pulls in pandas, so it is only imported (and configured) on first use.
+WINDOWS_TESSERACT_CMD = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+_configured = False
+
+
+def tesseract():
+    """Return the pytesseract module, pointed at the configured Tesseract executable."""
+    global _configured
+    import pytesseract
+    if not _configured:
+        if os.environ.get("TESSERACT_CMD"):
+            pytesseract.pytesseract.tesseract_cmd = os.environ["TESSERACT_CMD"]
+        elif os.name == "nt" and os.path.exists(WINDOWS_TESSERACT_CMD):
+            pytesseract.pytesseract.tesseract_cmd = WINDOWS_TESSERACT_CMD
+        _configured = True
+    return pytesseract
+
+# --- Parallel OCR Engine ---
+# Tesseract is single-threaded per image, so we spread a batch of images over a pool
+# of worker processes and hand the results back in the original order. Each worker
+# keeps one OCR backend (see ocr_backends.py) for the lifetime of the pool.
+#
+# Decoding, OCR and the caller's assembly of the results run as overlapping stages with
+# a bounded number of pages in flight between them: the pool only gets a couple of
+# images per worker ahead of the page being consumed, and with a single worker one
+# thread decodes the next image while another OCRs the current one. Memory use stays
+# the same for ten pages or ten thousand.
+#
+# Multi-frame TIFFs (fax archives) and GIFs become one page per frame. Only their frame
+# headers are read up front; every frame is decoded on its own when its turn comes, so
+# a TIFF with hundreds of pages is never in memory all at once.
+
+PAGES_IN_FLIGHT_PER_WORKER = 2
+MULTI_FRAME_EXTENSIONS = (".tif", ".tiff", ".gif")
+MULTI_FRAME_FORMATS = ("TIFF", "GIF") # Not e.g. MPO, whose second frame is just a camera preview
+
+_TESSERACT_NOT_FOUND = "tesseract-not-found"
+
+_worker_settings = None # (backend name, lang, config) in a worker process
+_worker_preprocessing = None # And page checks
+_worker_backend = None
+
+
+def default_worker_count():
+    return os.cpu_count() or 1
+
+
+def _init_worker(tesseract_cmd, backend_name, lang, config, preprocessing, checks):
+    global _worker_settings, _worker_preprocessing
+    # Ctrl+C is for the parent, which lets running pages finish (e.g. in hot folder mode).
+    # Tesseract processes started from here inherit this as well.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Spawned workers (Windows, macOS) start from a fresh interpreter, so the
+    # configured Tesseract path has to be handed over explicitly.
+    tesseract().pytesseract.tesseract_cmd = tesseract_cmd
+    _worker_settings = (backend_name, lang, config)
+    _worker_preprocessing = (preprocessing, checks)
+
+
+def _ocr_in_worker(image_path, frame, kinds):
+    # Returns (outputs, stage timings) for the parent to merge into its job's metrics
+    global _worker_backend
+    with metrics.collect() as worker_metrics:
+        try:
+            if _worker_backend is None: # Created on first use so a failure is reported per image
+                with metrics.span("ocr.backend_start"):
+                    _worker_backend = create_backend(*_worker_settings)
+        except tesseract().TesseractNotFoundError:
+            return _TESSERACT_NOT_FOUND, None
+        return ocr_image(_worker_backend, image_path, kinds, *_worker_preprocessing, frame=frame), worker_metrics.summary()
+
+
+def _merged(worker_result):
+    outputs, summary = worker_result
+    metrics.merge(summary)
+    return outputs
+
+
+def image_pages(image_paths):
+    """Yield (page name, image path, frame) for every page of the images: one per frame
+    (counted from 0) of a multi-frame TIFF or GIF, otherwise one with frame None."""
+    from PIL import Image
+    for image_path in image_paths:
+        frames = 1
+        if image_path.lower().endswith(MULTI_FRAME_EXTENSIONS):
+            try:
+                with metrics.span("image.frames"), Image.open(image_path) as img:
+                    if img.format in MULTI_FRAME_FORMATS:
+                        frames = getattr(img, "n_frames", 1) # Walks the frame headers, decodes nothing
+            except OSError:
+                pass # Decoding it reports the error
+        if frames == 1:
+            yield image_path, image_path, None
+        else:
+            for frame in range(frames):
+                yield f"{image_path} (frame {frame + 1})", image_path, frame
+
+
+def decode_image(image_path, preprocessing=None, frame=None):
+    # preprocessing: an image_preprocess.Preprocessing to clean the image up for OCR.
+    # frame: the frame of a multi-frame image to decode.
+    from PIL import Image
+    with metrics.span("image.decode"):
+        img = Image.open(image_path)
+        try:
+            if frame is not None:
+                img.seek(frame)
+            if preprocessing is not None:
+                draft(img, preprocessing)
+            img.load()
+        except BaseException:
+            img.close()
+            raise
+    if preprocessing is not None:
+        processed = None
+        try:
+            processed = preprocess(img, preprocessing)
+        finally:
+            if processed is not img: # Also on errors
+                img.close()
+        img = processed
+    return img
+
+
+def ocr_decoded(backend, img, kinds=("pdf",), checks=None):
+    # checks: a page_checks.PageChecks. Blank pages get no OCR: their outputs hold just the
+    # image (policy "keep") or nothing at all ("drop"). With checks, the outputs also say
+    # what the checks did under CHECKS_KIND.
+    try:
+        if checks is not None and checks.blank != "ocr" and is_blank(img, checks):
+            outputs = blank_page_outputs(img, kinds) if checks.blank == "keep" else {}
+            outputs[CHECKS_KIND] = b"blank"
+            return outputs
+        done_by_checks = b""
+        if checks is not None and checks.orientation:
+            turned = upright(backend, img)
+            if turned is not img:
+                img.close()
+                img = turned
+                done_by_checks = b"rotated"
+        with metrics.span("ocr.tesseract"):
+            outputs = backend.ocr(img, kinds)
+        if checks is not None:
+            outputs[CHECKS_KIND] = done_by_checks
+        return outputs
+    except tesseract().TesseractNotFoundError:
+        # TesseractNotFoundError can't be pickled back to the parent process
+        return _TESSERACT_NOT_FOUND
+    finally:
+        img.close()
+
+
+def ocr_image(backend, image_path, kinds=("pdf",), preprocessing=None, checks=None, frame=None):
+    return ocr_decoded(backend, decode_image(image_path, preprocessing, frame), kinds, checks)
+
+
+class _PipelinedOcr:
+    # Single-worker pipeline: one thread decodes images while another runs the OCR
+    # backend, so decoding, OCR and the caller's work on earlier pages overlap
+    def __init__(self, backend_name, lang, config, kinds, preprocessing, checks):
+        self._settings = (backend_name, lang, config)
+        self._kinds = kinds
+        self._preprocessing = preprocessing
+        self._checks = checks
+        self._backend = None
+        self._decoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr-decode")
+        self._recognizer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr")
+
+    def submit(self, image_path, frame=None):
+        # Both stages record straight into the metrics of the caller's job
+        decoded = self._decoder.submit(contextvars.copy_context().run, decode_image, image_path, self._preprocessing, frame)
+        return self._recognizer.submit(contextvars.copy_context().run, self._ocr, decoded)
+
+    def _ocr(self, decoded):
+        # Returns (outputs, None) like _ocr_in_worker; there are no worker metrics to merge
+        img = decoded.result()
+        if self._backend is None:
+            try:
+                self._backend = create_backend(*self._settings)
+            except tesseract().TesseractNotFoundError:
+                img.close()
+                return _TESSERACT_NOT_FOUND, None
+        return ocr_decoded(self._backend, img, self._kinds, self._checks), None
+
+    def shutdown(self, wait=True):
+        self._decoder.shutdown(wait=wait)
+        self._recognizer.shutdown(wait=wait)
+        if self._backend is not None:
+            self._backend.close()
+
+
+def ocr_images(image_paths, kinds=("pdf",), workers=None, lang=None, config="", cache=None, backend=None,
+               preprocessing=None, checks=None, done=()):
+    """Yield (page name, outputs, error) for every page of the images, in input order.
+
+    The page name is the image path, with the frame number added for the frames of a
+    multi-frame TIFF or GIF (see image_pages()). ``outputs`` maps each requested kind
+    ("pdf", "txt", "hocr", "tsv") to the bytes Tesseract produced for it, all from a
+    single pass over the page. Per-page failures are reported through ``error`` so the
+    caller decides whether to skip the page or abort; a missing Tesseract install raises
+    straight away. Pages found in ``cache`` (an OcrCache) are not OCR'd again.
+    ``backend`` picks the OCR backend by name (default: tesserocr if installed,
+    otherwise subprocess). ``preprocessing`` (an image_preprocess.Preprocessing) cleans
+    every image up before OCR; ``checks`` (a page_checks.PageChecks) skips blank pages
+    and turns pages upright; ``outputs`` then also holds page_checks.CHECKS_KIND, and
+    only that for a blank page that is dropped. Pages whose index (in image_pages()
+    order) is in ``done`` were finished before and are skipped altogether.
+    """
+    kinds = tuple(kinds)
+    pytesseract = tesseract()
+    backend = resolve_backend(backend)
+    pages = [page for i, page in enumerate(image_pages(image_paths)) if i not in done] # (name, path, frame)
+    with metrics.span("ocr.cache_lookup"):
+        cache_config = " ".join([config or ""] + [options.cache_key() for options in (preprocessing, checks) if options is not None]).strip()
+        cached_kinds = kinds + ((CHECKS_KIND,) if checks is not None else ())
+        keys, cached_paths = _lookup_cached(pages, cached_kinds, backend, lang, cache_config, cache)
+    misses = [i for i, cached_path in enumerate(cached_paths) if cached_path is None]
+
+    workers = workers or default_worker_count()
+    if workers > 1 and len(misses) > 1:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(misses)),
+                                   initializer=_init_worker,
+                                   initargs=(pytesseract.pytesseract.tesseract_cmd, backend, lang, config, preprocessing, checks))
+        submit = functools.partial(pool.submit, _ocr_in_worker, kinds=kinds)
+        in_flight = PAGES_IN_FLIGHT_PER_WORKER * min(workers, len(misses))
+    else:
+        pool = _PipelinedOcr(backend, lang, config, kinds, preprocessing, checks)
+        submit = pool.submit
+        in_flight = PAGES_IN_FLIGHT_PER_WORKER
+    futures = {}
+    next_miss = 0
+    try:
+        for i, (name, image_path, frame) in enumerate(pages):
+            while next_miss < len(misses) and len(futures) < in_flight:
+                futures[misses[next_miss]] = submit(*pages[misses[next_miss]][1:])
+                next_miss += 1
+            with metrics.span("ocr.cache_read"):
+                outputs = cache.read(cached_paths[i]) if cached_paths[i] else None
+            if outputs is not None:
+                yield name, outputs, None
+                continue
+
+            # Not submitted yet only if another process evicted its cache entry since lookup
+            future = futures.pop(i, None) or submit(image_path, frame)
+            result = _checked(name, lambda: _merged(future.result()))
+            metrics.count("ocr.images")
+            if keys[i] and result[2] is None:
+                with metrics.span("ocr.cache_write"):
+                    for kind, data in result[1].items():
+                        cache.put(keys[i], kind, data)
+            yield result
+    finally:
+        # Drop queued work if the caller stopped early (error, abort)
+        for future in futures.values():
+            future.cancel()
+        pool.shutdown(wait=True)
+
+
+def _lookup_cached(pages, kinds, backend, lang, config, cache):
+    keys = [None] * len(pages)
+    cached_paths = [None] * len(pages)
+    if cache is None:
+        return keys, cached_paths
+    engine_version = backend_version(backend)
+    file_keys = {} # Every file is hashed once, however many frames it has
+    for i, (_, image_path, frame) in enumerate(pages):
+        if image_path not in file_keys:
+            try:
+                file_keys[image_path] = cache.key_for_image(image_path, engine_version, lang, config)
+            except OSError:
+                file_keys[image_path] = None # Unreadable image; the OCR step reports the error
+        if file_keys[image_path] is None:
+            continue
+        keys[i] = file_keys[image_path] if frame is None else cache.key_for_frame(file_keys[image_path], frame)
+        cached_paths[i] = cache.lookup(keys[i], kinds)
+    return keys, cached_paths
+
+
+def _checked(name, get_outputs):
+    try:
+        outputs = get_outputs()
+    except Exception as e:
+        return name, None, e
+    if outputs == _TESSERACT_NOT_FOUND:
+        raise tesseract().TesseractNotFoundError()
+    return name, outputs, None
@@ -0,0 +1,70 @@
+import os
+import re
+
+# --- OCR Sidecar Files ---
+# Text, hOCR and TSV that Tesseract produced in the same pass as the searchable PDF,
+# written next to the PDF page by page as the pages come in. Page numbers follow the
+# pages of the output PDF, the same way a multi-page tesseract run numbers them.
+
+SIDECAR_KINDS = ("txt", "hocr", "tsv")
+
+_HOCR_ID = re.compile(r"id='(\w+?)_1(?=['_])")
+_HOCR_PAGE_NO = re.compile(r"ppageno 0\b")
+
+
+def sidecar_path(output_path, kind):
+    return os.path.splitext(output_path)[0] + "." + kind
+
+
+class SidecarWriter:
+    def __init__(self, output_path, kinds):
+        self.paths = {kind: sidecar_path(output_path, kind) for kind in kinds}
+        self._files = {}
+        self._wrote_tsv_header = False
+        try:
+            for kind, path in self.paths.items():
+                self._files[kind] = open(path, "w", encoding="utf-8", newline="")
+        except OSError:
+            self.close()
+            raise
+
+    def add_page(self, page_number, outputs):
+        for kind, f in self._files.items():
+            data = outputs[kind].decode("utf-8")
+            if kind == "txt":
+                f.write(data) # Tesseract already ends every page with a form feed
+            elif kind == "hocr":
+                self._write_hocr_page(f, page_number, data)
+            else:
+                self._write_tsv_page(f, page_number, data)
+
+    def _write_hocr_page(self, f, page_number, data):
+        head, _, rest = data.partition("<body>")
+        body = rest.rpartition("</body>")[0]
+        if page_number == 1:
+            f.write(head + "<body>")
+        body = _HOCR_ID.sub(lambda m: f"id='{m.group(1)}_{page_number}", body)
+        f.write(_HOCR_PAGE_NO.sub(f"ppageno {page_number - 1}", body))
+
+    def _write_tsv_page(self, f, page_number, data):
+        lines = data.splitlines()
+        if not lines:
+            return
+        header, rows = lines[0], lines[1:]
+        if not self._wrote_tsv_header:
+            f.write(header + "\n")
+            self._wrote_tsv_header = True
+        page_column = header.split("\t").index("page_num")
+        for row in rows:
+            fields = row.split("\t")
+            if len(fields) > page_column:
+                fields[page_column] = str(page_number)
+            f.write("\t".join(fields) + "\n")
+
+    def close(self):
+        hocr = self._files.get("hocr")
+        if hocr is not None and hocr.tell():
+            hocr.write("</body>\n</html>\n")
+        for f in self._files.values():
+            f.close()
+        self._files = {}
@@ -0,0 +1,97 @@
+import io
+from dataclasses import dataclass
+
+import metrics
+from image_preprocess import ink_mask
+
+# --- Page Checks Before OCR ---
+# Cheap looks at a page before the full Tesseract pass. Duplex scans are often half
+# blank backsides: a page whose downsampled ink coverage stays under blank_ink_ratio is
+# kept as a plain image page without OCR ("keep") or left out of the output ("drop").
+# With orientation, Tesseract's orientation detection runs on a thumbnail first and the
+# page is turned upright before the one OCR pass, instead of OCR'ing it sideways and
+# again once the garbage is noticed.
+
+BLANK_POLICIES = ("ocr", "keep", "drop")
+# Extra output kind with what the checks did to a page: b"blank", b"rotated" or b"". It is
+# cached and checkpointed with the other outputs, so pages that aren't OCR'd again are
+# still counted.
+CHECKS_KIND = "checks"
+BLANK_INK_RATIO = 0.0005 # Share of ink pixels below which a page counts as blank
+BLANK_SAMPLE_WIDTH = 800
+BLANK_BORDER = 0.05 # Scanner edges and punch holes are ignored on every side
+BLANK_INK_OFFSET = 25 # Ink must be clearly darker than the paper around it
+OSD_MAX_SIDE = 1200 # Orientation detection thumbnail
+OSD_MIN_CONFIDENCE = 2.0
+
+_TSV_HEADER = b"level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n"
+_HOCR_PAGE = ("<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n<html xmlns=\"http://www.w3.org/1999/xhtml\">\n<head>\n"
+              "<meta http-equiv=\"Content-Type\" content=\"text/html;charset=utf-8\"/>\n</head>\n<body>\n"
+              "<div class='ocr_page' id='page_1' title='bbox 0 0 {width} {height}; ppageno 0'></div>\n</body>\n</html>\n")
+
+
+@dataclass(frozen=True)
+class PageChecks:
+    blank: str = "ocr" # One of BLANK_POLICIES
+    orientation: bool = False
+    blank_ink_ratio: float = BLANK_INK_RATIO
+
+    def __post_init__(self):
+        if self.blank not in BLANK_POLICIES:
+            raise ValueError(f"Unknown blank page policy '{self.blank}'. Use one of: {', '.join(BLANK_POLICIES)}")
+
+    def cache_key(self):
+        # Part of the OCR cache key: rotated pages give different results
+        return f"checks={self.blank};{int(self.orientation)};{self.blank_ink_ratio}"
+
+
+def ink_coverage(img):
+    """Share of the page (without its border) that is ink, measured on a small copy."""
+    import numpy as np
+    gray = img.convert("L") if img.mode != "L" else img
+    factor = max(1, gray.width // BLANK_SAMPLE_WIDTH)
+    sample = np.asarray(gray.reduce(factor) if factor > 1 else gray)
+    dy, dx = int(sample.shape[0] * BLANK_BORDER), int(sample.shape[1] * BLANK_BORDER)
+    sample = sample[dy:sample.shape[0] - dy, dx:sample.shape[1] - dx]
+    if not sample.size:
+        return 0.0
+    return float(np.count_nonzero(ink_mask(sample, 15, BLANK_INK_OFFSET))) / sample.size
+
+
+def is_blank(img, checks):
+    with metrics.span("checks.blank"):
+        return ink_coverage(img) < checks.blank_ink_ratio
+
+
+def blank_page_outputs(img, kinds):
+    """The outputs OCR would give for a blank page: the image on a page of its own and no text."""
+    dpi = img.info.get("dpi") or (300, 300)
+    outputs = {}
+    for kind in kinds:
+        if kind == "pdf":
+            data = io.BytesIO()
+            page = img if img.mode in ("1", "L", "RGB") else img.convert("RGB")
+            page.save(data, "PDF", resolution=float(dpi[0]))
+            outputs[kind] = data.getvalue()
+        elif kind == "txt":
+            outputs[kind] = b"\f"
+        elif kind == "hocr":
+            outputs[kind] = _HOCR_PAGE.format(width=img.width, height=img.height).encode("utf-8")
+        elif kind == "tsv":
+            outputs[kind] = _TSV_HEADER
+    return outputs
+
+
+def upright(backend, img):
+    """Return img turned upright (by a multiple of 90 degrees) as detected on a thumbnail."""
+    from PIL import Image
+    with metrics.span("checks.orientation"):
+        thumbnail = img.convert("L") if img.mode not in ("L", "1") else img.copy()
+        thumbnail.thumbnail((OSD_MAX_SIDE, OSD_MAX_SIDE))
+        rotate, confidence = backend.orientation(thumbnail)
+    if rotate % 360 == 0 or confidence < OSD_MIN_CONFIDENCE:
+        return img
+    # rotate is clockwise; Image.ROTATE_* turn counter-clockwise
+    turned = img.transpose({90: Image.ROTATE_270, 180: Image.ROTATE_180, 270: Image.ROTATE_90}[rotate % 360])
+    turned.info = dict(img.info)
+    return turned
@@ -0,0 +1,224 @@
+import re
+
+import numpy as np
+import pandas as pd
+from PyPDF2.generic import ContentStream, NameObject
+
+# --- PDF Table Detection ---
+# Text fragments and their positions are collected through PyPDF2's text visitor, then
+# grouped with NumPy: y-coordinates into rows, and the horizontal gaps that no fragment
+# crosses into column boundaries. A table is a run of consecutive rows that split into
+# two or more cells. Everything per page runs in the pdf_text worker processes; only the
+# finished cell strings come back, and TableCollector stitches tables split across pages.
+
+MIN_TABLE_ROWS = 2
+CHAR_WIDTH_EM = 0.55 # Average glyph width; PyPDF2 doesn't report the width of a text run
+COLUMN_GAP_EM = 1.0 # Narrower gaps are spaces between words in the same cell
+ROW_GAP_EM = 3.0 # A bigger vertical gap ends the table
+
+_TEXT_MOVES = (b"Td", b"TD", b"Tm", b"T*", b"'", b'"')
+
+
+def page_fragments(page):
+    """Return (x0, x1, y, size, text) for every text run on the page, in content order."""
+    fragments = []
+    stretch = [1.0] # Horizontal scaling (Tz), saved and restored with q/Q; OCR text layers set it per word
+
+    def track(operator, operands, cm, tm):
+        if operator == b"Tz":
+            stretch[-1] = float(operands[0]) / 100
+        elif operator == b"q":
+            stretch.append(stretch[-1])
+        elif operator == b"Q" and len(stretch) > 1:
+            stretch.pop()
+
+    def visit(text, cm, tm, font_dict, font_size):
+        if not text or text.isspace():
+            return
+        # Text space -> user space: the text matrix, then the current transformation matrix
+        x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+        y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+        scale = abs(tm[0] * tm[3] - tm[1] * tm[2]) ** 0.5 * abs(cm[0] * cm[3] - cm[1] * cm[2]) ** 0.5
+        size = (font_size or 1) * (scale or 1)
+        width = size * CHAR_WIDTH_EM * stretch[-1]
+        stripped = text.lstrip()
+        x += (len(text) - len(stripped)) * width / 2 # Leading spaces are narrow
+        stripped = stripped.rstrip()
+        fragments.append((x, x + len(stripped) * width, y, size, stripped))
+
+    contents = page.raw_get("/Contents") if "/Contents" in page else None
+    if contents is not None:
+        page[NameObject("/Contents")] = _split_text_runs(page)
+    try:
+        page.extract_text(visitor_operand_before=track, visitor_text=visit)
+    finally:
+        if contents is not None:
+            page[NameObject("/Contents")] = contents
+    return fragments
+
+
+def _split_text_runs(page):
+    # PyPDF2 only hands text to the visitor when the font or graphics state changes, so
+    # text placed with Td/TD/Tm/T* inside one BT block (how Word, Excel and LaTeX place
+    # table cells) comes back as one run at the last position. Setting the current font
+    # again before every move makes it hand over each positioned run on its own.
+    operations = []
+    font = None
+    shown = False # Text shown since the last move or font change
+    for operands, operator in ContentStream(page.get_contents(), page.pdf, "bytes").operations:
+        if operator == b"Tf":
+            font, shown = (operands, operator), False
+        elif operator in _TEXT_MOVES:
+            if shown and font is not None:
+                operations.append(font)
+            shown = operator in (b"'", b'"') # Move, then show
+        elif operator in (b"Tj", b"TJ"):
+            shown = True
+        operations.append((operands, operator))
+    contents = ContentStream(None, page.pdf)
+    contents.operations = operations
+    return contents
+
+
+def page_layout(page):
+    """Return (lines, tables) for a page: its text rows top to bottom, and every table
+    found as a list of rows of cell strings."""
+    fragments = page_fragments(page)
+    if not fragments:
+        return [], []
+    x0, x1, y, size = (np.array(values, dtype=float) for values in zip(*[f[:4] for f in fragments]))
+    texts = np.array([f[4] for f in fragments], dtype=object)
+    em = float(np.median(size))
+
+    # Rows: sort top to bottom and start a new row wherever y jumps by more than half a line
+    order = np.argsort(-y, kind="stable")
+    row_of = np.empty(len(y), dtype=int)
+    row_of[order] = np.concatenate(([0], np.cumsum(np.diff(-y[order]) > em / 2)))
+    row_count = row_of.max() + 1
+    row_y = np.zeros(row_count)
+    np.maximum.at(row_y, row_of, y) # Top of every row, for the vertical gaps
+
+    # Within every row, left to right; a wide horizontal gap starts a new cell
+    order = np.lexsort((x0, row_of))
+    same_row = row_of[order][1:] == row_of[order][:-1]
+    wide_gap = same_row & (x0[order][1:] - x1[order][:-1] > COLUMN_GAP_EM * em)
+    cells_per_row = np.bincount(row_of[order][1:][wide_gap], minlength=row_count) + 1
+
+    lines = [" ".join(texts[order][row_of[order] == row]) for row in range(row_count)]
+
+    tables = []
+    in_table = cells_per_row >= 2
+    row_gaps = np.concatenate(([np.inf], row_y[:-1] - row_y[1:]))
+    breaks = ~in_table | (row_gaps > ROW_GAP_EM * em)
+    run_ids = np.cumsum(breaks)
+    for run in np.unique(run_ids[in_table]):
+        rows = np.flatnonzero(in_table & (run_ids == run))
+        if len(rows) < MIN_TABLE_ROWS:
+            continue
+        tables.append(_table_cells(rows, row_of, x0, x1, texts, cells_per_row, em))
+    return lines, tables
+
+
+def _table_cells(rows, row_of, x0, x1, texts, cells_per_row, em):
+    members = np.flatnonzero(np.isin(row_of, rows))
+
+    # Column boundaries come from the rows with the most common cell count, so a heading
+    # spanning several columns can't bridge the gaps between them
+    counts = cells_per_row[rows]
+    values, frequency = np.unique(counts, return_counts=True)
+    typical = values[frequency == frequency.max()].max()
+    shape_rows = rows[counts == typical]
+    shaping = members[np.isin(row_of[members], shape_rows)]
+
+    # Mark every point on the x axis that some fragment covers, then cut in the empty gaps
+    left = np.floor(x0[shaping].min())
+    start = (np.floor(x0[shaping]) - left).astype(int)
+    end = (np.ceil(x1[shaping]) - left).astype(int) + 1
+    coverage = np.zeros(end.max() + 1, dtype=int)
+    np.add.at(coverage, start, 1)
+    np.add.at(coverage, end, -1)
+    empty = np.cumsum(coverage) == 0
+    edges = np.flatnonzero(np.diff(empty.astype(int)))
+    gap_ends = edges[1::2] + 1 # Empty runs between fragments; the one after the last is dropped
+    gap_starts = edges[::2][:len(gap_ends)] + 1
+    wide = gap_ends - gap_starts > COLUMN_GAP_EM * em
+    boundaries = left + (gap_starts[wide] + gap_ends[wide]) / 2
+
+    column_of = np.searchsorted(boundaries, (x0[members] + x1[members]) / 2)
+    row_index = np.searchsorted(rows, row_of[members])
+    table = [[""] * (len(boundaries) + 1) for _ in rows]
+    for i in np.lexsort((x0[members], row_index)):
+        r, c = row_index[i], column_of[i]
+        table[r][c] = f"{table[r][c]} {texts[members[i]]}".strip()
+    return table
+
+
+_NUMBER = re.compile(r"^\(?[-+]?[$€£]?[\d,]*\.?\d+%?\)?$")
+_YEAR = re.compile(r"^(19|20)\d\d$")
+
+
+def _is_number(cell):
+    return bool(_NUMBER.match(cell.replace(" ", "")))
+
+
+def _is_header(row, body=()):
+    # All text, or text above a column of numbers ("Amount" over amounts)
+    if not any(_is_number(cell) for cell in row if cell):
+        return True
+    columns = [[r[i] for r in body if r[i]] for i in range(len(row))]
+    for cell, column in zip(row, columns):
+        if cell and not _is_number(cell) and column and all(map(_is_number, column)):
+            return True
+    # Year headings ("Item | 2023 | 2024"): every number in the row is a year above a
+    # column of numbers that aren't years themselves, and the text cells head text columns
+    years = 0
+    for cell, column in zip(row, columns):
+        if not cell or not _is_number(cell):
+            continue
+        if not (_YEAR.match(cell) and column and all(map(_is_number, column))
+                and not all(_YEAR.match(value) for value in column)):
+            return False
+        years += 1
+    return years > 0
+
+
+class TableCollector:
+    """Gathers the tables of consecutive pages, continuing a table over a page break.
+
+    The first table on a page continues the last one of the previous page when it has
+    the same columns and doesn't start with a different header row; a header row that
+    is repeated on every page is dropped.
+    """
+
+    def __init__(self):
+        self.tables = []
+        self._open = None # Last table of the previous page
+
+    def add_page(self, tables):
+        for n, rows in enumerate(tables):
+            previous = self._open if n == 0 else None
+            if previous and len(previous[0]) == len(rows[0]):
+                if rows[0] == previous[0]:
+                    rows = rows[1:]
+                if not rows or not _is_header(rows[0], rows[1:]):
+                    previous.extend(rows)
+                    continue
+            self.tables.append(list(rows))
+        self._open = self.tables[-1] if tables else None
+
+
+def table_frame(rows):
+    """Turn a table's rows into a DataFrame, with the first row as header if it is one
+    and numeric columns ("1,234.50", "(90)", "$5") as numbers. Percentages stay text."""
+    header = rows[0] if len(rows) > 1 and _is_header(rows[0], rows[1:]) else None
+    body = rows[1:] if header else rows
+    columns = [cell or f"Column {n}" for n, cell in enumerate(header or [""] * len(rows[0]), 1)]
+    df = pd.DataFrame(body, columns=columns)
+    for i in range(len(columns)):
+        values = df.iloc[:, i]
+        filled = values != ""
+        if not filled.any() or not values[filled].map(_is_number).all() or values.str.contains("%").any():
+            continue
+        cleaned = values.str.replace(r"[\s,$€£]", "", regex=True).str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+        df.isetitem(i, pd.to_numeric(cleaned.where(filled), errors="coerce"))
+    return df
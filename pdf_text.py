@@ -0,0 +1,104 @@
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+
+from PyPDF2 import PdfReader
+
+import metrics
+
+# --- Page-Parallel PDF Text Extraction ---
+# PyPDF2's extract_text() is pure Python and CPU-bound, so large documents are split
+# into chunks of pages that worker processes extract in parallel. Every worker opens
+# its own PdfReader once; results are handed back in page order. map_pages() runs any
+# module-level per-page function this way (see pdf_tables.py).
+
+PAGES_PER_TASK = 8 # Pages extracted per task, to keep the inter-process overhead low
+MIN_PARALLEL_PAGES = 2 * PAGES_PER_TASK # Smaller documents aren't worth starting a pool for
+
+_reader = None # The worker process' own reader
+
+
+def _init_worker(pdf_path):
+    global _reader
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C is handled by the parent
+    _reader = PdfReader(pdf_path)
+
+
+def _map_chunk(page_function, page_numbers, stage):
+    with metrics.collect() as worker_metrics:
+        with metrics.span(stage):
+            results = [page_function(_reader.pages[i]) for i in page_numbers]
+    return results, worker_metrics.summary()
+
+
+def count_pages(pdf_path):
+    with open(pdf_path, 'rb') as file:
+        return len(PdfReader(file).pages)
+
+
+def page_text(page):
+    return page.extract_text()
+
+
+def text_or_scan(page):
+    """Return (text, None) for a page with a text layer. Otherwise return (text, scan), where
+    scan is the page's largest image as (file extension, encoded bytes), or None if it has
+    no image that can be decoded."""
+    text = page.extract_text()
+    if text.strip():
+        return text, None
+    try:
+        images = page.images
+    except Exception: # No resources, or an image filter PyPDF2 can't decode (e.g. JBIG2)
+        return text, None
+    if not images:
+        return text, None
+    largest = max(images, key=lambda image: len(image.data))
+    return text, (os.path.splitext(largest.name)[1], largest.data)
+
+
+def extract_page_texts(pdf_path, page_numbers=None, workers=None):
+    """Yield (page index, text) for the given 0-based pages (default: all), in that order."""
+    return map_pages(pdf_path, page_text, page_numbers, workers, stage="pdf.extract_text")
+
+
+def map_pages(pdf_path, page_function, page_numbers=None, workers=None, stage=None):
+    """Yield (page index, page_function(page)) for the given 0-based pages, in that order.
+
+    Only a few chunks per worker are in flight at a time, so memory stays bounded
+    however long the document is. The time spent in page_function is recorded as the
+    metrics span stage (default: "pdf." + its name).
+    """
+    stage = stage or "pdf." + page_function.__name__
+    if page_numbers is None:
+        page_numbers = list(range(count_pages(pdf_path)))
+    workers = workers or os.cpu_count() or 1
+
+    if workers <= 1 or len(page_numbers) < MIN_PARALLEL_PAGES:
+        with open(pdf_path, 'rb') as file:
+            with metrics.span("pdf.open"):
+                reader = PdfReader(file)
+            for i in page_numbers:
+                with metrics.span(stage):
+                    result = page_function(reader.pages[i])
+                yield i, result
+        return
+
+    chunks = [page_numbers[start:start + PAGES_PER_TASK] for start in range(0, len(page_numbers), PAGES_PER_TASK)]
+    workers = min(workers, len(chunks))
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pdf_path,))
+    pending = []
+    try:
+        next_chunk = 0
+        for chunk in chunks:
+            # Keep the pool busy, but don't queue up the whole document at once
+            while next_chunk < len(chunks) and len(pending) < 2 * workers:
+                pending.append(pool.submit(_map_chunk, page_function, chunks[next_chunk], stage))
+                next_chunk += 1
+            results, summary = pending.pop(0).result()
+            metrics.merge(summary)
+            yield from zip(chunk, results)
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
@@ -0,0 +1,131 @@
+import io
+import time
+import zlib
+
+# --- Streaming PDF Writer ---
+# Writes a PDF page by page straight to its file, keeping only the object offsets in
+# memory. Pages are either content streams in a core font (text_pdf.py) or pages copied
+# from finished single-page PDFs such as Tesseract's (images_to_pdf), so a document of
+# any length is assembled without holding its pages.
+
+A4 = (595.28, 841.89) # In points; FPDF's own (rounded) value
+
+CORE_FONTS = {"courier": "Courier", "helvetica": "Helvetica", "times": "Times-Roman"}
+FONT_ALIASES = {"arial": "helvetica"}
+
+
+class PdfStreamWriter:
+    """Write a PDF one page at a time: page objects go to the file as they are added and
+    only the object offsets are kept until close() writes the page tree and xref.
+
+    font is the core font used by add_page(); None leaves it out, for writers that only
+    copy finished pages in with add_pdf_page().
+    """
+
+    def __init__(self, file, page_size=A4, font="helvetica"):
+        self._file = file
+        self._offsets = [None] # By object number; 0 is the free-list head
+        self._kids = []
+        self._position = 0
+        self.width, self.height = page_size
+        self._write(b"%PDF-1.3\n%\xe2\xe3\xcf\xd3\n")
+        self._pages_id = self._reserve()
+        self._font_id = None
+        if font is not None:
+            family = FONT_ALIASES.get(font.lower(), font.lower())
+            self._font_id = self._add_object(
+                f"<</Type /Font /Subtype /Type1 /BaseFont /{CORE_FONTS[family]} /Encoding /WinAnsiEncoding>>".encode("ascii"))
+
+    @property
+    def page_count(self):
+        return len(self._kids)
+
+    def _write(self, data):
+        self._file.write(data)
+        self._position += len(data)
+
+    def _reserve(self):
+        self._offsets.append(None)
+        return len(self._offsets) - 1
+
+    def _add_object(self, body, number=None):
+        number = number or self._reserve()
+        self._offsets[number] = self._position
+        self._write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        return number
+
+    def add_page(self, content, compressed=False):
+        """Add a page whose content stream is content (zlib-compressed if compressed)."""
+        data = content if compressed else zlib.compress(content)
+        stream_id = self._add_object(b"<</Filter /FlateDecode /Length %d>>\nstream\n" % len(data) + data + b"\nendstream")
+        self._kids.append(self._add_object(
+            b"<</Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] /Resources <</Font <</F1 %d 0 R>>>> /Contents %d 0 R>>"
+            % (self._pages_id, self.width, self.height, self._font_id, stream_id)))
+
+    def add_pdf_page(self, pdf_data):
+        """Copy the first page of the PDF in pdf_data (bytes), with everything it uses."""
+        from PyPDF2 import PdfReader
+        self.copy_page(PdfReader(io.BytesIO(pdf_data)).pages[0]) # Inherited attributes are copied onto the page
+
+    def copy_page(self, page, shared=None):
+        """Copy a PyPDF2 page with everything it uses.
+
+        Pages of one document copied with the same shared dict write the objects they
+        share (fonts, images, ...) only once. References to pages that aren't copied yet
+        (e.g. link targets further on) become null.
+        """
+        from PyPDF2.generic import (ArrayObject, DecodedStreamObject, DictionaryObject, EncodedStreamObject,
+                                    IndirectObject, NameObject, NullObject, StreamObject)
+
+        numbers = {} # Object number in the source -> object number here, for this page only
+        to_copy = []
+
+        def copied(obj):
+            if isinstance(obj, IndirectObject):
+                table = shared if shared is not None and obj.pdf is page.pdf else numbers
+                if obj.idnum not in table:
+                    target = obj.get_object()
+                    if isinstance(target, DictionaryObject) and target.get("/Type") == "/Page":
+                        return NullObject()
+                    table[obj.idnum] = self._reserve()
+                    to_copy.append((obj, table[obj.idnum]))
+                return IndirectObject(table[obj.idnum], 0, None)
+            if isinstance(obj, StreamObject):
+                stream = EncodedStreamObject() if "/Filter" in obj else DecodedStreamObject()
+                stream._data = obj._data # Still encoded as in the source
+                stream.update({key: copied(value) for key, value in obj.items()})
+                return stream
+            if isinstance(obj, DictionaryObject):
+                return DictionaryObject({key: copied(value) for key, value in obj.items()})
+            if isinstance(obj, ArrayObject):
+                return ArrayObject(copied(item) for item in obj)
+            return obj
+
+        page_id = self._reserve()
+        if page.indirect_reference is not None: # e.g. annotations pointing back at the page
+            (shared if shared is not None else numbers)[page.indirect_reference.idnum] = page_id
+        page_copy = copied(DictionaryObject({key: value for key, value in page.items() if key != "/Parent"}))
+        page_copy[NameObject("/Parent")] = IndirectObject(self._pages_id, 0, None)
+        self._add_object(_serialized(page_copy), page_id)
+        while to_copy:
+            reference, number = to_copy.pop()
+            self._add_object(_serialized(copied(reference.get_object())), number)
+        self._kids.append(page_id)
+
+    def close(self):
+        kids = b" ".join(b"%d 0 R" % kid for kid in self._kids)
+        self._add_object(b"<</Type /Pages /Kids [%s] /Count %d>>" % (kids, len(self._kids)), self._pages_id)
+        info_id = self._add_object(b"<</Producer (ImageAndTextPDFTools) /CreationDate (D:%s)>>"
+                                   % time.strftime("%Y%m%d%H%M%S").encode("ascii"))
+        catalog_id = self._add_object(b"<</Type /Catalog /Pages %d 0 R>>" % self._pages_id)
+        xref_offset = self._position
+        entries = [b"0000000000 65535 f \n"] + [b"%010d 00000 n \n" % offset for offset in self._offsets[1:]]
+        self._write(b"xref\n0 %d\n" % len(self._offsets) + b"".join(entries))
+        self._write(b"trailer\n<</Size %d /Root %d 0 R /Info %d 0 R>>\nstartxref\n%d\n%%%%EOF\n"
+                    % (len(self._offsets), catalog_id, info_id, xref_offset))
+
+
+def _serialized(obj):
+    data = io.BytesIO()
+    obj.write_to_stream(data, None)
+    return data.getvalue()
@@ -0,0 +1,198 @@
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+# --- Full-Text Search Index ---
+# Text extracted from PDFs and OCR'd scans is added to a local SQLite FTS5 index, page by
+# page, as the conversion produces it. Every document is recorded with a hash of its
+# file, so re-indexing skips documents that haven't changed. Searches return the best
+# matching pages ranked by BM25, with a snippet around the match.
+#
+# A page's rowid is (document id << PAGE_BITS) | page number, so all pages of a document
+# are one rowid range and can be replaced without scanning the index.
+
+PAGE_BITS = 20 # Up to a million pages per document
+BATCH_PAGES = 64 # Pages committed together while a document is being indexed
+SCHEMA_VERSION = 1
+
+
+def default_index_path():
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "ImageAndTextPDFTools", "search.db")
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class SearchHit:
+    path: str
+    page: int # 1-based
+    score: float # Higher is better
+    snippet: str
+
+
+class SearchIndex:
+    """A search index file. Safe to hand to a worker thread, but use it from one thread at
+    a time; several processes can share the file."""
+
+    def __init__(self, path=None):
+        self.path = path or default_index_path()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL") # Searches don't wait for a document being indexed
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._transaction():
+            self._db.execute("CREATE TABLE IF NOT EXISTS documents (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE, "
+                             "content_hash TEXT, page_count INTEGER NOT NULL DEFAULT 0, indexed_at REAL)")
+            self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(text, tokenize='unicode61 remove_diacritics 2')")
+            self._db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @contextmanager
+    def _transaction(self):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def is_current(self, path, content_hash):
+        """True if path is fully indexed with this content hash."""
+        row = self._db.execute("SELECT content_hash FROM documents WHERE path = ?", (_key(path),)).fetchone()
+        return row is not None and row[0] == content_hash
+
+    @contextmanager
+    def document(self, path, content_hash=None):
+        """Replace the indexed pages of path with the ones added inside the block.
+
+        Yields a DocumentWriter. Pages are committed in batches as they come in, so other
+        processes can keep indexing and searching meanwhile. Unless complete() is called
+        (e.g. after an error or a cancelled run) the pages added so far stay searchable,
+        but the document is indexed again next time.
+        """
+        with self._transaction():
+            self._db.execute("INSERT INTO documents (path) VALUES (?) ON CONFLICT (path) DO NOTHING", (_key(path),))
+            document_id = self._db.execute("SELECT id FROM documents WHERE path = ?", (_key(path),)).fetchone()[0]
+            self._db.execute("UPDATE documents SET content_hash = NULL, page_count = 0 WHERE id = ?", (document_id,))
+            self._delete_pages(document_id)
+        writer = DocumentWriter(self, document_id, content_hash)
+        try:
+            yield writer
+        finally:
+            writer.flush(writer.content_hash if writer.completed else None)
+
+    def _delete_pages(self, document_id):
+        self._db.execute("DELETE FROM pages WHERE rowid BETWEEN ? AND ?",
+                         (document_id << PAGE_BITS, ((document_id + 1) << PAGE_BITS) - 1))
+
+    def remove(self, path):
+        with self._transaction():
+            row = self._db.execute("SELECT id FROM documents WHERE path = ?", (_key(path),)).fetchone()
+            if row is None:
+                return False
+            self._delete_pages(row[0])
+            self._db.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+        return True
+
+    def documents(self):
+        """Return (path, pages, fully indexed) for every indexed document."""
+        return [(path, pages, content_hash is not None) for path, pages, content_hash
+                in self._db.execute("SELECT path, page_count, content_hash FROM documents ORDER BY path")]
+
+    def search(self, query, limit=20, raw=False):
+        """Return the best matching pages for query, best first.
+
+        Every word must occur on the page; "quoted words" must occur as a phrase and a
+        trailing * matches any word starting with the prefix. With raw, query is passed
+        to FTS5 as is (OR, NOT, NEAR(...), ...).
+        """
+        match = query if raw else match_expression(query)
+        if not match:
+            return []
+        try:
+            rows = self._db.execute(
+                "SELECT documents.path, pages.rowid, pages.rank, snippet(pages, 0, '[', ']', '...', 12) "
+                "FROM pages JOIN documents ON documents.id = pages.rowid >> ? "
+                "WHERE pages MATCH ? ORDER BY pages.rank LIMIT ?", (PAGE_BITS, match, limit)).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid search query '{query}': {e}") from None
+        return [SearchHit(path, rowid & ((1 << PAGE_BITS) - 1), -rank, snippet) for path, rowid, rank, snippet in rows]
+
+
+class DocumentWriter:
+    def __init__(self, index, document_id, content_hash):
+        self._index = index
+        self._document_id = document_id
+        self._pending = []
+        self._pages = set()
+        self.content_hash = content_hash
+        self.completed = False
+
+    @property
+    def pages(self):
+        return len(self._pages)
+
+    def add_page(self, page, text):
+        """Index the text of a 1-based page (adding it again replaces it)."""
+        if not 0 < page < 1 << PAGE_BITS:
+            raise ValueError(f"Page number {page} is out of range.")
+        if text and not text.isspace():
+            self._pending.append(((self._document_id << PAGE_BITS) | page, text))
+            self._pages.add(page)
+            if len(self._pending) >= BATCH_PAGES:
+                self.flush()
+
+    def flush(self, content_hash=None):
+        """Commit the pages added so far, recording content_hash (None: not complete yet)."""
+        with self._index._transaction():
+            db = self._index._db
+            db.executemany("INSERT OR REPLACE INTO pages (rowid, text) VALUES (?, ?)", self._pending)
+            db.execute("UPDATE documents SET content_hash = ?, page_count = ?, indexed_at = ? WHERE id = ?",
+                       (content_hash, self.pages, time.time(), self._document_id))
+        self._pending = []
+
+    def complete(self, content_hash=None):
+        """Mark the document as fully indexed, so it is skipped until its content changes."""
+        self.content_hash = content_hash or self.content_hash
+        self.completed = self.content_hash is not None
+
+
+def match_expression(query):
+    """Turn a plain search into an FTS5 expression, quoting every term so punctuation
+    ("e-mail", "C++") can't turn into query syntax."""
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        text = phrase or word
+        prefix = not phrase and text.endswith("*")
+        text = text.rstrip("*") if prefix else text
+        if text.strip():
+            terms.append('"' + text.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def _key(path):
+    return os.path.abspath(path)
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from conversion_service import ConversionService
+
+
+class _Writer:
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+async def _request(service, method, target, body=b"", reader=None):
+    head = f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1")
+    if reader is None:
+        reader = asyncio.StreamReader()
+        reader.feed_data(head + body)
+        reader.feed_eof()
+    writer = _Writer()
+    await service._handle(reader, writer)
+    head, _, body = writer.data.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, body
+
+
+def _run(tmp_path, test, **options):
+    async def main():
+        service = ConversionService(work_dir=str(tmp_path), **options)
+        service._queue = asyncio.Queue()
+        worker = asyncio.create_task(service._work())
+        try:
+            return await test(service)
+        finally:
+            worker.cancel()
+            service._executor.shutdown(wait=True)
+    return asyncio.run(main())
+
+
+async def _convert_text(service, filename):
+    status, _, body = await _request(service, "POST", f"/convert/text-to-pdf?filename={filename}", b"Hello\n")
+    assert status == 202
+    return await _request(service, "GET", f"/jobs/{json.loads(body)['id']}/result?wait=30")
+
+
+def test_a_non_latin1_file_name_is_sent_encoded(tmp_path):
+    status, headers, body = _run(tmp_path, lambda service: _convert_text(service, "%E6%8A%A5%E5%91%8A.txt"))
+    assert status == 200
+    assert body.startswith(b"%PDF")
+    assert headers["Content-Disposition"] == "attachment; filename=\"__.pdf\"; filename*=UTF-8''%E6%8A%A5%E5%91%8A.pdf"
+
+
+def test_a_file_name_cannot_add_headers(tmp_path):
+    status, headers, _ = _run(tmp_path, lambda service: _convert_text(service, "a%0D%0AX-Injected:%201%22.txt"))
+    assert status == 200
+    assert "X-Injected" not in headers
+    assert headers["Content-Disposition"].startswith('attachment; filename="aX-Injected: 1.pdf";')
+
+
+def test_uploads_being_received_count_against_the_queue(tmp_path):
+    async def test(service):
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"POST /convert/text-to-pdf HTTP/1.1\r\nContent-Length: 10\r\n\r\nHello")
+        first = asyncio.create_task(_request(service, "POST", "/convert/text-to-pdf", reader=reader))
+        await asyncio.sleep(0.1) # The first upload is half received
+        assert service.status()["receiving"] == 1
+        status, headers, _ = await _request(service, "POST", "/convert/text-to-pdf", b"Hello\n")
+        reader.feed_data(b"World\n")
+        reader.feed_eof()
+        return status, headers, (await first)[0]
+    status, headers, first_status = _run(tmp_path, test, queue_size=1)
+    assert (status, headers["Retry-After"]) == (503, "5")
+    assert first_status == 202
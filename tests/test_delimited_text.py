@@ -0,0 +1,30 @@
+from conversions import text_to_structured
+from delimited_text import SAMPLE_BYTES, read_chunks, read_sample, sniff_format
+
+
+def _export(path, rows, blank):
+    path.write_text("id;count;price;name\n" + "".join(
+        f"{n};{'' if n == blank else n * 5};{n}.5;item {n}\n" for n in range(rows)))
+
+
+def test_column_types_come_from_the_sample(tmp_path):
+    source = tmp_path / "export.txt"
+    _export(source, 10, blank=7)
+    delimiter, dtypes = sniff_format(read_sample(str(source), size=60)) # The first rows only
+    assert (delimiter, dtypes) == (";", {"id": "Int64", "count": "Int64", "price": "float64", "name": str})
+    chunks = list(read_chunks(str(source), delimiter, dtypes, chunk_rows=4))
+    assert [str(chunk["count"].dtype) for chunk in chunks] == ["Int64"] * 3
+    assert chunks[1]["count"].isna().tolist() == [False, False, False, True]
+
+
+def test_whole_numbers_stay_whole_when_a_later_chunk_has_blanks(tmp_path):
+    source = tmp_path / "export.txt"
+    rows = SAMPLE_BYTES // 10 # Well past the sample
+    _export(source, rows, blank=rows - 2)
+    output = tmp_path / "export.csv"
+    text_to_structured(str(source), str(output), chunk_rows=1000)
+    lines = output.read_text().splitlines()
+    assert lines[1:3] == ["0,0,0.5,item 0", "1,5,1.5,item 1"]
+    assert lines[-3:] == [f"{rows - 3},{(rows - 3) * 5},{rows - 3}.5,item {rows - 3}",
+                          f"{rows - 2},,{rows - 2}.5,item {rows - 2}",
+                          f"{rows - 1},{(rows - 1) * 5},{rows - 1}.5,item {rows - 1}"]
@@ -0,0 +1,40 @@
+import os
+import threading
+
+from hot_folder import HotFolder, reserve_path
+
+
+def test_reserve_path_never_hands_out_a_name_twice(tmp_path):
+    paths = []
+    threads = [threading.Thread(target=lambda: paths.append(reserve_path(str(tmp_path), "report.pdf"))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(paths)) == 20
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in paths)
+
+
+def test_concurrent_jobs_with_the_same_name_keep_both_outputs(tmp_path):
+    inboxes = [tmp_path / "a", tmp_path / "b"]
+    inputs = []
+    for n, inbox in enumerate(inboxes):
+        inbox.mkdir()
+        (inbox / "report.txt").write_text(f"Report {n}\n" * (200 * (n + 1)))
+        inputs.append(str(inbox / "report.txt"))
+    hot_folder = HotFolder([str(inbox) for inbox in inboxes], jobs=2, output_dir=str(tmp_path / "output"),
+                           done_dir=str(tmp_path / "done"), failed_dir=str(tmp_path / "failed"))
+    for folder in ("output", "done", "failed"):
+        (tmp_path / folder).mkdir()
+
+    threads = [threading.Thread(target=hot_folder._convert, args=(path, {})) for path in inputs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert hot_folder.done == 2
+    assert sorted(os.listdir(tmp_path / "output")) == ["report (2).pdf", "report.pdf"]
+    assert all(os.path.getsize(tmp_path / "output" / name) > 0 for name in os.listdir(tmp_path / "output"))
+    assert sorted(os.listdir(tmp_path / "done")) == ["report (2).txt", "report.txt"]
+    assert sorted((tmp_path / "done" / name).read_text().count("\n") for name in os.listdir(tmp_path / "done")) == [200, 400]
@@ -0,0 +1,24 @@
+import os
+
+from ocr_cache import OcrCache
+
+
+def test_a_hit_is_counted_only_when_the_entry_is_read(tmp_path):
+    cache = OcrCache(str(tmp_path))
+    cache.put("ab" * 32, "pdf", b"page")
+    paths = cache.lookup("ab" * 32)
+    assert cache.read(paths) == {"pdf": b"page"}
+    assert (cache.hits, cache.misses) == (1, 0)
+
+    paths = cache.lookup("ab" * 32)
+    os.remove(paths["pdf"]) # Evicted by another process between lookup and read
+    assert cache.read(paths) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_overwriting_an_entry_replaces_its_size(tmp_path):
+    cache = OcrCache(str(tmp_path))
+    cache.put("ab" * 32, "pdf", b"x" * 100)
+    cache.put("ab" * 32, "pdf", b"y" * 100)
+    cache.put("cd" * 32, "pdf", b"z" * 40)
+    assert cache._size == 140
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+from PIL import Image
+
+import ocr_engine
+from ocr_checkpoint import OcrCheckpoint
+
+SETTINGS = {"kinds": ["pdf"], "lang": "eng", "config": "", "options": []}
+
+
+def _images(directory, count):
+    paths = []
+    for n in range(count):
+        path = directory / f"scan{n}.png"
+        Image.new("L", (200 + n, 100), 255).save(path)
+        paths.append(str(path))
+    return paths
+
+
+def test_finished_pages_are_resumed(tmp_path):
+    paths = _images(tmp_path, 3)
+    work_dir = str(tmp_path / "work")
+    checkpoint = OcrCheckpoint(work_dir, SETTINGS)
+    checkpoint.add(0, paths[0], None, {"pdf": b"page one"})
+    checkpoint.add(2, paths[2], None, {"pdf": b"page three"})
+    checkpoint.close()
+
+    resumed = OcrCheckpoint(work_dir, dict(SETTINGS))
+    assert [resumed.finished(i, path) for i, path in enumerate(paths)] == [True, False, True]
+    assert resumed.outputs(2) == {"pdf": b"page three"}
+    resumed.close()
+
+
+def test_a_checkpoint_with_other_settings_is_discarded(tmp_path):
+    paths = _images(tmp_path, 1)
+    work_dir = str(tmp_path / "work")
+    checkpoint = OcrCheckpoint(work_dir, SETTINGS)
+    checkpoint.add(0, paths[0], None, {"pdf": b"english page"})
+    checkpoint.close()
+
+    other = OcrCheckpoint(work_dir, dict(SETTINGS, lang="deu"))
+    assert not other.finished(0, paths[0])
+    assert os.listdir(work_dir) == ["manifest.jsonl"] # The old page files are gone
+    other.add(0, paths[0], None, {"pdf": b"german page"})
+    other.close()
+
+    resumed = OcrCheckpoint(work_dir, dict(SETTINGS, lang="deu"))
+    assert resumed.outputs(0) == {"pdf": b"german page"}
+    resumed.close()
+    assert not OcrCheckpoint(work_dir, SETTINGS).finished(0, paths[0])
+
+
+def _tesseract_available():
+    try:
+        ocr_engine.tesseract().get_tesseract_version()
+    except Exception:
+        return False
+    return True
+
+
+@pytest.mark.skipif(not _tesseract_available(), reason="Tesseract is not installed")
+def test_pages_in_done_are_not_ocrd(tmp_path):
+    paths = _images(tmp_path, 4)
+    results = list(ocr_engine.ocr_images(paths, workers=1, done={0, 2}))
+    assert [name for name, _, _ in results] == [paths[1], paths[3]]
+    assert all(error is None and outputs["pdf"].startswith(b"%PDF") for _, outputs, error in results)
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+from PIL import Image, ImageDraw
+
+import ocr_engine
+from conversions import images_to_pdf
+from ocr_cache import OcrCache
+from page_checks import PageChecks
+
+
+def _tesseract_available():
+    try:
+        ocr_engine.tesseract().get_tesseract_version()
+    except Exception:
+        return False
+    return True
+
+
+needs_tesseract = pytest.mark.skipif(not _tesseract_available(), reason="Tesseract is not installed")
+
+
+def _scans(directory):
+    # Two text pages around two blank backsides
+    paths = []
+    for n, blank in enumerate([False, True, False, True]):
+        img = Image.new("L", (850, 1100), 255)
+        if not blank:
+            draw = ImageDraw.Draw(img)
+            for y in range(100, 1000, 40):
+                draw.text((80, y), "The quick brown fox jumps over the lazy dog", fill=0)
+        path = directory / f"scan{n}.png"
+        img.save(path, dpi=(100, 100))
+        paths.append(str(path))
+    return paths
+
+
+@needs_tesseract
+def test_blank_pages_are_counted_on_a_cached_rerun(tmp_path):
+    paths = _scans(tmp_path)
+    cache = OcrCache(str(tmp_path / "cache"))
+    checks = PageChecks("keep", orientation=True)
+    first = images_to_pdf(paths, str(tmp_path / "first.pdf"), workers=1, cache=cache, checks=checks)
+    second = images_to_pdf(paths, str(tmp_path / "second.pdf"), workers=1, cache=cache, checks=checks)
+
+    assert first.stats["Blank pages not OCR'd"] == 2
+    assert second.stats["OCR cache hits"] == 4
+    assert second.stats["Blank pages not OCR'd"] == 2
+    assert second.stats["Pages rotated"] == first.stats["Pages rotated"]
+
+
+@needs_tesseract
+def test_blank_pages_are_counted_when_resuming(tmp_path):
+    paths = _scans(tmp_path)
+    checks = PageChecks("drop")
+    work_dir = str(tmp_path / "work")
+    cancel = threading.Event()
+    # Cancelled after the first two pages (a text page and a dropped blank one)
+    progress = lambda message: message.startswith("Leaving out") and cancel.set()
+    first = images_to_pdf(paths, str(tmp_path / "out.pdf"), workers=1, checks=checks, work_dir=work_dir,
+                          progress=progress, cancel=cancel)
+    assert first.cancelled
+
+    resumed = images_to_pdf(paths, str(tmp_path / "out.pdf"), workers=1, checks=checks, work_dir=work_dir)
+    assert resumed.stats["Pages resumed"] == 2
+    assert resumed.stats["Blank pages left out"] == 2
+    assert resumed.pages == 2
@@ -0,0 +1,25 @@
+import re
+
+import pytest
+
+from conversions import ConversionError, parse_page_range
+
+
+def test_page_ranges_become_page_indices():
+    assert parse_page_range("", 5) == [0, 1, 2, 3, 4]
+    assert parse_page_range("1-2, 4", 5) == [0, 1, 3]
+    assert parse_page_range("-2, 4-", 5) == [0, 1, 3, 4]
+    assert parse_page_range("3-9, 2, 3", 5) == [2, 3, 4, 1] # Clipped to the document, no duplicates
+
+
+@pytest.mark.parametrize("spec, message", [
+    (" , ", "Invalid page range ','"),
+    ("a-3", "Invalid page range 'a-3'"),
+    ("5-3", "Page range '5-3' is reversed; write it as 3-5."),
+    ("0", "outside the document (1-5)"),
+    ("6-", "outside the document (1-5)"),
+    ("-0", "outside the document (1-5)"),
+])
+def test_bad_page_ranges_are_rejected(spec, message):
+    with pytest.raises(ConversionError, match=re.escape(message)):
+        parse_page_range(spec, 5)
@@ -0,0 +1,48 @@
+import io
+
+from PyPDF2 import PdfReader
+
+from pdf_tables import page_layout, table_frame
+from pdf_writer import PdfStreamWriter
+
+
+def test_year_headings_over_a_text_column_are_a_header():
+    df = table_frame([["Item", "2023", "2024"], ["Apples", "10", "12"], ["Pears", "1,100", "(13)"]])
+    assert list(df.columns) == ["Item", "2023", "2024"]
+    assert df["2023"].tolist() == [10, 1100]
+    assert df["2024"].tolist() == [12, -13]
+
+
+def test_first_data_row_is_not_a_header():
+    df = table_frame([["Apples", "10", "12"], ["Pears", "11", "13"]])
+    assert list(df.columns) == ["Column 1", "Column 2", "Column 3"]
+    assert len(df) == 2
+
+
+def test_a_column_of_years_is_data():
+    df = table_frame([["Car", "2019", "15,000"], ["Bike", "2020", "900"]])
+    assert list(df.columns) == ["Column 1", "Column 2", "Column 3"]
+    assert df["Column 2"].tolist() == [2019, 2020]
+
+
+def test_a_table_positioned_with_td_in_one_text_block_is_detected():
+    # How Word, Excel and LaTeX exports place cells: one BT, a Td move before each cell
+    rows = [("Item", "Qty", "Price"), ("Apples", "10", "1.50"), ("Pears", "7", "2.25"), ("Plums", "12", "0.80")]
+    content = [b"BT /F1 10 Tf 72 700 Td"]
+    for r, row in enumerate(rows):
+        for c, cell in enumerate(row):
+            if c:
+                content.append(b"150 0 Td")
+            elif r:
+                content.append(b"-300 -14 Td")
+            content.append(b"(%s) Tj" % cell.encode())
+    content.append(b"ET")
+    pdf = io.BytesIO()
+    writer = PdfStreamWriter(pdf)
+    writer.add_page(b"\n".join(content))
+    writer.close()
+
+    lines, tables = page_layout(PdfReader(io.BytesIO(pdf.getvalue())).pages[0])
+    assert lines == [" ".join(row) for row in rows]
+    assert tables == [[list(row) for row in rows]]
+    assert table_frame(tables[0])["Price"].tolist() == [1.5, 2.25, 0.8]
@@ -0,0 +1,36 @@
+import os
+
+from conversions import index_pdf, text_file_to_pdf
+from search_index import SearchIndex
+
+
+def _pdf(tmp_path, name, pages):
+    # One line of text per page
+    text_path = tmp_path / (name + ".txt")
+    text_path.write_text("".join(f"{text}\n" + "\n" * 26 for text in pages))
+    pdf_path = str(tmp_path / (name + ".pdf"))
+    text_file_to_pdf(str(text_path), pdf_path)
+    return pdf_path
+
+
+def test_an_unchanged_file_is_not_indexed_again(tmp_path):
+    pdf_path = _pdf(tmp_path, "report", ["alpha invoice", "beta invoice"])
+    with SearchIndex(str(tmp_path / "search.db")) as index:
+        first = index_pdf(pdf_path, index, workers=1)
+        second = index_pdf(pdf_path, index, workers=1)
+        assert (first.pages, first.stats.get("unchanged")) == (2, None)
+        assert (second.pages, second.stats.get("unchanged")) == (0, 1)
+        assert index.documents() == [(os.path.abspath(pdf_path), 2, True)]
+        assert [hit.page for hit in index.search("invoice")] in ([1, 2], [2, 1])
+
+
+def test_a_changed_file_replaces_its_pages(tmp_path):
+    pdf_path = _pdf(tmp_path, "report", ["alpha invoice", "beta invoice", "gamma invoice"])
+    with SearchIndex(str(tmp_path / "search.db")) as index:
+        index_pdf(pdf_path, index, workers=1)
+        _pdf(tmp_path, "report", ["delta receipt"]) # Written over the indexed PDF
+        result = index_pdf(pdf_path, index, workers=1)
+        assert result.pages == 1
+        assert index.documents() == [(os.path.abspath(pdf_path), 1, True)]
+        assert index.search("invoice") == []
+        assert [(hit.page, hit.snippet) for hit in index.search("receipt")] == [(1, "delta [receipt]")]
@@ -0,0 +1,51 @@
+import random
+
+from text_pdf import MIN_PARALLEL_BYTES, TextLayout, render_text_pages, segment_bounds
+
+
+def width(layout, data):
+    return sum(layout.widths[byte] for byte in data)
+
+
+def test_long_lines_wrap_at_spaces_within_the_width():
+    layout = TextLayout()
+    line = " ".join(["well-known", "lorem", "ipsum", "dolor-sit"] * 40)
+    rows = [data for data, _ in layout.wrap(line)]
+    assert len(rows) > 1
+    assert b" ".join(rows) == line.encode()
+    assert all(width(layout, data) <= layout.max_width for data in rows)
+    # Every row but the last is full: the next word wouldn't have fit
+    for data, following in zip(rows, rows[1:]):
+        assert width(layout, data + b" " + following.split(b" ")[0]) > layout.max_width
+
+
+def test_words_wider_than_a_line_are_cut():
+    layout = TextLayout()
+    rows = [data for data, spacing in layout.wrap("x" * 500)]
+    assert b"".join(rows) == b"x" * 500
+    assert all(width(layout, data) <= layout.max_width for data in rows)
+
+
+def test_pages_hold_lines_per_page_rows():
+    layout = TextLayout()
+    assert len(list(layout.pages(["line\n"] * (2 * layout.lines_per_page + 1)))) == 3
+
+
+def test_parallel_pages_match_the_serial_ones(tmp_path):
+    # Lines of every length, so the segments end in the middle of pages and of wrapped lines
+    words = ["lorem", "ipsum", "dolor-sit", "amet,", "x" * 120, "12:00:01", "INFO", "\u00e9t\u00e9"]
+    rng = random.Random(0)
+    source = tmp_path / "log.txt"
+    with open(source, "w", encoding="utf-8") as f:
+        size = 0
+        while size < MIN_PARALLEL_BYTES + MIN_PARALLEL_BYTES // 2:
+            line = " ".join(rng.choice(words) for _ in range(rng.choice([0, 1, 6, 20, 90]))) + "\n"
+            f.write(line)
+            size += len(line.encode("utf-8"))
+    assert len(segment_bounds(str(source))) == 3
+
+    options = {"page_numbers": True}
+    serial = list(render_text_pages(str(source), options, workers=1))
+    parallel = list(render_text_pages(str(source), options, workers=3))
+    assert len(parallel) == len(serial)
+    assert parallel == serial # Byte for byte, "Page N" footers included
@@ -0,0 +1,221 @@
+import os
+import signal
+import zlib
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, count, islice
+
+from fpdf.fonts import fpdf_charwidths # Glyph widths of the PDF core fonts
+
+import metrics
+from pdf_writer import A4, CORE_FONTS, FONT_ALIASES
+
+# --- Streaming Text to PDF ---
+# Lays out plain text on FPDF's page size and margins, from a stream of lines and with
+# precomputed glyph-width tables. Long lines wrap at the last space that fits (a word
+# wider than the line is cut) and are justified. This is close to, but not always the
+# same as, FPDF.multi_cell: FPDF versions differ in where they break (e.g. after
+# hyphens), so page counts can differ from an FPDF-made document. A line that fits is measured with one sum over its bytes, and long lines are
+# split with a bisect over their cumulative widths instead of re-measuring word by
+# word. Every finished page is compressed and written straight to the output file (see
+# pdf_writer.py), so only the current page is ever held in memory.
+
+# Everything is in points; these are FPDF's own (rounded) values for its margins (and A4)
+PT_PER_MM = 72 / 25.4
+FPDF_MARGIN = 28.35
+
+FONT_WIDTHS = {family: [fpdf_charwidths[family][chr(code)] for code in range(256)] for family in CORE_FONTS}
+
+TEXT_ENCODING = "cp1252" # WinAnsiEncoding; anything else is written as "?"
+FOOTER_FONT_SIZE = 8
+
+
+class TextLayout:
+    """Wraps lines of text at spaces and paginates them into full-width cells, with the
+    margins of an FPDF('P', 'mm', page_size) with auto page breaks. With page_numbers,
+    every page gets a centered "Page N" footer."""
+
+    def __init__(self, font="helvetica", font_size=12, line_height=10 * PT_PER_MM, page_size=A4,
+                 margin=FPDF_MARGIN, bottom_margin=15 * PT_PER_MM, page_numbers=False):
+        family = FONT_ALIASES.get(font.lower(), font.lower())
+        self.widths = FONT_WIDTHS[family]
+        self.font_size = font_size
+        self.line_height = line_height
+        self.page_numbers = page_numbers
+        self.lines_per_page = int((page_size[1] - bottom_margin - margin) // line_height)
+        cell_margin = margin / 10 # FPDF's padding inside a cell
+        # In glyph-width units (1/1000 em), like FPDF's wmax
+        self.max_width = (page_size[0] - 2 * margin - 2 * cell_margin) * 1000.0 / font_size
+        self._x = margin + cell_margin
+        self._top = page_size[1] - margin - 0.5 * line_height - 0.3 * font_size # First baseline
+        self._footer_center = page_size[0] / 2
+        self._footer_baseline = bottom_margin - 0.5 * line_height - 0.3 * FOOTER_FONT_SIZE
+
+    def wrap(self, line):
+        """Yield (bytes, word spacing) for every output line of one line of text."""
+        data = line.rstrip("\n").replace("\r", "").encode(TEXT_ENCODING, "replace")
+        widths = self.widths
+        if sum(map(widths.__getitem__, data)) <= self.max_width:
+            yield data, 0 # The common case: no wrapping
+            return
+        cumulative = list(accumulate(map(widths.__getitem__, data)))
+        start = 0
+        while start < len(data):
+            base = cumulative[start - 1] if start else 0
+            end = bisect_right(cumulative, base + self.max_width, start) # First byte that overflows
+            if end >= len(data):
+                yield data[start:], 0
+                return
+            space = data.rfind(b" ", start, end + 1)
+            if space == -1:
+                end = max(end, start + 1) # Break inside the word, at least one character
+                yield data[start:end], 0
+                start = end
+            else:
+                # Justified like FPDF: stretch the spaces so the line fills the width
+                spaces = data.count(b" ", start, space + 1)
+                used = (cumulative[space - 1] if space else 0) - base
+                word_spacing = (self.max_width - used) / 1000.0 * self.font_size / (spaces - 1) if spaces > 1 else 0
+                yield data[start:space], word_spacing
+                start = space + 1
+
+    def rows(self, lines):
+        """Yield every output line (bytes, word spacing) for an iterable of text lines."""
+        for line in lines:
+            yield from self.wrap(line)
+
+    def pages(self, lines, first_page_number=1):
+        """Yield the content stream of every page for an iterable of text lines."""
+        rows = self.rows(lines)
+        for page_number in count(first_page_number):
+            page = list(islice(rows, self.lines_per_page))
+            if not page:
+                return
+            yield self.render(page, page_number)
+
+    def render(self, page_lines, page_number=None):
+        out = [b"BT /F1 %.2f Tf" % self.font_size]
+        word_spacing = 0
+        for row, (data, spacing) in enumerate(page_lines):
+            if not data:
+                continue # An empty cell only moves down a line
+            if spacing != word_spacing:
+                out.append(b"%.3f Tw" % spacing)
+                word_spacing = spacing
+            y = self._top - row * self.line_height
+            text = data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+            out.append(b"1 0 0 1 %.2f %.2f Tm (%s) Tj" % (self._x, y, text))
+        if self.page_numbers and page_number is not None:
+            footer = b"Page %d" % page_number
+            x = self._footer_center - sum(map(self.widths.__getitem__, footer)) * FOOTER_FONT_SIZE / 2000.0
+            if word_spacing:
+                out.append(b"0 Tw")
+            out.append(b"/F1 %.2f Tf 1 0 0 1 %.2f %.2f Tm (%s) Tj" % (FOOTER_FONT_SIZE, x, self._footer_baseline, footer))
+        out.append(b"ET")
+        return b"\n".join(out)
+
+
+# --- Page-Parallel Rendering ---
+# Big files are cut into line-aligned byte segments that worker processes render in
+# parallel. Wrapping only depends on the line itself, so a first parallel pass counts
+# the output lines of every segment; their running total tells each segment which page
+# it starts on and how many output lines at its start still belong to the previous
+# segment's last page. In the second pass every worker renders the pages that start
+# in its segment (reading on into the next segment to fill its last page), with the
+# right page numbers, and the compressed pages are written out in order.
+
+SEGMENT_BYTES = 2 * 1024 * 1024
+MIN_PARALLEL_BYTES = 2 * SEGMENT_BYTES # Smaller files aren't worth starting a pool for
+
+
+def read_lines(text_path, start=0, end=None):
+    """Yield the decoded lines from byte offset start (a line start) up to end."""
+    with open(text_path, 'rb') as f:
+        f.seek(start)
+        position = start
+        for line in f:
+            if end is not None and position >= end:
+                return
+            position += len(line)
+            yield line.decode("utf-8")
+
+
+def segment_bounds(text_path, segment_bytes=SEGMENT_BYTES):
+    """Split the file into (start, end) byte ranges that begin at the start of a line."""
+    size = os.path.getsize(text_path)
+    starts = [0]
+    with open(text_path, 'rb') as f:
+        for offset in range(segment_bytes, size, segment_bytes):
+            if offset <= starts[-1]:
+                continue # The previous segment ended on a very long line
+            f.seek(offset - 1)
+            f.readline() # Up to the next line start (or stay, if offset already is one)
+            if f.tell() < size:
+                starts.append(f.tell())
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def _count_rows(text_path, start, end, layout_options):
+    with metrics.collect() as worker_metrics, metrics.span("text_pdf.count_rows"):
+        layout = TextLayout(**layout_options)
+        rows = sum(1 for _ in layout.rows(read_lines(text_path, start, end)))
+    return rows, worker_metrics.summary()
+
+
+def _render_pages(text_path, start, skip, page_count, first_page_number, layout_options):
+    with metrics.collect() as worker_metrics:
+        layout = TextLayout(**layout_options)
+        rows = islice(layout.rows(read_lines(text_path, start)), skip, None)
+        pages = []
+        for page_number in range(first_page_number, first_page_number + page_count):
+            with metrics.span("text_pdf.layout"):
+                content = layout.render(list(islice(rows, layout.lines_per_page)), page_number)
+            with metrics.span("text_pdf.compress"):
+                pages.append(zlib.compress(content))
+    return pages, worker_metrics.summary()
+
+
+def _init_worker():
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C is handled by the parent
+
+
+def render_text_pages(text_path, layout_options, workers=None):
+    """Yield the compressed content stream of every page of the text file, in order."""
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or os.path.getsize(text_path) < MIN_PARALLEL_BYTES:
+        for content in metrics.timed(TextLayout(**layout_options).pages(read_lines(text_path)), "text_pdf.layout"):
+            with metrics.span("text_pdf.compress"):
+                content = zlib.compress(content)
+            yield content
+        return
+
+    bounds = segment_bounds(text_path)
+    lines_per_page = TextLayout(**layout_options).lines_per_page
+    with ProcessPoolExecutor(max_workers=min(workers, len(bounds)), initializer=_init_worker) as pool:
+        row_counts = []
+        for rows, summary in pool.map(_count_rows, *zip(*[(text_path, start, end, layout_options) for start, end in bounds])):
+            row_counts.append(rows)
+            metrics.merge(summary)
+        tasks = []
+        first_row = 0
+        for (start, _), rows in zip(bounds, row_counts):
+            first_page = -(-first_row // lines_per_page) # Pages whose first row lies in this segment
+            end_page = -(-(first_row + rows) // lines_per_page)
+            if end_page > first_page:
+                tasks.append((start, first_page * lines_per_page - first_row, end_page - first_page, first_page + 1))
+            first_row += rows
+
+        pending = []
+        try:
+            next_task = 0
+            for _ in tasks:
+                # Keep every worker busy, but only a few segments' pages in memory
+                while next_task < len(tasks) and len(pending) < 2 * workers:
+                    pending.append(pool.submit(_render_pages, text_path, *tasks[next_task], layout_options))
+                    next_task += 1
+                pages, summary = pending.pop(0).result()
+                metrics.merge(summary)
+                yield from pages
+        finally:
+            for future in pending:
+                future.cancel()